@@ -0,0 +1,18 @@
+from fastapi import Request
+
+from backend.core.loop_monitor import EventLoopMonitor
+from backend.core.vector_store import VectorStore, get_vector_store
+from backend.services.ingestion_jobs import IngestionJobQueue
+
+def get_store(request: Request) -> VectorStore:
+    """FastAPI dependency returning the vector store opened in the app lifespan."""
+    store = getattr(request.app.state, "vector_store", None)
+    return store if store is not None else get_vector_store()
+
+def get_ingestion_jobs(request: Request) -> IngestionJobQueue:
+    """FastAPI dependency returning the background ingestion job queue started in the app lifespan."""
+    return request.app.state.ingestion_jobs
+
+def get_loop_monitor(request: Request) -> EventLoopMonitor:
+    """FastAPI dependency returning the event-loop lag monitor started in the app lifespan."""
+    return request.app.state.loop_monitor
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException # Removed Depends
-from typing import List # Removed Dict, Any, uuid, AsyncSession
+import logging
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from typing import List, Optional # Removed Dict, Any, uuid, AsyncSession
+
+from backend.core.config import settings
+from backend.core.tenants import TENANT_NAME_PATTERN, TenantNotSupportedError
+
+from backend.api.dependencies import get_ingestion_jobs
+from backend.services.ingestion_jobs import IngestionJobQueue
 
 # from core.database import get_db # Removed
-from backend.services import ingestion_service # Ensure backend. prefix
 # from schemas.document import DocumentResponse # Removed, not used
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-@router.post("/upload", status_code=201)
+@router.post("/upload", status_code=202)
 async def upload_document(
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    tenant: Optional[str] = Query(None, pattern=TENANT_NAME_PATTERN, description="Tenant that owns the document (default DEFAULT_TENANT)"),
+    jobs: IngestionJobQueue = Depends(get_ingestion_jobs)
     # db: AsyncSession = Depends(get_db) # Removed
 ):
     """
     Endpoint to upload a document (PDF, TXT, MD, JSON) for ingestion using Weaviate.
+    Ingestion runs in the background; poll `/api/ingest/jobs/{job_id}` for progress.
     """
     # Extended content types to include markdown and JSON
     supported_content_types = [
@@ -41,35 +53,33 @@ async def upload_document(
             )
     
     try:
-        print(f"Received file for upload: {file.filename}")
-        doc_ids = await ingestion_service.process_file(file) # Removed db argument
-        if not doc_ids:
-            # This could happen if the file was empty or text extraction failed
-            raise HTTPException(
-                status_code=400,
-                detail=f"Could not extract text or process file: {file.filename}"
-            )
-        print(f"File processed successfully: {file.filename}, {len(doc_ids)} chunks stored.")
-        # Return the number of chunks created or their IDs
-        return {"filename": file.filename, "message": f"{len(doc_ids)} chunks ingested successfully.", "doc_ids": doc_ids}
-    except ValueError as ve:
-        # Catch specific errors like unsupported file type from the service
-        raise HTTPException(status_code=400, detail=str(ve))
-    except ConnectionError as ce: # Added to catch Weaviate connection issues
-        print(f"Connection error during file upload processing: {ce}")
-        raise HTTPException(status_code=503, detail=f"Service unavailable: Could not connect to Weaviate. {ce}")
+        logger.info(f"Received file for upload: {file.filename}")
+        job = await jobs.submit(file, tenant)
+        return {
+            "filename": file.filename,
+            "job_id": job.id,
+            "status": job.status,
+            "message": f"{file.filename} queued for ingestion (job {job.id}).",
+        }
+    except TenantNotSupportedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Error during file upload processing: {e}")
+        logger.error(f"Error queueing file upload: {e}")
         # Log the full error details here in a real application
-        raise HTTPException(status_code=500, detail=f"Internal server error processing file: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error queueing file: {e}")
 
-@router.post("/upload-batch", status_code=201)
+@router.post("/upload-batch", status_code=202)
 async def upload_multiple_documents(
-    files: List[UploadFile] = File(...)
+    files: List[UploadFile] = File(...),
+    parallelism: Optional[int] = Query(None, ge=1, description="Files of this batch processed at once (default INGEST_BATCH_PARALLELISM)"),
+    tenant: Optional[str] = Query(None, pattern=TENANT_NAME_PATTERN, description="Tenant that owns the documents (default DEFAULT_TENANT)"),
+    jobs: IngestionJobQueue = Depends(get_ingestion_jobs)
     # db: AsyncSession = Depends(get_db) # Removed
 ):
     """
     Endpoint to upload multiple documents (PDF, TXT, MD, JSON) for batch ingestion using Weaviate.
+    Each file becomes its own background job; up to `parallelism` files of the batch run at once,
+    parsing PDFs in the process pool and sharing the embedding rate limits and the vector-store batch writer.
     """
     if not files or len(files) == 0:
         raise HTTPException(
@@ -77,69 +87,99 @@ async def upload_multiple_documents(
             detail="No files provided for upload"
         )
     
-    results = []
+    accepted_files = []
     errors = []
-    total_chunks = 0
     
-    # Process each file in the batch
+    # Check each file in the batch
     for file in files:
-        print(f"Attempting to process in batch: {file.filename}, content_type: {file.content_type}")
-        try:
-            # Extended content types to include markdown and JSON
-            supported_content_types = [
-                "application/pdf", 
-                "text/plain", 
-                "text/markdown", 
-                "application/json",
-                "text/json"
-            ]
-            
-            # Check content type or file extension
-            is_supported = (
-                file.content_type in supported_content_types or
-                file.content_type and file.content_type.startswith("text") or
-                file.filename and (
-                    file.filename.endswith(".pdf") or
-                    file.filename.endswith(".txt") or
-                    file.filename.endswith(".md") or
-                    file.filename.endswith(".json")
-                )
+        logger.info(f"Attempting to queue in batch: {file.filename}, content_type: {file.content_type}")
+        # Extended content types to include markdown and JSON
+        supported_content_types = [
+            "application/pdf", 
+            "text/plain", 
+            "text/markdown", 
+            "application/json",
+            "text/json"
+        ]
+        
+        # Check content type or file extension
+        is_supported = (
+            file.content_type in supported_content_types or
+            file.content_type and file.content_type.startswith("text") or
+            file.filename and (
+                file.filename.endswith(".pdf") or
+                file.filename.endswith(".txt") or
+                file.filename.endswith(".md") or
+                file.filename.endswith(".json")
             )
-            
-            if not is_supported:
-                errors.append({
-                    "filename": file.filename,
-                    "error": f"Unsupported file type: {file.content_type}"
-                })
-                continue
-                
-            # Process file
-            doc_ids = await ingestion_service.process_file(file) # Removed db argument
-            
-            if not doc_ids:
-                errors.append({
-                    "filename": file.filename,
-                    "error": "Could not extract text or process file"
-                })
-            else:
-                results.append({
-                    "filename": file.filename,
-                    "chunks": len(doc_ids),
-                    "doc_ids": doc_ids
-                })
-                total_chunks += len(doc_ids)
-                print(f"File processed successfully: {file.filename}, {len(doc_ids)} chunks stored.")
+        )
         
-        except Exception as e:
-            print(f"Error processing file {file.filename}: {e}")
+        if not is_supported:
             errors.append({
                 "filename": file.filename,
-                "error": str(e)
+                "error": f"Unsupported file type: {file.content_type}"
             })
+            continue
+        accepted_files.append(file)
+
+    if not accepted_files:
+        return {
+            "message": f"Batch rejected. 0 files queued for ingestion, {len(errors)} rejected.",
+            "batch_id": None,
+            "queued_files": [],
+            "failed_files": errors
+        }
+
+    try:
+        batch = await jobs.submit_batch(accepted_files, parallelism or settings.INGEST_BATCH_PARALLELISM, tenant)
+    except TenantNotSupportedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error queueing batch upload: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error queueing batch: {e}")
     
     # Return results summary
     return {
-        "message": f"Batch processing complete. {len(results)} files processed successfully, {len(errors)} failed. {total_chunks} total chunks ingested.",
-        "successful_files": results,
+        "message": f"Batch queued. {len(batch.jobs)} files queued for ingestion, {len(errors)} rejected.",
+        "batch_id": batch.id,
+        "queued_files": [
+            {"filename": job.filename, "job_id": job.id, "status": job.status}
+            for job in batch.jobs
+        ],
         "failed_files": errors
     }
+
+@router.get("/batches/{batch_id}")
+async def get_ingestion_batch(
+    batch_id: str,
+    jobs: IngestionJobQueue = Depends(get_ingestion_jobs)
+):
+    """
+    Aggregated progress of a batch upload, with per-file job details.
+    """
+    batch = jobs.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion batch not found: {batch_id}")
+    return batch.to_dict()
+
+@router.get("/jobs")
+async def list_ingestion_jobs(
+    jobs: IngestionJobQueue = Depends(get_ingestion_jobs)
+):
+    """
+    Lists recent ingestion jobs (newest first) with queue statistics.
+    """
+    return {**jobs.stats(), "recent": [job.to_dict() for job in jobs.recent()[:100]]}
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(
+    job_id: str,
+    jobs: IngestionJobQueue = Depends(get_ingestion_jobs)
+):
+    """
+    Reports the stage, chunk counters, throughput and errors of an ingestion job.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job not found: {job_id}")
+    return job.to_dict()
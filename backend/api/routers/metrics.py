@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends
+
+from backend.api.dependencies import get_loop_monitor
+from backend.core.embedding_cache import query_embedding_cache
+from backend.core.loop_monitor import EventLoopMonitor
+from backend.core.config import settings
+from backend.core.tenants import tenant_manager
+from backend.services import agent_service
+from backend.services.answer_cache import answer_cache
+from backend.services.rerank_service import get_reranker
+from backend.services.session_store import session_store
+
+router = APIRouter()
+
+@router.get("/embedding-cache")
+async def embedding_cache_stats():
+    """
+    Hit/miss counters and footprint of the query-embedding cache.
+    """
+    if query_embedding_cache is None:
+        return {"enabled": False}
+    return query_embedding_cache.stats()
+
+@router.delete("/embedding-cache", status_code=204)
+async def clear_embedding_cache():
+    """
+    Drops every cached query embedding (all tiers).
+    """
+    if query_embedding_cache is not None:
+        query_embedding_cache.clear()
+
+@router.get("/event-loop")
+async def event_loop_stats(monitor: EventLoopMonitor = Depends(get_loop_monitor)):
+    """
+    How long the event loop has been blocked, measured by a periodic sleep probe.
+    """
+    return monitor.stats()
+
+@router.get("/retrieval")
+async def retrieval_stats():
+    """
+    Agent retrieval mode and how fused HyDE retrievals ended (fused, over budget, failed).
+    """
+    return {
+        "mode": settings.RETRIEVAL_MODE,
+        "hyde_latency_budget_seconds": settings.HYDE_LATENCY_BUDGET_SECONDS,
+        **agent_service.retrieval_stats,
+    }
+
+@router.get("/rerank")
+async def rerank_stats():
+    """
+    Reranking stage: scorer, micro-batch sizes and per-request rerank latency.
+    """
+    reranker = get_reranker()
+    if reranker is None:
+        return {"enabled": False}
+    return reranker.stats()
+
+@router.get("/tenants")
+async def tenant_stats():
+    """
+    Tenants active in this process and how many were created, reactivated and deactivated.
+    """
+    return tenant_manager.stats()
+
+@router.get("/answer-cache")
+async def answer_cache_stats():
+    """
+    Hit/miss and invalidation counters of the semantic answer cache.
+    """
+    if answer_cache is None:
+        return {"enabled": False}
+    return answer_cache.stats()
+
+@router.delete("/answer-cache", status_code=204)
+async def clear_answer_cache():
+    """
+    Drops every cached answer.
+    """
+    if answer_cache is not None:
+        answer_cache.clear()
+
+@router.get("/sessions")
+async def session_stats():
+    """
+    Conversation memory footprint: sessions held, largest history and summaries made.
+    """
+    return session_store.stats()
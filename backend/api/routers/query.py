@@ -1,29 +1,88 @@
-from fastapi import APIRouter, HTTPException # Removed Depends
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 # from core.database import get_db, WeaviateDBService # Removed
+from backend.api.dependencies import get_store
+from backend.core.tenants import TENANT_NAME_PATTERN, TenantNotSupportedError
+from backend.core.vector_store import VectorStore
 from backend.services import agent_service # Ensure backend. prefix
+from backend.services.session_store import session_store
 from backend.schemas.document import QueryRequest, QueryResponse # Ensure backend. prefix
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+async def _check_tenant(request: QueryRequest, store: VectorStore):
+    """Rejects a tenant the store cannot keep apart instead of answering from everyone's documents."""
+    try:
+        await store.acheck_tenant(request.tenant)
+    except TenantNotSupportedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/ask", response_model=QueryResponse)
 async def ask_question(
-    request: QueryRequest
+    request: QueryRequest,
+    store: VectorStore = Depends(get_store)
     # db: WeaviateDBService = Depends(get_db) # Removed
 ):
     """
     Endpoint to ask a question to the JARVIS agent using Weaviate backend.
     The agent will use the ingested documents to formulate an answer.
     """
+    await _check_tenant(request, store)
     try:
-        print(f"Received question: {request.question}")
+        logger.info(f"Received question: {request.question}")
+        session = await session_store.get(request.session_id, request.tenant)
         # Call answer_question without the db argument
-        answer, sources, thought_process = await agent_service.answer_question(request.question)
-        print(f"Generated answer: {answer}")
-        return QueryResponse(answer=answer, sources=sources, thought_process=thought_process)
+        answer, sources, thought_process, route = await agent_service.answer_question(request.question, chat_history=session.messages(), alpha=request.alpha, filters=request.filters, tenant=request.tenant)
+        logger.info(f"Generated answer: {answer}")
+        await session_store.append_turn(session.session_id, request.question, answer, request.tenant)
+        return QueryResponse(answer=answer, sources=sources, thought_process=thought_process, session_id=session.session_id, route=route)
     except ConnectionError as ce: # Added to catch Weaviate connection issues from underlying services
-        print(f"Connection error during question answering: {ce}")
+        logger.error(f"Connection error during question answering: {ce}")
         raise HTTPException(status_code=503, detail=f"Service unavailable: Could not connect to Weaviate. {ce}")
     except Exception as e:
-        print(f"Error during question answering: {e}")
+        logger.error(f"Error during question answering: {e}")
         # Log the full error details here in a real application
         raise HTTPException(status_code=500, detail=f"Internal server error answering question: {e}")
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: QueryRequest, store: VectorStore = Depends(get_store)):
+    """
+    Streams the answer as Server-Sent Events: the chosen `route`, agent reasoning (`thought`), tool calls
+    (`tool_start`, `tool_end`), retrieved `sources`, final-answer `token`s and a closing
+    `final` event carrying the same fields as `/ask`.
+    """
+    await _check_tenant(request, store)
+    logger.info(f"Received streaming question: {request.question}")
+    session = await session_store.get(request.session_id, request.tenant)
+
+    async def event_stream():
+        yield f"event: session\ndata: {json.dumps({'session_id': session.session_id})}\n\n"
+        async for event in agent_service.stream_answer(request.question, chat_history=session.messages(), alpha=request.alpha, filters=request.filters, tenant=request.tenant):
+            data = event["data"]
+            if event["event"] == "final":
+                data = {**data, "session_id": session.session_id}
+                await session_store.append_turn(session.session_id, request.question, data["answer"], request.tenant)
+            yield f"event: {event['event']}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Keep proxies from buffering the stream
+    )
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def delete_session(
+    session_id: str,
+    tenant: Optional[str] = Query(None, pattern=TENANT_NAME_PATTERN, description="Tenant that started the session (default DEFAULT_TENANT)"),
+):
+    """
+    Forgets a conversation of `tenant`, including its persisted history.
+    """
+    await session_store.delete(session_id, tenant)
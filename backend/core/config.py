@@ -2,18 +2,116 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 
 class Settings(BaseSettings):
-    OPENAI_API_KEY: str
-    DATABASE_URL: str
+    OPENAI_API_KEY: Optional[str] = None  # Required unless both providers are local stand-ins
+    DATABASE_URL: Optional[str] = None  # Unused by the RAG pipeline
     EMBEDDING_MODEL: str = "text-embedding-ada-002"
     LLM_MODEL: str = "gpt-4o"
-    EMBEDDING_DIM: int = 1536 # Dimension for text-embedding-ada-002
+    EMBEDDING_DIM: Optional[int] = None # Output dimensions for text-embedding-3-* models (e.g. 256, 512); None = the model's native size
     TAVILY_API_KEY: Optional[str] = None
+
+    # Model providers: "openai" calls the API; the local stand-ins are deterministic and need no network
+    EMBEDDING_PROVIDER: str = "openai"  # "openai" or "hash" (feature-hashed words and trigrams, EMBEDDING_DIM or the model's size)
+    LLM_PROVIDER: str = "openai"  # "openai" or "scripted" (canned ReAct-format replies with simulated latency)
+    FAKE_EMBEDDING_LATENCY_MS: float = 0.0  # hash: simulated latency per embedding request
+    FAKE_LLM_LATENCY_MS: float = 400.0  # scripted: median time to first token
+    FAKE_LLM_LATENCY_SIGMA: float = 0.5  # scripted: log-normal spread of the time to first token; 0 = fixed
+    FAKE_LLM_TOKENS_PER_SECOND: float = 60.0  # scripted: streaming rate after the first token
+    FAKE_LLM_ANSWER_WORDS: int = 60  # scripted: words quoted from the context into an answer
+    FAKE_PROVIDER_SEED: Optional[int] = 0  # Seeds the simulated latencies; None = unseeded
+
+    # Embedding request scheduling (match these to your OpenAI tier limits)
+    EMBEDDING_MAX_CONCURRENCY: int = 8  # Embedding requests in flight at once
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 3000
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1_000_000
+    EMBEDDING_MAX_BATCH_TOKENS: int = 100_000  # Per request; OpenAI caps a request at 300k tokens
+    EMBEDDING_MAX_BATCH_SIZE: int = 1000  # Inputs per request (OpenAIEmbeddings' own chunk_size)
+    EMBEDDING_MAX_RETRIES: int = 6  # Retries after 429 responses, with jittered exponential backoff
+
+    # Streaming ingestion
+    INGEST_WINDOW_CHUNKS: int = 500  # Chunks embedded and flushed to Weaviate together; bounds memory per file
+    INGEST_READ_BLOCK_BYTES: int = 1024 * 1024  # Read size for text and JSON uploads
+    INGEST_WORKERS: int = 4  # Background ingestion jobs processed concurrently
+    INGEST_JOB_HISTORY: int = 1000  # Finished jobs kept for the progress API
+    INGEST_SPOOL_DIR: Optional[str] = None  # Where queued uploads are spooled; None uses the system temp dir
+    INGEST_BATCH_PARALLELISM: int = 4  # Default files of one /upload-batch request processed at once
+    INGEST_PROCESS_WORKERS: Optional[int] = None  # Process pool for CPU-bound parsing; None uses the CPU count
+    INGEST_WRITER_BATCH_OBJECTS: int = 2000  # Max objects the shared batch writer coalesces per flush
+    INGEST_PDF_PAGES_PER_TASK: int = 16  # PDF pages parsed per process-pool task; one task per worker is in flight
+    INGEST_JSON_ITEMS_PER_STEP: int = 256  # JSON array items decoded per worker-thread step
+    INGEST_OFFLOAD_SPLIT_MIN_CHARS: int = 32_000  # Text buffers at least this long are split in the process pool
+    SEARCH_MODE: str = "hybrid"  # Weaviate query: "hybrid" (BM25 + vector, fused server-side) or "vector"
+    HYBRID_ALPHA: float = 0.5  # Hybrid weighting: 1 = pure vector, 0 = pure BM25; QueryRequest.alpha overrides it
+    WEAVIATE_CONTENT_TOKENIZATION: str = "word"  # BM25 tokenization of `content` for new collections ("word", "whitespace", "lowercase", "trigram", ...)
+    RERANK_ENABLED: bool = True  # Over-fetch candidates and rerank them before keeping the top k
+    RERANK_MODEL: Optional[str] = None  # Local cross-encoder (needs sentence-transformers), e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"; None uses the lexical BM25 scorer
+    RERANK_CANDIDATES: int = 40  # Candidates fetched from Weaviate per search when reranking
+    RERANK_BATCH_MAX_PAIRS: int = 256  # Query/passage pairs scored together across concurrent requests
+    RERANK_BATCH_WAIT_MS: float = 5.0  # How long the first request of a micro-batch waits for others
+    RETRIEVAL_MODE: str = "fusion"  # Agent retrieval tool: "direct" (raw query), "hyde", or "fusion" (both, concurrently, merged by RRF)
+    HYDE_LATENCY_BUDGET_SECONDS: Optional[float] = 2.0  # In fusion mode, return raw-query results if HyDE takes longer; None always waits
+    RRF_K: int = 60  # Reciprocal rank fusion constant; larger values flatten rank differences
+    QUERY_ROUTER_ENABLED: bool = True  # Route simple knowledge-base questions past the ReAct agent
+    QUERY_ROUTER_MODEL: Optional[str] = None  # Small model for questions the heuristics leave open, e.g. "gpt-4o-mini"
+    QUERY_FAST_PATH_TOP_K: int = 4  # Chunks retrieved for the single retrieve-then-answer chain
+    AGENT_VERBOSE: bool = False  # Print the agent's full chain trace to stdout
+    ANSWER_CACHE_ENABLED: bool = True  # Serve repeated and near-duplicate questions from cached answers
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Min cosine similarity between question embeddings for a hit
+    ANSWER_CACHE_TTL_SECONDS: Optional[float] = 24 * 3600  # None keeps answers until evicted or invalidated
+    SESSION_MAX_SESSIONS: int = 1000  # Conversations kept in memory (LRU)
+    SESSION_HISTORY_TOKEN_BUDGET: int = 1500  # Per-session history tokens before older turns are summarized
+    SESSION_RECENT_TURNS: int = 2  # Latest turns always kept verbatim
+    SESSION_TTL_SECONDS: Optional[float] = 24 * 3600  # Idle sessions older than this start over; None keeps them
+    SESSION_STORE_PATH: Optional[str] = None  # SQLite file persisting sessions, e.g. "backend/.cache/sessions.sqlite3"
+    EVENT_LOOP_MONITOR_INTERVAL_SECONDS: float = 0.1  # How often the event-loop lag probe runs; 0 disables it
+    EVENT_LOOP_LAG_WARNING_SECONDS: float = 0.25  # Lag above this is logged as a blocked event loop
+
+    # Logging and telemetry
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json" (one object per line, for log shippers)
+    METRICS_ENABLED: bool = True  # Stage latency histograms and token counters, served at /metrics
+    TRACING_OTLP_ENDPOINT: Optional[str] = None  # Export spans as OpenTelemetry traces over OTLP/HTTP, e.g. "http://localhost:4318/v1/traces" (needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http)
+    TRACING_SERVICE_NAME: str = "jarvis-backend"
+
+    # Query embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Memory tier bound (float32 vectors + keys)
+    EMBEDDING_CACHE_TTL_SECONDS: Optional[float] = 7 * 24 * 3600  # None disables expiry
+    EMBEDDING_CACHE_DISK_PATH: Optional[str] = None  # SQLite file for a restart-surviving tier, e.g. "backend/.cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 200_000  # Disk tier bound; the oldest entries are pruned past it
     
+    # Vector store
+    VECTOR_STORE: str = "weaviate"  # "weaviate" or "local" (embedded NumPy + SQLite store; no Weaviate needed)
+    LOCAL_STORE_PATH: str = "backend/.data/vector_store"  # Directory of the local store
+    LOCAL_STORE_IVF_MIN_VECTORS: int = 50_000  # Local store: exact scan below this many vectors, IVF index from here on
+    LOCAL_STORE_IVF_PROBES: int = 16  # IVF lists scanned per query; more = better recall, slower
+    LOCAL_STORE_SCAN_BATCH: int = 65_536  # Vectors scored per matrix product
+
     # Weaviate Cloud settings
     WEAVIATE_URL: str = "20nylijqkocr7uq8hfjva.c0.asia-southeast1.gcp.weaviate.cloud"  # Replace with your actual Weaviate Cloud URL
     WEAVIATE_API_KEY: Optional[str] = None  # Will be set from .env file
     WEAVIATE_INDEX_NAME: str = "Documents"  # Collection name in Weaviate
     WEAVIATE_GRPC_ENABLED: bool = True  # Enable gRPC for v4 client
+    WEAVIATE_POOL_SIZE: int = 4  # Max idle clients kept per pool (and max async clients)
+    WEAVIATE_ASYNC_REQUESTS_PER_CLIENT: int = 16  # Concurrent requests multiplexed over one async client before another is connected
+    WEAVIATE_INSERT_BATCH_OBJECTS: int = 500  # Objects per async insert_many request; the requests of one flush are sent concurrently
+    WEAVIATE_POOL_IDLE_TIMEOUT_SECONDS: float = 300.0  # Pooled clients idle longer than this are closed
+    WEAVIATE_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0  # Re-check readiness of a pooled client after this long
+    HNSW_EF: int = -1  # Search candidate list size; -1 = dynamic (limit * HNSW_DYNAMIC_EF_FACTOR, clamped to min/max)
+    HNSW_DYNAMIC_EF_MIN: int = 100
+    HNSW_DYNAMIC_EF_MAX: int = 500
+    HNSW_DYNAMIC_EF_FACTOR: int = 8
+    HNSW_EF_CONSTRUCTION: int = 128  # Build-time candidate list size; fixed when the collection is created
+    HNSW_MAX_CONNECTIONS: int = 32  # Graph edges per node; fixed when the collection is created
+    VECTOR_QUANTIZATION: str = "none"  # "none", "pq" (product), "bq" (binary) or "sq" (scalar); compressed vectors stay in memory
+    QUANTIZATION_RESCORE_LIMIT: int = 200  # bq/sq: candidates rescored with the uncompressed vectors
+    PQ_SEGMENTS: Optional[int] = None  # PQ segments per vector; None lets Weaviate choose
+    PQ_TRAINING_LIMIT: int = 100_000  # Objects used to train the PQ codebook
+    WEAVIATE_MULTI_TENANCY: bool = True  # New collections get one index per tenant; single-tenant collections reject non-default tenants
+    DEFAULT_TENANT: str = "default"  # Tenant of requests that do not name one
+    TENANT_IDLE_SECONDS: Optional[float] = 3600.0  # Tenants unused this long are deactivated; None keeps them active
+    TENANT_IDLE_STATUS: str = "INACTIVE"  # "INACTIVE" (unloaded from memory) or "OFFLOADED" (moved to cloud storage; needs an offload module)
+    TENANT_SWEEP_INTERVAL_SECONDS: float = 300.0  # How often idle tenants are looked for
 
     class Config:
         env_file = "backend/.env" # Adjusted path
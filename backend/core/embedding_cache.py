@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Normalizes text for cache keys: trims, collapses whitespace and lowercases."""
+    return " ".join(text.split()).lower()
+
+def make_cache_key(text: str, model: Optional[str] = None) -> str:
+    """Builds the cache key for (embedding model, normalized text)."""
+    if model is None:
+        model = settings.EMBEDDING_MODEL
+        if settings.EMBEDDING_DIM:
+            model = f"{model}@{settings.EMBEDDING_DIM}" # Shortened vectors of the same model are not interchangeable
+        if settings.EMBEDDING_PROVIDER != "openai":
+            model = f"{settings.EMBEDDING_PROVIDER}:{model}" # Stand-in vectors never mix with real ones
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+# --- Cache tiers --- #
+# A tier only needs `get(key)`, `set(key, vector)` and `clear()`; EmbeddingCache checks
+# tiers in order and back-fills faster tiers on a hit in a slower one. Tiers that do I/O
+# set `blocking`, and EmbeddingCache calls them in a worker thread instead of on the event loop.
+
+class MemoryEmbeddingCache:
+    """In-memory LRU tier bounded by the bytes held in vectors, with per-entry TTL."""
+    blocking = False
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float]):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[array, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(key: str, vector: array) -> int:
+        return vector.itemsize * len(vector) + len(key)
+
+    def _evict(self, key: str):
+        vector, _ = self._entries.pop(key)
+        self.current_bytes -= self._entry_size(key, vector)
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, expires_at = entry
+            if expires_at and expires_at < time.time():
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return vector.tolist()
+
+    def set(self, key: str, vector: List[float]):
+        stored = array("f", vector) # float32 halves the footprint; embeddings are float32 upstream anyway
+        size = self._entry_size(key, stored)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (stored, expires_at)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+
+class SQLiteEmbeddingCache:
+    """
+    Disk tier backed by SQLite so cached embeddings survive restarts. Holds at most `max_entries`;
+    past that the oldest entries are pruned, down to `prune_fraction` of the limit at once.
+    """
+    blocking = True
+
+    def __init__(self, path: str, ttl_seconds: Optional[float], max_entries: int, prune_fraction: float = 0.9):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prune_fraction = prune_fraction
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self._prune()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            blob, created_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds < time.time():
+                self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                return None
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def set(self, key: str, vector: List[float]):
+        with self._lock:
+            replaced = self._conn.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, array("f", vector).tobytes(), time.time()),
+            )
+            self._conn.commit()
+            if not replaced:
+                self._count += 1
+            self._prune()
+
+    def _prune(self):
+        """Deletes the oldest entries once over `max_entries`. Called with the lock held (or from __init__)."""
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - int(self.max_entries * self.prune_fraction)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY created_at LIMIT ?)", (excess,)
+        )
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        logger.info(f"Pruned the embedding disk cache to {self._count} entries (limit {self.max_entries}).")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": self._count, "max_entries": self.max_entries}
+
+
+class EmbeddingCache:
+    """
+    Tiered embedding cache keyed by (EMBEDDING_MODEL, normalized text).
+    Concurrent misses for the same key share a single embedding call. Blocking tiers
+    (SQLite) are read and written in a worker thread, never on the event loop.
+    """
+    def __init__(self, tiers: list):
+        self.tiers = tiers
+        self.hits = [0] * len(tiers)
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    async def _call(tier, method: str, *args):
+        if tier.blocking:
+            return await asyncio.to_thread(getattr(tier, method), *args)
+        return getattr(tier, method)(*args)
+
+    async def lookup(self, key: str) -> Optional[List[float]]:
+        for index, tier in enumerate(self.tiers):
+            try:
+                vector = await self._call(tier, "get", key)
+            except Exception as e:
+                logger.warning(f"Embedding cache tier {type(tier).__name__} lookup failed: {e}")
+                continue
+            if vector is not None:
+                self.hits[index] += 1
+                await self.store(key, vector, self.tiers[:index])
+                return vector
+        return None
+
+    async def store(self, key: str, vector: List[float], tiers: Optional[list] = None):
+        for tier in self.tiers if tiers is None else tiers:
+            try:
+                await self._call(tier, "set", key, vector)
+            except Exception as e:
+                logger.warning(f"Embedding cache tier {type(tier).__name__} write failed: {e}")
+
+    async def get_or_embed(self, text: str, embed: Callable[[str], Awaitable[List[float]]]) -> List[float]:
+        """Returns the cached embedding for `text`, calling `embed` only on a miss."""
+        key = make_cache_key(text)
+        vector = await self.lookup(key)
+        if vector is not None:
+            return vector
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            vector = await embed(text)
+            future.set_result(vector) # Waiters need not wait for the disk write
+            await self.store(key, vector)
+            return vector
+        except BaseException as e:
+            if not future.done(): # Cancelled while writing the result to disk: waiters already have it
+                future.set_exception(e)
+                future.exception() # Mark retrieved so waiter-less failures are not logged as unhandled
+            raise
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, object]:
+        lookups = sum(self.hits) + self.misses
+        return {
+            "enabled": True,
+            "model": settings.EMBEDDING_MODEL,
+            "hits": sum(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits) / lookups if lookups else 0.0,
+            "tiers": [
+                {"name": type(tier).__name__, "hits": hits, **tier.stats()}
+                for tier, hits in zip(self.tiers, self.hits)
+            ],
+        }
+
+def build_embedding_cache() -> Optional[EmbeddingCache]:
+    """Builds the cache configured in Settings, or None when caching is disabled."""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    tiers: list = [MemoryEmbeddingCache(settings.EMBEDDING_CACHE_MAX_BYTES, settings.EMBEDDING_CACHE_TTL_SECONDS)]
+    if settings.EMBEDDING_CACHE_DISK_PATH:
+        try:
+            tiers.append(SQLiteEmbeddingCache(
+                settings.EMBEDDING_CACHE_DISK_PATH, settings.EMBEDDING_CACHE_TTL_SECONDS, settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES
+            ))
+        except Exception as e:
+            logger.error(f"Could not open embedding cache at {settings.EMBEDDING_CACHE_DISK_PATH}: {e}. Using memory tier only.")
+    return EmbeddingCache(tiers)
+
+query_embedding_cache: Optional[EmbeddingCache] = build_embedding_cache()
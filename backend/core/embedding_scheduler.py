@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+import time
+from typing import List, Optional
+
+import openai
+from langchain_core.embeddings import Embeddings
+
+from backend.core.config import settings
+from backend.core.providers import build_embeddings
+from backend.core.telemetry import embedding_tokens, observe, span
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError: # tiktoken is a declared dependency, but fall back to a rough estimate without it
+    tiktoken = None
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` units per minute."""
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(float(amount), self.capacity) # Oversized requests wait for a full bucket instead of forever
+        async with self._lock: # Waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+class EmbeddingScheduler:
+    """
+    Runs embedding requests concurrently within OpenAI rate limits.
+    Texts are packed into batches by token count, each batch waits on both the
+    requests/min and tokens/min buckets, at most `max_concurrency` requests are in
+    flight, and 429 responses are retried with jittered exponential backoff.
+    """
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_batch_tokens: int,
+        max_batch_size: int,
+        max_retries: int,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 60.0,
+        exact_token_counts: bool = True,
+    ):
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+        self.model = model
+        self._encoding = None
+        self._encoding_loaded = not exact_token_counts # Without tiktoken, tokens are estimated from the length
+
+    def _get_encoding(self):
+        # Loaded on first use: tiktoken may download encoding files, which must not happen at import time
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            if tiktoken is not None:
+                try:
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model)
+                    except KeyError:
+                        self._encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logger.warning(f"Could not load tiktoken encoding for {self.model}: {e}. Estimating token counts.")
+        return self._encoding
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return max(1, len(text) // 4)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """Greedily packs text indices into batches under the token and size limits, preserving order."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _with_limits(self, tokens: int, call, stage: str):
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            async with self._semaphore:
+                await self._request_bucket.acquire(1)
+                await self._token_bucket.acquire(tokens)
+                observe("embedding_rate_limit_wait", time.perf_counter() - waited)
+                try:
+                    with span(stage, tokens=tokens):
+                        result = await call()
+                    if settings.METRICS_ENABLED:
+                        embedding_tokens.inc(tokens, self.model)
+                    return result
+                except Exception as e:
+                    if not _is_rate_limit_error(e) or attempt >= self.max_retries:
+                        raise
+            # Back off outside the semaphore so other batches keep their slots
+            delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+            attempt += 1
+            logger.warning(f"Embedding request rate limited. Retry {attempt}/{self.max_retries} in {delay:.2f}s.")
+            await asyncio.sleep(delay)
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds `texts` in concurrent, rate-limited batches. Output order matches input order."""
+        if not texts:
+            return []
+        batches = self.pack_batches(texts)
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches.")
+
+        async def run_batch(indices: List[int]) -> List[List[float]]:
+            batch_texts = [texts[i] for i in indices]
+            tokens = sum(self.count_tokens(text) for text in batch_texts)
+            return await self._with_limits(tokens, lambda: self.embeddings.aembed_documents(batch_texts), "embedding_batch")
+
+        results = await asyncio.gather(*(run_batch(indices) for indices in batches))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for indices, batch_vectors in zip(batches, results):
+            for index, vector in zip(indices, batch_vectors):
+                vectors[index] = vector
+        return vectors
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embeds a single query under the same limits as document batches."""
+        return await self._with_limits(self.count_tokens(text), lambda: self.embeddings.aembed_query(text), "embedding_request")
+
+
+embeddings_model = build_embeddings()
+
+# Shared by ingestion and retrieval so both draw from the same rate-limit budget
+embedding_scheduler = EmbeddingScheduler(
+    embeddings=embeddings_model,
+    model=settings.EMBEDDING_MODEL,
+    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+    requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE,
+    max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_retries=settings.EMBEDDING_MAX_RETRIES,
+    exact_token_counts=settings.EMBEDDING_PROVIDER == "openai", # tiktoken may need to download its encoding
+)
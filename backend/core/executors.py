@@ -0,0 +1,33 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def process_pool_size() -> int:
+    return settings.INGEST_PROCESS_WORKERS or os.cpu_count() or 1
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process-wide pool used for CPU-bound ingestion work (PDF parsing etc.).
+    Workers are spawned rather than forked, since forking a process that already runs
+    an event loop and client threads is unsafe.
+    """
+    global _process_pool
+    if _process_pool is None:
+        workers = process_pool_size()
+        _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"Started ingestion process pool with {workers} workers.")
+    return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
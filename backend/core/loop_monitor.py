@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class EventLoopMonitor:
+    """
+    Measures how long the event loop is blocked. A probe task sleeps for `interval`
+    seconds and records how late it wakes up; that lag is time the loop spent running
+    something else without yielding (e.g. CPU-bound parsing on the loop thread).
+    """
+    def __init__(self, interval: float, warning_threshold: float, window: int = 600):
+        self.interval = interval
+        self.warning_threshold = warning_threshold
+        self.samples = 0
+        self.blocked_count = 0 # Probes whose lag exceeded warning_threshold
+        self.total_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="event-loop-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def record(self, lag: float):
+        self.samples += 1
+        self.total_lag_seconds += lag
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        self._recent.append(lag)
+        if lag > self.warning_threshold:
+            self.blocked_count += 1
+            logger.warning(f"Event loop was blocked for {lag:.3f}s.")
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - started - self.interval))
+
+    def stats(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+
+        def percentile(fraction: float) -> float:
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))] if recent else 0.0
+
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "blocked_count": self.blocked_count,
+            "warning_threshold_seconds": self.warning_threshold,
+            "total_lag_seconds": round(self.total_lag_seconds, 4),
+            "max_lag_seconds": round(self.max_lag_seconds, 4),
+            "recent_p50_lag_seconds": round(percentile(0.5), 4),
+            "recent_p99_lag_seconds": round(percentile(0.99), 4),
+        }
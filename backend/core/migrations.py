@@ -0,0 +1,264 @@
+"""
+Weaviate collection migrations.
+
+Tokenization, searchable indexes and multi-tenancy cannot be changed on an existing
+collection, so older collections are rebuilt: objects are copied, with their stored
+vectors (nothing is re-embedded), into a collection created with the current schema.
+Switching embedding model or dimensions adds a second named vector next to the current
+one and backfills it in place, so queries keep working until the switch.
+
+Run from the repository root:
+    python -m backend.core.migrations hybrid --target Documents_v2   # copy; then point WEAVIATE_INDEX_NAME at it
+    python -m backend.core.migrations hybrid --in-place              # rebuild WEAVIATE_INDEX_NAME under the same name
+    python -m backend.core.migrations multi-tenancy --in-place --tenant acme  # existing objects become tenant "acme"
+    python -m backend.core.migrations vector-index                   # apply HNSW_EF* and VECTOR_QUANTIZATION in place
+    python -m backend.core.migrations embeddings --model text-embedding-3-small --dimensions 512  # add + backfill a vector
+    python -m backend.core.migrations named-vectors --in-place       # keep only EMBEDDING_MODEL's vector (or name an unnamed one)
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import weaviate
+import weaviate.classes as wvc
+from weaviate.classes.tenants import Tenant
+
+from backend.core.config import settings
+from backend.core.embedding_scheduler import EmbeddingScheduler
+from backend.core.providers import build_embeddings
+from backend.core.telemetry import configure_logging
+from backend.core.weaviate_manager import (
+    collection_supports_hybrid, collection_vector_names, create_collection, embedding_vector_name,
+    get_weaviate_client, update_vector_index, vector_index_config,
+)
+
+logger = logging.getLogger(__name__)
+
+TenantPair = Tuple[Optional[str], Optional[str]] # (source tenant, target tenant)
+
+def _collection(client: weaviate.WeaviateClient, name: str, tenant: Optional[str]):
+    collection = client.collections.get(name)
+    return collection.with_tenant(tenant) if tenant else collection
+
+def _is_multi_tenant(client: weaviate.WeaviateClient, name: str) -> bool:
+    config = client.collections.get(name).config.get()
+    return bool(config.multi_tenancy_config and config.multi_tenancy_config.enabled)
+
+def _count(client: weaviate.WeaviateClient, name: str, tenant: Optional[str] = None) -> int:
+    return _collection(client, name, tenant).aggregate.over_all(total_count=True).total_count
+
+def copy_objects(
+    client: weaviate.WeaviateClient,
+    source_name: str,
+    target_name: str,
+    batch_size: int = 200,
+    source_tenant: Optional[str] = None,
+    target_tenant: Optional[str] = None,
+) -> int:
+    """
+    Copies every object of `source_name`, with its vectors and UUID, into `target_name`. Returns the count copied.
+    Named vectors the target does not have are dropped; an unnamed vector becomes the target's EMBEDDING_MODEL vector.
+    """
+    source = _collection(client, source_name, source_tenant)
+    target = _collection(client, target_name, target_tenant)
+    target_vectors = set(collection_vector_names(client, target_name))
+    copied = 0
+    with target.batch.fixed_size(batch_size=batch_size) as batch:
+        for obj in source.iterator(include_vector=True):
+            vectors = obj.vector if isinstance(obj.vector, dict) else {"default": obj.vector}
+            if target_vectors:
+                vector = {name: value for name, value in vectors.items() if name in target_vectors}
+                if "default" in vectors:
+                    vector.setdefault(embedding_vector_name(), vectors["default"])
+            else:
+                vector = vectors.get("default")
+            batch.add_object(properties=obj.properties, vector=vector, uuid=obj.uuid)
+            copied += 1
+            if copied % 10_000 == 0:
+                logger.info(f"Copied {copied} objects from '{source_name}' to '{target_name}'...")
+    failed = target.batch.failed_objects
+    if failed:
+        raise RuntimeError(f"{len(failed)} objects failed to copy into '{target_name}': {failed[0].message}")
+    return copied
+
+def _tenant_pairs(client: weaviate.WeaviateClient, source_name: str, target_name: str, tenant: Optional[str]) -> List[TenantPair]:
+    """Which source tenant is copied into which target tenant; None means the collection is not multi-tenant."""
+    target_multi_tenant = _is_multi_tenant(client, target_name)
+    if _is_multi_tenant(client, source_name):
+        if not target_multi_tenant:
+            raise ValueError(f"'{source_name}' is multi-tenant; set WEAVIATE_MULTI_TENANCY=true to rebuild it.")
+        return [(name, name) for name in client.collections.get(source_name).tenants.get()]
+    return [(None, (tenant or settings.DEFAULT_TENANT) if target_multi_tenant else None)]
+
+def _copy_all(client: weaviate.WeaviateClient, source_name: str, target_name: str, pairs: List[TenantPair], batch_size: int) -> int:
+    copied = 0
+    for source_tenant, target_tenant in pairs:
+        if target_tenant and not client.collections.get(target_name).tenants.exists(target_tenant):
+            client.collections.get(target_name).tenants.create(Tenant(name=target_tenant))
+        copied += copy_objects(client, source_name, target_name, batch_size, source_tenant, target_tenant)
+        if _count(client, target_name, target_tenant) != _count(client, source_name, source_tenant):
+            raise RuntimeError(f"Object counts of '{source_name}' and '{target_name}' differ after copying; '{source_name}' is untouched.")
+    return copied
+
+def rebuild_collection(client: weaviate.WeaviateClient, source_name: str, target_name: str, batch_size: int = 200, tenant: Optional[str] = None) -> int:
+    """
+    Copies `source_name` into a new `target_name` collection created with the current schema.
+    Objects of a single-tenant source go to `tenant` (default DEFAULT_TENANT) when the target is multi-tenant.
+    """
+    if client.collections.exists(target_name):
+        raise ValueError(f"Target collection '{target_name}' already exists.")
+    create_collection(client, target_name)
+    return _copy_all(client, source_name, target_name, _tenant_pairs(client, source_name, target_name, tenant), batch_size)
+
+def migrate_in_place(client: weaviate.WeaviateClient, name: str, batch_size: int = 200, tenant: Optional[str] = None) -> int:
+    """
+    Rebuilds `name` with the current schema under the same name, via a temporary copy.
+    The collection is unavailable between deleting and refilling it.
+    """
+    staging_name = f"{name}_migration{int(time.time())}"
+    copied = rebuild_collection(client, name, staging_name, batch_size, tenant)
+    client.collections.delete(name)
+    create_collection(client, name)
+    try:
+        _copy_all(client, staging_name, name, _tenant_pairs(client, staging_name, name, tenant), batch_size)
+    except Exception:
+        logger.error(f"Refilling '{name}' failed; the data is kept in '{staging_name}'.")
+        raise
+    client.collections.delete(staging_name)
+    return copied
+
+def _all_tenants(client: weaviate.WeaviateClient, name: str) -> List[Optional[str]]:
+    return list(client.collections.get(name).tenants.get()) if _is_multi_tenant(client, name) else [None]
+
+def add_embedding_vector(
+    client: weaviate.WeaviateClient,
+    name: str,
+    model: str,
+    dimensions: Optional[int] = None,
+    batch_size: int = 200,
+) -> int:
+    """
+    Adds a named vector for `model` at `dimensions` to `name` and fills it by re-embedding each
+    object's content. Existing vectors are kept and objects that already have the new vector are
+    skipped, so an interrupted run can be resumed. Returns the count embedded.
+    """
+    existing = collection_vector_names(client, name)
+    if not existing:
+        raise ValueError(
+            f"'{name}' stores a single unnamed vector. Give it a name first (with EMBEDDING_MODEL/EMBEDDING_DIM "
+            f"still matching the stored vectors): python -m backend.core.migrations named-vectors --in-place"
+        )
+    vector_name = embedding_vector_name(model, dimensions)
+    if vector_name not in existing:
+        client.collections.get(name).config.add_vector(
+            vector_config=wvc.config.Configure.Vectors.self_provided(name=vector_name, vector_index_config=vector_index_config())
+        )
+        logger.info(f"Added vector '{vector_name}' to '{name}'.")
+    scheduler = EmbeddingScheduler( # Its own rate-limit budget; run it while ingestion is quiet
+        embeddings=build_embeddings(model, dimensions),
+        model=model,
+        max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+        requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE,
+        max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+        max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+        max_retries=settings.EMBEDDING_MAX_RETRIES,
+    )
+
+    def flush(collection, pending: List[Tuple[object, Dict[str, object], Dict[str, List[float]]]]) -> int:
+        new_vectors = asyncio.run(scheduler.embed_documents([properties.get("content") or "" for _, properties, _ in pending]))
+        with collection.batch.fixed_size(batch_size=batch_size) as batch:
+            for (uuid, properties, vectors), new_vector in zip(pending, new_vectors):
+                batch.add_object(properties=properties, vector={**vectors, vector_name: new_vector}, uuid=uuid) # Replaces the object
+        if collection.batch.failed_objects:
+            raise RuntimeError(f"{len(collection.batch.failed_objects)} objects failed to update: {collection.batch.failed_objects[0].message}")
+        return len(pending)
+
+    embedded = 0
+    for tenant in _all_tenants(client, name):
+        collection = _collection(client, name, tenant)
+        pending = []
+        for obj in collection.iterator(include_vector=True):
+            vectors = dict(obj.vector)
+            if vector_name in vectors:
+                continue
+            pending.append((obj.uuid, obj.properties, vectors))
+            if len(pending) >= batch_size:
+                embedded += flush(collection, pending)
+                pending = []
+                if embedded % 10_000 < batch_size:
+                    logger.info(f"Embedded {embedded} objects of '{name}' with {model}...")
+        if pending:
+            embedded += flush(collection, pending)
+    return embedded
+
+def main():
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="migration", required=True)
+    hybrid = subcommands.add_parser("hybrid", help="Rebuild a collection with a BM25-searchable `content` property")
+    multi_tenancy = subcommands.add_parser("multi-tenancy", help="Rebuild a single-tenant collection as a multi-tenant one")
+    multi_tenancy.add_argument("--tenant", default=settings.DEFAULT_TENANT, help="Tenant that receives the existing objects (default DEFAULT_TENANT)")
+    named_vectors = subcommands.add_parser(
+        "named-vectors", help="Rebuild a collection keeping only the EMBEDDING_MODEL/EMBEDDING_DIM vector (names an unnamed vector)"
+    )
+    for subcommand in (hybrid, multi_tenancy, named_vectors):
+        subcommand.add_argument("--source", default=settings.WEAVIATE_INDEX_NAME, help="Collection to migrate (default WEAVIATE_INDEX_NAME)")
+        target = subcommand.add_mutually_exclusive_group(required=True)
+        target.add_argument("--target", help="New collection to copy into; the source is left untouched")
+        target.add_argument("--in-place", action="store_true", help="Replace the source collection, keeping its name")
+        subcommand.add_argument("--batch-size", type=int, default=200)
+    vector_index = subcommands.add_parser(
+        "vector-index", help="Apply ef, dynamic ef and quantization settings to an existing collection (no copy)"
+    )
+    vector_index.add_argument("--source", default=settings.WEAVIATE_INDEX_NAME, help="Collection to update (default WEAVIATE_INDEX_NAME)")
+    embeddings = subcommands.add_parser(
+        "embeddings", help="Add a named vector for another embedding model or dimension and backfill it (no copy)"
+    )
+    embeddings.add_argument("--source", default=settings.WEAVIATE_INDEX_NAME, help="Collection to update (default WEAVIATE_INDEX_NAME)")
+    embeddings.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    embeddings.add_argument("--dimensions", type=int, default=None, help="Output dimensions (text-embedding-3-* only); default native")
+    embeddings.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    tenant = getattr(args, "tenant", None)
+
+    client = get_weaviate_client()
+    try:
+        if args.migration == "vector-index":
+            update_vector_index(client, args.source) # Enabling a quantizer compresses the existing vectors in the background
+            logger.info(f"Updated the vector index of '{args.source}' (quantization: {settings.VECTOR_QUANTIZATION}).")
+            return
+        if args.migration == "embeddings":
+            started = time.perf_counter()
+            embedded = add_embedding_vector(client, args.source, args.model, args.dimensions, args.batch_size)
+            logger.info(
+                f"Embedded {embedded} objects in {time.perf_counter() - started:.1f}s. Switch queries over with "
+                f"EMBEDDING_MODEL={args.model}" + (f" EMBEDDING_DIM={args.dimensions}" if args.dimensions else "")
+                + ", then drop the old vector with: python -m backend.core.migrations named-vectors --in-place"
+            )
+            return
+        if args.migration == "named-vectors" and collection_vector_names(client, args.source) == [embedding_vector_name()]:
+            logger.info(f"Collection '{args.source}' only holds the '{embedding_vector_name()}' vector. Nothing to do.")
+            return
+        if args.migration == "hybrid" and collection_supports_hybrid(client, args.source):
+            logger.info(f"Collection '{args.source}' already supports hybrid search. Nothing to do.")
+            return
+        if args.migration == "multi-tenancy":
+            if not settings.WEAVIATE_MULTI_TENANCY:
+                parser.error("Set WEAVIATE_MULTI_TENANCY=true first; collections are created from the current settings.")
+            if _is_multi_tenant(client, args.source):
+                logger.info(f"Collection '{args.source}' is already multi-tenant. Nothing to do.")
+                return
+        started = time.perf_counter()
+        if args.in_place:
+            copied = migrate_in_place(client, args.source, args.batch_size, tenant)
+        else:
+            copied = rebuild_collection(client, args.source, args.target, args.batch_size, tenant)
+        logger.info(f"Migrated {copied} objects in {time.perf_counter() - started:.1f}s.")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import asyncio
+import functools
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from backend.core.config import settings
+from backend.core.telemetry import telemetry_callbacks
+
+# --- Embedding dimensions --- #
+
+NATIVE_EMBEDDING_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+def embedding_dimensions(model: Optional[str] = None, dimensions: Optional[int] = None) -> Optional[int]:
+    """Vector length `model` (default EMBEDDING_MODEL) produces at `dimensions` (default EMBEDDING_DIM); None if unknown."""
+    model = model or settings.EMBEDDING_MODEL
+    if dimensions is None and model == settings.EMBEDDING_MODEL:
+        dimensions = settings.EMBEDDING_DIM
+    return dimensions or NATIVE_EMBEDDING_DIMENSIONS.get(model)
+
+def request_dimensions(model: Optional[str] = None, dimensions: Optional[int] = None) -> Optional[int]:
+    """The `dimensions` to send to the API: None at the native size, which text-embedding-ada-002 requires."""
+    model = model or settings.EMBEDDING_MODEL
+    dimensions = embedding_dimensions(model, dimensions)
+    return None if dimensions == NATIVE_EMBEDDING_DIMENSIONS.get(model) else dimensions
+
+# --- Local stand-ins --- #
+# Deterministic replacements for the OpenAI models, so the pipeline can run and be measured
+# without network access. They exercise the same code paths (LangChain interfaces, batching,
+# streaming) with simulated latency instead of real model quality.
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+@functools.lru_cache(maxsize=1 << 16)
+def _feature_bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest[:4], "little") % dimensions, 1.0 if digest[4] & 1 else -1.0
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Feature-hashing embeddings: word unigrams and character trigrams are hashed (with a sign)
+    into `dimensions` buckets and the vector is L2-normalized. Texts that share words end up
+    close together, so retrieval over them behaves plausibly. Same text, same vector.
+    `latency_seconds` is added to every async request to stand in for the API round trip.
+    """
+    def __init__(self, dimensions: int, latency_seconds: float = 0.0):
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        words = _WORD_PATTERN.findall(text.lower())
+        for word in words:
+            index, sign = _feature_bucket(word, self.dimensions)
+            vector[index] += sign
+            for start in range(max(1, len(word) - 2)):
+                index, sign = _feature_bucket(f"#{word[start:start + 3]}", self.dimensions)
+                vector[index] += 0.5 * sign # Sub-word overlap counts, but less than a shared word
+        norm = np.linalg.norm(vector)
+        if norm == 0: # No words: a fixed vector per text
+            index, sign = _feature_bucket(f"\0{text}", self.dimensions)
+            vector[index], norm = sign, 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self.embed_query(text)
+
+
+def _excerpt(text: str, words: int) -> str:
+    return " ".join(text.split()[:words])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that answers the backend's own prompts with canned, well-formed replies:
+    one knowledge-base lookup followed by a Final Answer for the ReAct agent, an answer
+    quoting the context for the retrieval chain, "retrieval" for the query router, and a
+    restated question for HyDE. The time to first token is log-normal (median `latency_ms`,
+    spread `latency_sigma`) and tokens then stream at `tokens_per_second`.
+    """
+    latency_ms: float = 400.0
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 60.0
+    answer_words: int = 60
+    seed: Optional[int] = None
+    _rng: random.Random = PrivateAttr()
+    _rng_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def reply(self, prompt: str) -> str:
+        """The scripted reply to `prompt`."""
+        if "Reply with one word." in prompt and prompt.rstrip().endswith("Route:"):
+            return "retrieval"
+        if "Generate a short, hypothetical answer to the question:" in prompt:
+            question = prompt.split("question:", 1)[1].strip()
+            return f"A likely answer to \"{question}\" would explain {question.rstrip('?').lower()} in a few sentences."
+        if "Final Answer:" in prompt and "Action Input:" in prompt:
+            return self._react_step(prompt)
+        if "Context:" in prompt and "Answer:" in prompt:
+            context = prompt.rsplit("Context:", 1)[1].rsplit("Question:", 1)[0].strip()
+            if not context:
+                return "INSUFFICIENT_CONTEXT"
+            context = re.sub(r"^\[\d+\] ", "", context) # Drop the citation marker of the first chunk
+            return f"According to the knowledge base, {_excerpt(context, self.answer_words)}"
+        return f"This is a scripted reply to: {_excerpt(prompt.strip().splitlines()[-1] if prompt.strip() else '', 20)}"
+
+    def _react_step(self, prompt: str) -> str:
+        question_match = re.search(r"New question: (.*)", prompt)
+        question = question_match.group(1).strip() if question_match else ""
+        scratchpad = prompt.split("New question:", 1)[-1]
+        observations = re.findall(r"Observation: (.*?)(?:\nThought:|$)", scratchpad, re.DOTALL)
+        if observations:
+            observation = observations[-1].strip()
+            if not observation:
+                return "Thought: I now have enough information to answer the question\nFinal Answer: I could not find this in the knowledge base."
+            return (
+                "Thought: I now have enough information to answer the question\n"
+                f"Final Answer: Based on the knowledge base, {_excerpt(observation, self.answer_words)}"
+            )
+        tools = re.search(r"one of \[(.*?)\]", prompt)
+        tool = tools.group(1).split(",")[0].strip() if tools else "knowledge_base"
+        return f"Thought: I should look this up in the knowledge base.\nAction: {tool}\nAction Input: {question}"
+
+    def _first_token_seconds(self) -> float:
+        with self._rng_lock:
+            factor = math.exp(self._rng.gauss(0.0, self.latency_sigma)) if self.latency_sigma > 0 else 1.0
+        return self.latency_ms / 1000 * factor
+
+    def _tokens(self, messages: List[BaseMessage], stop: Optional[List[str]]) -> List[str]:
+        text = self.reply(get_buffer_string(messages) if len(messages) > 1 else str(messages[-1].content))
+        for marker in stop or []:
+            text = text.split(marker, 1)[0]
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def _generate(self, messages, stop=None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages, stop)
+        time.sleep(self._first_token_seconds() + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages, stop)
+        await asyncio.sleep(self._first_token_seconds() + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._first_token_seconds())
+        for index, token in enumerate(self._tokens(messages, stop)):
+            if index:
+                time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._first_token_seconds())
+        for index, token in enumerate(self._tokens(messages, stop)):
+            if index:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+# --- Registry --- #
+# Factories keyed by EMBEDDING_PROVIDER / LLM_PROVIDER. Embedding factories take
+# (model, dimensions); chat factories take (model, temperature, max_tokens).
+
+def _openai_embeddings(model: str, dimensions: Optional[int]) -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY, model=model, dimensions=request_dimensions(model, dimensions))
+
+def _hash_embeddings(model: str, dimensions: Optional[int]) -> Embeddings:
+    return HashEmbeddings(embedding_dimensions(model, dimensions) or 1536, latency_seconds=settings.FAKE_EMBEDDING_LATENCY_MS / 1000)
+
+def _openai_chat(model: str, temperature: float, max_tokens: Optional[int]) -> BaseChatModel:
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model_name=model, temperature=temperature, max_tokens=max_tokens, api_key=settings.OPENAI_API_KEY)
+
+def _scripted_chat(model: str, temperature: float, max_tokens: Optional[int]) -> BaseChatModel:
+    return ScriptedChatModel(
+        latency_ms=settings.FAKE_LLM_LATENCY_MS,
+        latency_sigma=settings.FAKE_LLM_LATENCY_SIGMA,
+        tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+        answer_words=settings.FAKE_LLM_ANSWER_WORDS,
+        seed=settings.FAKE_PROVIDER_SEED,
+    )
+
+EMBEDDING_PROVIDERS: Dict[str, Callable[[str, Optional[int]], Embeddings]] = {
+    "openai": _openai_embeddings,
+    "hash": _hash_embeddings,
+}
+CHAT_PROVIDERS: Dict[str, Callable[[str, float, Optional[int]], BaseChatModel]] = {
+    "openai": _openai_chat,
+    "scripted": _scripted_chat,
+}
+
+def build_embeddings(model: Optional[str] = None, dimensions: Optional[int] = None) -> Embeddings:
+    """Embeddings client for `model` from the EMBEDDING_PROVIDER factory."""
+    try:
+        factory = EMBEDDING_PROVIDERS[settings.EMBEDDING_PROVIDER]
+    except KeyError:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{settings.EMBEDDING_PROVIDER}'; expected one of {sorted(EMBEDDING_PROVIDERS)}.")
+    return factory(model or settings.EMBEDDING_MODEL, dimensions)
+
+def build_chat_model(model: Optional[str] = None, temperature: float = 0, max_tokens: Optional[int] = None) -> BaseChatModel:
+    """Chat model `model` (default LLM_MODEL) from the LLM_PROVIDER factory, timed and token-counted by telemetry."""
+    try:
+        factory = CHAT_PROVIDERS[settings.LLM_PROVIDER]
+    except KeyError:
+        raise ValueError(f"Unknown LLM_PROVIDER '{settings.LLM_PROVIDER}'; expected one of {sorted(CHAT_PROVIDERS)}.")
+    chat_model = factory(model or settings.LLM_MODEL, temperature, max_tokens)
+    chat_model.callbacks = [telemetry_callbacks]
+    return chat_model
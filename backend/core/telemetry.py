@@ -0,0 +1,297 @@
+"""
+Logging setup, per-stage latency spans and Prometheus metrics.
+
+`span(stage)` times a block into the `jarvis_stage_duration_seconds` histogram and, with
+TRACING_OTLP_ENDPOINT set, records it as an OpenTelemetry span. Metrics are kept in process
+and rendered in the Prometheus text format by `render_metrics()` (served at /metrics), so
+no client library is needed; OpenTelemetry is only imported when tracing is configured.
+"""
+import asyncio
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; from a cached lookup to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# --- Logging --- #
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record (LOG_FORMAT="json")."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def configure_logging():
+    """Configures the root logger from LOG_LEVEL and LOG_FORMAT. Modules only create their own loggers."""
+    handler = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+    logging.basicConfig(level=settings.LOG_LEVEL.upper(), handlers=[handler], force=True)
+
+# --- Metrics --- #
+
+def _label_pairs(names: Sequence[str], values: Sequence[str]) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, as Prometheus expects."""
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {} # Labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = _label_pairs(self.label_names, label_values)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative:g}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative:g}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{{{_label_pairs(self.label_names, label_values)}}} {value:g}")
+        return lines
+
+
+stage_duration = Histogram("jarvis_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage", "outcome"))
+http_request_duration = Histogram("jarvis_http_request_duration_seconds", "HTTP request latency until the response is complete.", ("method", "route", "status"))
+llm_tokens = Counter("jarvis_llm_tokens_total", "LLM tokens reported by the provider.", ("model", "type"))
+embedding_tokens = Counter("jarvis_embedding_tokens_total", "Tokens sent to the embedding model (counted or estimated before the request).", ("model",))
+_metrics = [stage_duration, http_request_duration, llm_tokens, embedding_tokens]
+
+def render_metrics() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in _metrics for line in metric.render()) + "\n"
+
+def observe(stage: str, seconds: float, outcome: str = "ok"):
+    """Records a stage duration measured elsewhere."""
+    if settings.METRICS_ENABLED:
+        stage_duration.observe(seconds, stage, outcome)
+
+# --- Tracing --- #
+
+_tracer = None
+_tracer_provider = None
+
+def configure_tracing():
+    """Sets up OTLP trace export when TRACING_OTLP_ENDPOINT is set and OpenTelemetry is installed."""
+    global _tracer, _tracer_provider
+    if not settings.TRACING_OTLP_ENDPOINT or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace # Optional dependency
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.error(f"TRACING_OTLP_ENDPOINT is set but OpenTelemetry is not installed ({e}). Traces are disabled.")
+        return
+    _tracer_provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+    _tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)))
+    _tracer = _tracer_provider.get_tracer("jarvis")
+    logger.info(f"Exporting traces to {settings.TRACING_OTLP_ENDPOINT}")
+
+def shutdown_tracing():
+    """Flushes buffered spans."""
+    global _tracer, _tracer_provider
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+    _tracer = _tracer_provider = None
+
+@contextmanager
+def span(stage: str, **attributes: Any):
+    """
+    Times the enclosed block as `stage`. The outcome label is "ok", "error" or "cancelled".
+    `attributes` (e.g. batch sizes) are attached to the trace span; they are not metric labels.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    if _tracer is not None:
+        trace_span = _tracer.start_as_current_span(stage, attributes={key: value for key, value in attributes.items() if value is not None})
+    else:
+        trace_span = nullcontext()
+    with trace_span:
+        try:
+            yield
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            observe(stage, time.perf_counter() - started, outcome)
+
+# --- LangChain callbacks --- #
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations: # Streamed responses report usage on the message instead
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += usage_metadata.get("input_tokens", 0)
+            completion_tokens += usage_metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    Times LLM calls ("llm_call"), tool calls ("tool:<name>") and ReAct iterations
+    ("agent_iteration": planning plus the tool call it chose), and counts LLM tokens.
+    Attached to the chat models, the agent executor and its tools.
+    """
+    run_inline = True # Cheap bookkeeping; keeps start/end ordering in async runs
+
+    def __init__(self):
+        self._started: Dict[UUID, Tuple[float, str]] = {} # LLM and tool runs -> (start, model or tool name)
+        self._iteration_started: Dict[UUID, float] = {} # Agent executor runs -> start of the current iteration
+
+    def _finish(self, run_id: UUID, prefix: str, outcome: str) -> Optional[str]:
+        started, name = self._started.pop(run_id, (None, None))
+        if started is not None:
+            observe(prefix if prefix == "llm_call" else f"{prefix}:{name}", time.perf_counter() - started, outcome)
+        return name
+
+    def _end_iteration(self, run_id: Optional[UUID], outcome: str = "ok"):
+        started = self._iteration_started.get(run_id) if run_id is not None else None
+        if started is not None:
+            now = time.perf_counter()
+            observe("agent_iteration", now - started, outcome)
+            self._iteration_started[run_id] = now
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._llm_start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._llm_start(run_id, kwargs)
+
+    def _llm_start(self, run_id: UUID, kwargs: Dict[str, Any]):
+        params = kwargs.get("invocation_params") or {}
+        self._started[run_id] = (time.perf_counter(), str(params.get("model") or params.get("model_name") or params.get("_type") or "unknown"))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        model = self._finish(run_id, "llm_call", "ok") or "unknown"
+        if not settings.METRICS_ENABLED:
+            return
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens:
+            llm_tokens.inc(prompt_tokens, model, "prompt")
+        if completion_tokens:
+            llm_tokens.inc(completion_tokens, model, "completion")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id, "llm_call", "cancelled" if isinstance(error, asyncio.CancelledError) else "error")
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, **kwargs):
+        self._iteration_started[run_id] = time.perf_counter()
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._iteration_started.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._iteration_started.pop(run_id, None)
+
+    def on_agent_finish(self, finish, *, run_id: UUID, **kwargs):
+        self._end_iteration(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        self._started[run_id] = (time.perf_counter(), (serialized or {}).get("name") or kwargs.get("name") or "unknown")
+
+    def on_tool_end(self, output, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._finish(run_id, "tool", "ok")
+        self._end_iteration(parent_run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._finish(run_id, "tool", "error")
+        self._end_iteration(parent_run_id, "error")
+
+
+telemetry_callbacks = TelemetryCallbackHandler()
+
+# --- HTTP --- #
+
+class MetricsMiddleware:
+    """ASGI middleware observing request latency until the last body chunk is sent (so streams count in full)."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route") # Set by FastAPI on a match; its template keeps the label set bounded
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), status)
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import weaviate
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TENANT_NAME_PATTERN = r"^[A-Za-z0-9_-]{1,64}$" # Weaviate's tenant name rule
+
+class TenantNotSupportedError(ValueError):
+    """A request named a tenant other than DEFAULT_TENANT, but the store keeps no tenants apart."""
+    def __init__(self, tenant: str):
+        super().__init__(
+            f"Tenant '{tenant}' was requested, but the document collection is not multi-tenant. "
+            f"Omit the tenant, or migrate the collection with: python -m backend.core.migrations multi-tenancy --in-place"
+        )
+        self.tenant = tenant
+
+def check_single_tenant(tenant: Optional[str]):
+    """Raises TenantNotSupportedError unless `tenant` is unset or DEFAULT_TENANT; for stores without tenants."""
+    if tenant and tenant != settings.DEFAULT_TENANT:
+        raise TenantNotSupportedError(tenant)
+
+class TenantManager:
+    """
+    Scopes the document collection to a tenant. Each tenant of a multi-tenant collection
+    has its own HNSW index, so a search only walks that tenant's data. Tenants are created
+    on first use, reactivated when touched again, and deactivated (or offloaded) after
+    `idle_seconds` without use. Collections created without multi-tenancy are used as-is;
+    naming any tenant but the default one raises TenantNotSupportedError there.
+    """
+    def __init__(self, collection_name: str, default_tenant: str, idle_seconds: Optional[float], idle_status: str):
+        self.collection_name = collection_name
+        self.default_tenant = default_tenant
+        self.idle_seconds = idle_seconds
+        self.idle_status = idle_status # "INACTIVE" or "OFFLOADED"
+        self.created = 0
+        self.reactivated = 0
+        self.deactivated = 0
+        self._multi_tenant: Optional[bool] = None
+        self._last_used: Dict[str, float] = {} # Tenants known to be active -> last use (monotonic)
+        self._adopted_existing = False
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def is_multi_tenant(self, client: weaviate.WeaviateClient) -> bool:
+        if self._multi_tenant is None:
+            config = client.collections.get(self.collection_name).config.get()
+            self._multi_tenant = bool(config.multi_tenancy_config and config.multi_tenancy_config.enabled)
+        return self._multi_tenant
+
+    async def ais_multi_tenant(self, client: weaviate.WeaviateAsyncClient) -> bool:
+        if self._multi_tenant is None:
+            config = await client.collections.get(self.collection_name).config.get()
+            self._multi_tenant = bool(config.multi_tenancy_config and config.multi_tenancy_config.enabled)
+        return self._multi_tenant
+
+    def collection(self, client: weaviate.WeaviateClient, tenant: Optional[str] = None, create: bool = True):
+        """
+        The document collection scoped to `tenant` (default DEFAULT_TENANT), reactivating the tenant if needed.
+        A missing tenant is created when `create` is set (ingestion); otherwise None is returned, so
+        read-only requests naming an unknown tenant cannot create tenants.
+        """
+        collection = client.collections.get(self.collection_name)
+        if not self.is_multi_tenant(client):
+            check_single_tenant(tenant)
+            return collection
+        tenant = tenant or self.default_tenant
+        if not self._ensure_active(collection, tenant, create):
+            return None
+        return collection.with_tenant(tenant)
+
+    async def acollection(self, client: weaviate.WeaviateAsyncClient, tenant: Optional[str] = None, create: bool = True):
+        """collection() for an async client; only a tenant not yet known to be active costs a round trip."""
+        collection = client.collections.get(self.collection_name)
+        if not await self.ais_multi_tenant(client):
+            check_single_tenant(tenant)
+            return collection
+        tenant = tenant or self.default_tenant
+        if not self._touch(tenant) and not await self._aensure_active(collection, tenant, create):
+            return None
+        return collection.with_tenant(tenant)
+
+    def _touch(self, tenant: str) -> bool:
+        """Marks a tenant known to be active as used; False when it may need creating or reactivating."""
+        with self._lock:
+            if tenant in self._last_used:
+                self._last_used[tenant] = time.monotonic()
+                return True
+        return False
+
+    async def _aensure_active(self, collection, tenant: str, create: bool = True) -> bool:
+        existing = await collection.tenants.get_by_name(tenant)
+        if existing is None:
+            if not create:
+                return False
+            try:
+                await collection.tenants.create(Tenant(name=tenant))
+                self.created += 1
+                logger.info(f"Created tenant '{tenant}' in '{self.collection_name}'.")
+            except Exception:
+                if not await collection.tenants.exists(tenant):
+                    raise
+        elif existing.activity_status != TenantActivityStatus.ACTIVE:
+            await collection.tenants.activate(tenant)
+            self.reactivated += 1
+            logger.info(f"Reactivated tenant '{tenant}' ({existing.activity_status.value}).")
+        with self._lock:
+            self._last_used[tenant] = time.monotonic()
+        return True
+
+    def _ensure_active(self, collection, tenant: str, create: bool = True) -> bool:
+        """Makes sure `tenant` exists and is active. False when it does not exist and `create` is off."""
+        if self._touch(tenant):
+            return True
+        existing = collection.tenants.get_by_name(tenant)
+        if existing is None:
+            if not create:
+                return False
+            try:
+                collection.tenants.create(Tenant(name=tenant))
+                self.created += 1
+                logger.info(f"Created tenant '{tenant}' in '{self.collection_name}'.")
+            except Exception:
+                if not collection.tenants.exists(tenant): # Otherwise a concurrent request created it first
+                    raise
+        elif existing.activity_status != TenantActivityStatus.ACTIVE:
+            collection.tenants.activate(tenant)
+            self.reactivated += 1
+            logger.info(f"Reactivated tenant '{tenant}' ({existing.activity_status.value}).")
+        with self._lock:
+            self._last_used[tenant] = time.monotonic()
+        return True
+
+    def deactivate_idle(self, client: weaviate.WeaviateClient) -> List[str]:
+        """Deactivates (or offloads) tenants unused for `idle_seconds`. Returns their names."""
+        if self.idle_seconds is None or not self.is_multi_tenant(client):
+            return []
+        collection = client.collections.get(self.collection_name)
+        if not self._adopted_existing: # Tenants left active by an earlier process count as used at startup
+            for name, tenant in collection.tenants.get().items():
+                if tenant.activity_status == TenantActivityStatus.ACTIVE:
+                    with self._lock:
+                        self._last_used.setdefault(name, self._started_at)
+            self._adopted_existing = True
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [name for name, last_used in self._last_used.items() if last_used < cutoff]
+            for name in idle:
+                del self._last_used[name] # The next use reactivates it
+        deactivated = []
+        for name in idle:
+            with self._lock:
+                if name in self._last_used: # A request reactivated it since it was picked
+                    continue
+            try:
+                if self.idle_status == "OFFLOADED":
+                    collection.tenants.offload(name)
+                else:
+                    collection.tenants.deactivate(name)
+                self.deactivated += 1
+            except Exception as e:
+                logger.warning(f"Could not deactivate idle tenant '{name}': {e}")
+                continue
+            with self._lock:
+                raced = name in self._last_used # A request saw it still active during the call above
+            if raced:
+                self._reactivate_raced(collection, name)
+            else:
+                deactivated.append(name)
+        if deactivated:
+            logger.info(f"Set {len(deactivated)} idle tenants to {self.idle_status}.")
+        return deactivated
+
+    def _reactivate_raced(self, collection, name: str):
+        """Undoes a deactivation that raced with a request, so `_last_used` never lists an inactive tenant."""
+        try:
+            collection.tenants.activate(name)
+            self.reactivated += 1
+            logger.info(f"Reactivated tenant '{name}' used while it was being deactivated.")
+        except Exception as e:
+            logger.warning(f"Could not reactivate tenant '{name}': {e}")
+            with self._lock:
+                self._last_used.pop(name, None) # The next use reactivates it
+
+    def start(self, pool, interval: float):
+        """Sweeps idle tenants every `interval` seconds, using a client from `pool`."""
+        async def sweep():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    def run():
+                        with pool.client() as client:
+                            self.deactivate_idle(client)
+                    await asyncio.to_thread(run)
+                except Exception as e:
+                    logger.warning(f"Idle tenant sweep failed: {e}")
+        self._task = asyncio.create_task(sweep(), name="tenant-sweeper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            active = len(self._last_used)
+        return {
+            "multi_tenant": self._multi_tenant,
+            "default_tenant": self.default_tenant,
+            "active_tenants": active,
+            "created": self.created,
+            "reactivated": self.reactivated,
+            "deactivated": self.deactivated,
+            "idle_seconds": self.idle_seconds,
+            "idle_status": self.idle_status,
+        }
+
+tenant_manager = TenantManager(
+    collection_name=settings.WEAVIATE_INDEX_NAME,
+    default_tenant=settings.DEFAULT_TENANT,
+    idle_seconds=settings.TENANT_IDLE_SECONDS,
+    idle_status=settings.TENANT_IDLE_STATUS,
+)
@@ -0,0 +1,699 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from weaviate.classes.query import Filter, HybridFusion, MetadataQuery
+
+from backend.core.config import settings
+from backend.core.providers import embedding_dimensions
+from backend.core.telemetry import span
+from backend.core.tenants import TenantNotSupportedError, check_single_tenant, tenant_manager
+from backend.core.weaviate_manager import (
+    AsyncWeaviateClientPool, EmbeddingMismatchError, WeaviateClientPool, ainsert_objects, avector_target,
+    embedding_vector_name, ensure_schema_exists, get_async_client_pool, get_client_pool, insert_objects, vector_target,
+)
+from backend.schemas.document import RetrievalFilters
+
+logger = logging.getLogger(__name__)
+
+RETURN_PROPERTIES = ["content", "source_filename", "chunk_index", "doc_id"] # Returned with every search hit
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc) # Naive datetimes are taken as UTC
+
+
+class VectorStore:
+    """
+    Where document chunks and their vectors are stored and searched.
+    Objects are {"properties", "vector", "id", optional "tenant"} dicts; search hits are dicts
+    with "id", RETURN_PROPERTIES, "distance" and "score". The plain methods block; callers on
+    the event loop use the `a`-prefixed variants, which run them in a worker thread unless a
+    store has a native async client.
+    """
+    name = "base"
+
+    def ensure_schema(self):
+        raise NotImplementedError
+
+    def existing_ids(self, ids: List[uuid.UUID], tenant: Optional[str] = None) -> Set[uuid.UUID]:
+        """Which of `ids` are already stored for `tenant`."""
+        raise NotImplementedError
+
+    def insert(self, objects: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Inserts or replaces `objects`. Returns {object id: error message} for rejected objects."""
+        raise NotImplementedError
+
+    def search(
+        self,
+        query: str,
+        embedding: List[float],
+        top_k: int,
+        alpha: float,
+        filters: Optional[RetrievalFilters] = None,
+        tenant: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Hybrid (SEARCH_MODE="hybrid", weighted by `alpha`) or vector search, best hit first."""
+        raise NotImplementedError
+
+    def is_ready(self) -> bool:
+        return True
+
+    def is_multi_tenant(self) -> bool:
+        """Whether tenants are stored apart. Without it, requests naming a non-default tenant are rejected."""
+        return settings.WEAVIATE_MULTI_TENANCY
+
+    async def acheck_tenant(self, tenant: Optional[str]):
+        """Raises TenantNotSupportedError for a non-default `tenant` when the store is not multi-tenant."""
+        if tenant and tenant != settings.DEFAULT_TENANT and not await asyncio.to_thread(self.is_multi_tenant):
+            raise TenantNotSupportedError(tenant)
+
+    async def aexisting_ids(self, ids: List[uuid.UUID], tenant: Optional[str] = None) -> Set[uuid.UUID]:
+        return await asyncio.to_thread(self.existing_ids, ids, tenant)
+
+    async def ainsert(self, objects: List[Dict[str, Any]]) -> Dict[str, str]:
+        return await asyncio.to_thread(self.insert, objects)
+
+    async def asearch(self, query, embedding, top_k, alpha, filters=None, tenant=None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search, query, embedding, top_k, alpha, filters, tenant)
+
+    async def ais_ready(self) -> bool:
+        return await asyncio.to_thread(self.is_ready)
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        pass
+
+# --- Weaviate --- #
+
+def compile_filters(filters: Optional[RetrievalFilters]):
+    """Compiles RetrievalFilters into a Weaviate filter, or None when nothing is restricted."""
+    if filters is None:
+        return None
+    conditions = []
+    if filters.doc_ids:
+        conditions.append(Filter.by_property("doc_id").contains_any([str(doc_id) for doc_id in filters.doc_ids]))
+    if filters.filename_patterns:
+        conditions.append(Filter.any_of([Filter.by_property("source_filename").like(pattern) for pattern in filters.filename_patterns]))
+    if filters.modified_after is not None:
+        conditions.append(Filter.by_property("modification_date").greater_or_equal(_utc(filters.modified_after)))
+    if filters.modified_before is not None:
+        conditions.append(Filter.by_property("modification_date").less_than(_utc(filters.modified_before)))
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
+
+def _id_filter(id_batch: List[uuid.UUID]) -> Dict[str, Any]:
+    return dict(
+        filters=Filter.by_id().contains_any(id_batch),
+        limit=len(id_batch),
+        return_properties=[], # IDs only, no properties or vectors
+    )
+
+def _query_arguments(query: str, embedding: List[float], top_k: int, alpha: float, where, target: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Keyword arguments of the hybrid query and of its near_vector fallback."""
+    hybrid = dict(
+        query=query,
+        vector=embedding, # Pre-computed, so Weaviate needs no vectorizer
+        target_vector=target, # Named vector of the configured embedding model
+        alpha=alpha,
+        fusion_type=HybridFusion.RELATIVE_SCORE, # Fused server-side in one round trip
+        limit=top_k,
+        filters=where, # Pre-filtered inside Weaviate, so scoped queries search only matching objects
+        return_metadata=MetadataQuery(score=True, distance=True),
+        return_properties=RETURN_PROPERTIES
+    )
+    near_vector = dict(
+        near_vector=embedding,
+        target_vector=target,
+        limit=top_k,
+        filters=where,
+        return_metadata=MetadataQuery(distance=True),
+        return_properties=RETURN_PROPERTIES
+    )
+    return hybrid, near_vector
+
+def _hits(response) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": str(obj.uuid), # The UUID of the Weaviate object (chunk)
+            **{prop: obj.properties.get(prop) for prop in RETURN_PROPERTIES},
+            "distance": obj.metadata.distance if obj.metadata else None,
+            "score": obj.metadata.score if obj.metadata else None, # Hybrid score; None for vector search
+        }
+        for obj in response.objects
+    ]
+
+
+class WeaviateVectorStore(VectorStore):
+    """
+    The document collection in Weaviate. Schema work and scripts use the sync client pool;
+    the request path (searches, dedup lookups, inserts) uses the async pool, whose clients
+    multiplex many concurrent requests without tying up worker threads.
+    """
+    name = "weaviate"
+
+    def __init__(self, pool: WeaviateClientPool, async_pool: AsyncWeaviateClientPool):
+        self.pool = pool
+        self.async_pool = async_pool
+
+    def ensure_schema(self):
+        with self.pool.client() as client:
+            ensure_schema_exists(client)
+
+    def is_multi_tenant(self) -> bool:
+        self.ensure_schema() # An existing collection decides, whatever WEAVIATE_MULTI_TENANCY says
+        with self.pool.client() as client:
+            return tenant_manager.is_multi_tenant(client)
+
+    def existing_ids(self, ids: List[uuid.UUID], tenant: Optional[str] = None, fetch_size: int = 1000) -> Set[uuid.UUID]:
+        existing = set()
+        with self.pool.client() as client:
+            collection = tenant_manager.collection(client, tenant) # Created on the tenant's first upload
+            for i in range(0, len(ids), fetch_size): # One request per `fetch_size` IDs keeps filters within server limits
+                response = collection.query.fetch_objects(**_id_filter(ids[i:i + fetch_size]))
+                existing.update(uuid.UUID(str(obj.uuid)) for obj in response.objects)
+        return existing
+
+    async def aexisting_ids(self, ids: List[uuid.UUID], tenant: Optional[str] = None, fetch_size: int = 1000) -> Set[uuid.UUID]:
+        async with self.async_pool.client() as client:
+            collection = await tenant_manager.acollection(client, tenant)
+            responses = await asyncio.gather(*(
+                collection.query.fetch_objects(**_id_filter(ids[i:i + fetch_size])) # Batches are looked up concurrently
+                for i in range(0, len(ids), fetch_size)
+            ))
+        return {uuid.UUID(str(obj.uuid)) for response in responses for obj in response.objects}
+
+    def insert(self, objects: List[Dict[str, Any]]) -> Dict[str, str]:
+        return insert_objects(self.pool, objects)
+
+    async def ainsert(self, objects: List[Dict[str, Any]]) -> Dict[str, str]:
+        return await ainsert_objects(self.async_pool, objects)
+
+    def _query(self, collection, query: str, embedding: List[float], top_k: int, alpha: float, where, target: Optional[str]):
+        hybrid, near_vector = _query_arguments(query, embedding, top_k, alpha, where, target)
+        if settings.SEARCH_MODE == "hybrid":
+            try:
+                return collection.query.hybrid(**hybrid)
+            except Exception as e:
+                logger.warning(f"Hybrid query failed ({e}); falling back to vector search.")
+        return collection.query.near_vector(**near_vector)
+
+    async def _aquery(self, collection, query: str, embedding: List[float], top_k: int, alpha: float, where, target: Optional[str]):
+        hybrid, near_vector = _query_arguments(query, embedding, top_k, alpha, where, target)
+        if settings.SEARCH_MODE == "hybrid":
+            try:
+                return await collection.query.hybrid(**hybrid)
+            except Exception as e:
+                logger.warning(f"Hybrid query failed ({e}); falling back to vector search.")
+        return await collection.query.near_vector(**near_vector)
+
+    def search(self, query, embedding, top_k, alpha, filters=None, tenant=None):
+        with self.pool.client() as client:
+            collection = tenant_manager.collection(client, tenant, create=False)
+            if collection is None: # Unknown tenant: nothing stored yet
+                return []
+            response = self._query(collection, query, embedding, top_k, alpha, compile_filters(filters), vector_target(client))
+        return _hits(response)
+
+    async def asearch(self, query, embedding, top_k, alpha, filters=None, tenant=None):
+        async with self.async_pool.client() as client:
+            collection = await tenant_manager.acollection(client, tenant, create=False)
+            if collection is None:
+                return []
+            target = await avector_target(client)
+            response = await self._aquery(collection, query, embedding, top_k, alpha, compile_filters(filters), target)
+        return _hits(response)
+
+    def is_ready(self) -> bool:
+        with self.pool.client() as client:
+            return client.is_ready()
+
+    async def ais_ready(self) -> bool:
+        async with self.async_pool.client() as client:
+            return await client.is_ready()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pool": self.pool.stats(), "async_pool": self.async_pool.stats()}
+
+# --- Local (embedded) --- #
+# Vectors are unit-normalized float32 rows of a memory-mapped matrix (vectors.f32), so cosine
+# similarity is a dot product. Chunk metadata, the row each chunk's vector lives in and an
+# FTS5 keyword index live in SQLite (chunks.sqlite3) next to it.
+
+_LOCAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tenants (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY, -- Row of the chunk's vector in vectors.f32
+    id TEXT NOT NULL,
+    tenant_id INTEGER NOT NULL,
+    list_id INTEGER NOT NULL DEFAULT -1, -- IVF list; -1 before the index is built
+    content TEXT,
+    source_filename TEXT,
+    chunk_index INTEGER,
+    doc_id TEXT,
+    creation_date TEXT, -- ISO 8601 in UTC, so text comparison orders by time
+    modification_date TEXT,
+    properties TEXT, -- Remaining properties as JSON
+    UNIQUE (tenant_id, id)
+);
+CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id);
+CREATE INDEX IF NOT EXISTS chunks_source_filename ON chunks (source_filename);
+CREATE INDEX IF NOT EXISTS chunks_modification_date ON chunks (modification_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(content, content='chunks', content_rowid='row');
+"""
+
+_COLUMNS = ("content", "source_filename", "chunk_index", "doc_id", "creation_date", "modification_date")
+_FTS_TOKEN = re.compile(r"\w+")
+
+def _column_value(value: Any) -> Any:
+    return _utc(value).isoformat() if isinstance(value, datetime) else value
+
+def _filter_sql(filters: Optional[RetrievalFilters]) -> Tuple[str, List[Any]]:
+    """SQL conditions (prefixed with AND) and parameters equivalent to compile_filters."""
+    if filters is None:
+        return "", []
+    clauses, params = [], []
+    if filters.doc_ids:
+        clauses.append(f"c.doc_id IN ({','.join('?' * len(filters.doc_ids))})")
+        params.extend(str(doc_id) for doc_id in filters.doc_ids)
+    if filters.filename_patterns:
+        clauses.append("(" + " OR ".join("c.source_filename GLOB ?" for _ in filters.filename_patterns) + ")") # Same * and ? wildcards as Weaviate's like
+        params.extend(filters.filename_patterns)
+    if filters.modified_after is not None:
+        clauses.append("c.modification_date >= ?")
+        params.append(_column_value(filters.modified_after))
+    if filters.modified_before is not None:
+        clauses.append("c.modification_date < ?")
+        params.append(_column_value(filters.modified_before))
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def _top(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The `k` highest-scoring rows, best first."""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    if len(scores) == 0:
+        return scores
+    span = scores.max() - scores.min()
+    return (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Embedded store for single-node deployments and runs without network access.
+    Search scans the candidate rows in batches of `scan_batch` (exact cosine). Once a store holds
+    `ivf_min_vectors` vectors an IVF index is built (k-means lists, rebuilt as the store doubles)
+    and a search only scans the `probes` lists nearest the query. The tenant and metadata filters
+    narrow the candidate rows before any vector is read; hybrid search fuses the vector hits with
+    FTS5 BM25 hits the way Weaviate's relative-score fusion does.
+    """
+    name = "local"
+
+    def __init__(self, directory: str, dimensions: Optional[int] = None, ivf_min_vectors: int = 50_000, probes: int = 16, scan_batch: int = 65_536):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.ivf_min_vectors = ivf_min_vectors
+        self.probes = probes
+        self.scan_batch = scan_batch
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._count = 0 # Rows in use
+        self._row_tenant = np.zeros(0, dtype=np.int32) # Tenant of each row, mirrors chunks.tenant_id
+        self._row_list = np.zeros(0, dtype=np.int32) # IVF list of each row, mirrors chunks.list_id
+        self._tenants: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._ivf_size = 0 # Row count when the IVF index was last built
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _centroids_path(self) -> str:
+        return os.path.join(self.directory, "ivf_centroids.npy")
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Any):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def ensure_schema(self):
+        with self._lock:
+            if self._db is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.directory, "chunks.sqlite3"), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_LOCAL_SCHEMA)
+            self._db = db
+            space = embedding_vector_name()
+            stored_space = self._meta("embedding_space")
+            if stored_space is not None and stored_space != space:
+                self._db = None
+                db.close()
+                raise EmbeddingMismatchError(
+                    f"The local store in '{self.directory}' holds '{stored_space}' vectors, but EMBEDDING_MODEL/EMBEDDING_DIM "
+                    f"need '{space}'. Re-ingest into a new LOCAL_STORE_PATH."
+                )
+            with db:
+                self._set_meta("embedding_space", space)
+            stored_dimensions = self._meta("dimensions")
+            if stored_dimensions is not None:
+                self.dimensions = int(stored_dimensions)
+            self._tenants = {name: tenant_id for tenant_id, name in db.execute("SELECT id, name FROM tenants")}
+            self._count = db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+            if self._count:
+                self._reserve(self._count)
+                for row, tenant_id, list_id in db.execute("SELECT row, tenant_id, list_id FROM chunks"):
+                    self._row_tenant[row] = tenant_id
+                    self._row_list[row] = list_id
+            if os.path.exists(self._centroids_path):
+                self._centroids = np.load(self._centroids_path)
+                self._ivf_size = int(self._meta("ivf_size") or 0)
+            logger.info(f"Opened local vector store at '{self.directory}' with {self._count} vectors.")
+
+    def _reserve(self, rows: int):
+        """Grows the vector file (and the per-row arrays) to hold at least `rows` rows."""
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+        with open(self._vectors_path, "ab") as handle:
+            handle.truncate(max(os.path.getsize(self._vectors_path), capacity * self.dimensions * 4))
+        capacity = os.path.getsize(self._vectors_path) // (self.dimensions * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+        self._row_tenant = np.concatenate([self._row_tenant, np.full(capacity - self._capacity, -1, dtype=np.int32)])
+        self._row_list = np.concatenate([self._row_list, np.full(capacity - self._capacity, -1, dtype=np.int32)])
+        self._capacity = capacity
+
+    def _tenant_name(self, tenant: Optional[str]) -> str:
+        if not settings.WEAVIATE_MULTI_TENANCY:
+            check_single_tenant(tenant)
+            return settings.DEFAULT_TENANT
+        return tenant or settings.DEFAULT_TENANT
+
+    def _tenant_id(self, tenant: Optional[str]) -> int:
+        name = self._tenant_name(tenant)
+        if name not in self._tenants:
+            self._tenants[name] = self._db.execute("INSERT INTO tenants (name) VALUES (?)", (name,)).lastrowid
+        return self._tenants[name]
+
+    def existing_ids(self, ids: List[uuid.UUID], tenant: Optional[str] = None) -> Set[uuid.UUID]:
+        self.ensure_schema()
+        existing = set()
+        with self._lock:
+            tenant_id = self._tenants.get(self._tenant_name(tenant))
+            if tenant_id is None:
+                return existing
+            for i in range(0, len(ids), 500): # Stays under SQLite's bound-parameter limit
+                id_batch = [str(chunk_id) for chunk_id in ids[i:i + 500]]
+                rows = self._db.execute(
+                    f"SELECT id FROM chunks WHERE tenant_id = ? AND id IN ({','.join('?' * len(id_batch))})", [tenant_id, *id_batch]
+                )
+                existing.update(uuid.UUID(row[0]) for row in rows)
+        return existing
+
+    def insert(self, objects: List[Dict[str, Any]]) -> Dict[str, str]:
+        self.ensure_schema()
+        failures: Dict[str, str] = {}
+        with self._lock:
+            if self.dimensions is None and objects:
+                self.dimensions = len(objects[0]["vector"])
+            rows, tenant_ids, vectors = [], [], []
+            with self._db: # One transaction; the vectors are written before it commits
+                self._set_meta("dimensions", self.dimensions)
+                for obj in objects:
+                    vector = np.asarray(obj["vector"], dtype=np.float32)
+                    if vector.shape != (self.dimensions,):
+                        failures[str(obj["id"])] = f"Vector has {vector.size} dimensions; the store holds {self.dimensions}."
+                        continue
+                    tenant_id = self._tenant_id(obj.get("tenant"))
+                    properties = dict(obj["properties"])
+                    columns = [_column_value(properties.pop(column, None)) for column in _COLUMNS]
+                    previous = self._db.execute(
+                        "SELECT row, content FROM chunks WHERE tenant_id = ? AND id = ?", (tenant_id, str(obj["id"]))
+                    ).fetchone()
+                    if previous is not None: # Replaced in place, like a Weaviate insert with an existing UUID
+                        row = previous[0]
+                        self._db.execute("INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', ?, ?)", previous)
+                    else:
+                        row = self._count
+                        self._count += 1
+                    self._db.execute(
+                        f"INSERT OR REPLACE INTO chunks (row, id, tenant_id, {', '.join(_COLUMNS)}, properties) "
+                        f"VALUES (?, ?, ?, {', '.join('?' * len(_COLUMNS))}, ?)",
+                        (row, str(obj["id"]), tenant_id, *columns, json.dumps(properties, default=str)),
+                    )
+                    self._db.execute("INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)", (row, columns[0]))
+                    rows.append(row)
+                    tenant_ids.append(tenant_id)
+                    vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+                if rows:
+                    self._reserve(self._count)
+                    matrix = np.stack(vectors)
+                    self._vectors[rows] = matrix
+                    self._vectors.flush()
+                    self._row_tenant[rows] = tenant_ids
+                    if self._centroids is not None:
+                        lists = np.argmax(matrix @ self._centroids.T, axis=1).astype(np.int32)
+                        self._row_list[rows] = lists
+                        self._db.executemany("UPDATE chunks SET list_id = ? WHERE row = ?", zip(lists.tolist(), rows))
+            if self._count >= self.ivf_min_vectors and self._count >= 2 * self._ivf_size:
+                self._build_ivf()
+        return failures
+
+    def _build_ivf(self, iterations: int = 10, seed: int = 7):
+        """Clusters the stored vectors into ~sqrt(n) lists with spherical k-means and assigns every row a list."""
+        count = self._count
+        list_count = int(min(4096, max(16, math.sqrt(count))))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(self._vectors[np.sort(rng.choice(count, size=min(count, list_count * 64), replace=False))])
+        centroids = sample[rng.choice(len(sample), size=list_count, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(list_count):
+                members = sample[assignments == list_id]
+                if len(members):
+                    center = members.sum(axis=0)
+                    centroids[list_id] = center / (np.linalg.norm(center) or 1.0)
+        for start in range(0, count, self.scan_batch):
+            stop = min(count, start + self.scan_batch)
+            self._row_list[start:stop] = np.argmax(np.asarray(self._vectors[start:stop]) @ centroids.T, axis=1)
+        with self._db:
+            self._db.executemany("UPDATE chunks SET list_id = ? WHERE row = ?", zip(self._row_list[:count].tolist(), range(count)))
+            self._set_meta("ivf_size", count)
+        np.save(self._centroids_path, centroids)
+        self._centroids = centroids
+        self._ivf_size = count
+        logger.info(f"Built an IVF index with {list_count} lists over {count} vectors.")
+
+    def _vector_hits(self, embedding: np.ndarray, rows: np.ndarray, k: int, vectors, row_list, centroids) -> Tuple[np.ndarray, np.ndarray]:
+        if centroids is not None and len(rows) > self.ivf_min_vectors:
+            nearest = np.argsort(-(centroids @ embedding))[:self.probes]
+            rows = rows[np.isin(row_list[rows], nearest) | (row_list[rows] < 0)]
+        best_rows, best_scores = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.float32)]
+        for start in range(0, len(rows), self.scan_batch):
+            batch = rows[start:start + self.scan_batch]
+            batch_rows, batch_scores = _top(batch, np.asarray(vectors[batch]) @ embedding, k)
+            best_rows.append(batch_rows)
+            best_scores.append(batch_scores)
+        return _top(np.concatenate(best_rows), np.concatenate(best_scores), k)
+
+    def _keyword_hits(self, query: str, tenant_id: int, filters: Optional[RetrievalFilters], k: int, row_count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """FTS5 BM25 hits among the first `row_count` rows (the search's snapshot), best first."""
+        terms = _FTS_TOKEN.findall(query)
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        where, params = _filter_sql(filters)
+        with self._lock:
+            hits = self._db.execute(
+                "SELECT c.row, -bm25(chunks_fts) FROM chunks_fts JOIN chunks c ON c.row = chunks_fts.rowid "
+                f"WHERE chunks_fts MATCH ? AND c.tenant_id = ? AND c.row < ?{where} ORDER BY bm25(chunks_fts) LIMIT ?",
+                [" OR ".join(f'"{term}"' for term in terms), tenant_id, row_count, *params, k], # Any term matches, like Weaviate's BM25
+            ).fetchall()
+        return np.asarray([row for row, _ in hits], dtype=np.int64), np.asarray([score for _, score in hits], dtype=np.float32)
+
+    def search(self, query, embedding, top_k, alpha, filters=None, tenant=None):
+        self.ensure_schema()
+        with self._lock: # Snapshot; rows added later are not visible to this search
+            tenant_id = self._tenants.get(self._tenant_name(tenant))
+            if tenant_id is None or self._count == 0:
+                return []
+            vectors, centroids, row_count = self._vectors, self._centroids, self._count
+            row_tenant, row_list = self._row_tenant[:self._count].copy(), self._row_list[:self._count].copy()
+        rows = np.flatnonzero(row_tenant == tenant_id)
+        where, params = _filter_sql(filters)
+        if where:
+            with self._lock:
+                allowed = [row for (row,) in self._db.execute(f"SELECT c.row FROM chunks c WHERE c.tenant_id = ?{where}", [tenant_id, *params])]
+            rows = np.intersect1d(rows, np.asarray(allowed, dtype=np.int64))
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        vector_rows, similarities = self._vector_hits(query_vector, rows, top_k, vectors, row_list, centroids)
+
+        if settings.SEARCH_MODE == "hybrid":
+            keyword_rows, bm25 = self._keyword_hits(query, tenant_id, filters, top_k, row_count)
+            fused: Dict[int, float] = {}
+            for hit_rows, scores, weight in ((vector_rows, _min_max(similarities), alpha), (keyword_rows, _min_max(bm25), 1 - alpha)):
+                for row, score in zip(hit_rows.tolist(), scores.tolist()):
+                    fused[row] = fused.get(row, 0.0) + weight * score
+            ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        else:
+            ranked = [(row, None) for row in vector_rows.tolist()]
+        if not ranked:
+            return []
+
+        hit_rows = [row for row, _ in ranked]
+        distances = 1.0 - np.asarray(vectors[hit_rows]) @ query_vector
+        with self._lock:
+            records = {
+                record[0]: record[1:]
+                for record in self._db.execute(
+                    f"SELECT row, id, {', '.join(RETURN_PROPERTIES)} FROM chunks WHERE row IN ({','.join('?' * len(hit_rows))})", hit_rows
+                )
+            }
+        return [
+            {
+                "id": records[row][0],
+                **dict(zip(RETURN_PROPERTIES, records[row][1:])),
+                "distance": float(distance),
+                "score": score,
+            }
+            for (row, score), distance in zip(ranked, distances)
+            if row in records
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.directory,
+                "vectors": self._count,
+                "dimensions": self.dimensions,
+                "tenants": len(self._tenants),
+                "index": "ivf" if self._centroids is not None else "flat",
+                "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+                "ivf_probes": self.probes,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class BatchWriter:
+    """
+    Single batch writer shared by all concurrent ingestion work.
+    Writes queued by many files are coalesced into one store insert per flush (up to
+    `max_batch_objects`) and inserted without blocking the event loop; each `write` resolves once
+    its own objects are stored, or raises if any of them were rejected.
+    """
+    def __init__(self, store: VectorStore, max_batch_objects: int):
+        self.store = store
+        self.max_batch_objects = max_batch_objects
+        self._queue: "asyncio.Queue[Tuple[List[Dict[str, Any]], asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="vector-store-batch-writer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(ConnectionError("Batch writer stopped."))
+
+    async def write(self, objects: List[Dict[str, Any]]):
+        if self._task is None: # Not started (e.g. scripts): insert directly
+            with span("vector_insert", store=self.store.name, objects=len(objects)):
+                failures = await self.store.ainsert(objects)
+            if failures:
+                raise RuntimeError(f"{len(failures)} of {len(objects)} objects failed to insert: {next(iter(failures.values()))}")
+            return
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((objects, future))
+        await future
+
+    async def _run(self):
+        while True:
+            requests = [await self._queue.get()]
+            object_count = len(requests[0][0])
+            while object_count < self.max_batch_objects and not self._queue.empty():
+                request = self._queue.get_nowait()
+                requests.append(request)
+                object_count += len(request[0])
+            all_objects = [obj for objects, _ in requests for obj in objects]
+            try:
+                with span("vector_insert", store=self.store.name, objects=len(all_objects), writes=len(requests)):
+                    failures = await self.store.ainsert(all_objects)
+            except Exception as e:
+                logger.error(f"Batch insert of {len(all_objects)} objects failed: {e}")
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            logger.info(f"Batch writer stored {len(all_objects) - len(failures)} objects from {len(requests)} writes.")
+            for objects, future in requests:
+                if future.done(): # Caller went away
+                    continue
+                failed = [failures[obj["id"]] for obj in objects if obj["id"] in failures]
+                if failed:
+                    future.set_exception(RuntimeError(f"{len(failed)} of {len(objects)} objects failed to insert: {failed[0]}"))
+                else:
+                    future.set_result(None)
+
+_vector_store: Optional[VectorStore] = None
+
+def build_vector_store() -> VectorStore:
+    """Builds the store selected by VECTOR_STORE."""
+    if settings.VECTOR_STORE == "local":
+        return LocalVectorStore(
+            settings.LOCAL_STORE_PATH,
+            dimensions=embedding_dimensions(),
+            ivf_min_vectors=settings.LOCAL_STORE_IVF_MIN_VECTORS,
+            probes=settings.LOCAL_STORE_IVF_PROBES,
+            scan_batch=settings.LOCAL_STORE_SCAN_BATCH,
+        )
+    return WeaviateVectorStore(get_client_pool(), get_async_client_pool())
+
+def get_vector_store() -> VectorStore:
+    """Returns the process-wide vector store, creating it on first use."""
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = build_vector_store()
+    return _vector_store
+
+def close_vector_store():
+    global _vector_store
+    if _vector_store is not None:
+        _vector_store.close()
+        _vector_store = None
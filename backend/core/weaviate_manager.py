@@ -1,93 +1,590 @@
 import weaviate
 import weaviate.classes as wvc # Updated import for v4
 from weaviate.auth import AuthApiKey
-from weaviate.exceptions import WeaviateQueryException, UnexpectedStatusCodeException
-from typing import Optional
+from weaviate.exceptions import WeaviateQueryException, UnexpectedStatusCodeException, WeaviateConnectionError
+from typing import Optional, List, Set, Dict, Any, Tuple
+from contextlib import contextmanager, asynccontextmanager
+import asyncio
+import re
+import threading
+import time
 import logging # Added for logging
 
 from backend.core.config import settings
+from backend.core.providers import embedding_dimensions
+from backend.core.telemetry import span
+from backend.core.tenants import tenant_manager
 
-# Configure basic logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def get_weaviate_client() -> weaviate.WeaviateClient:
     """Initializes and returns a Weaviate client."""
     try:
-        client = weaviate.connect_to_weaviate_cloud( # Updated method name
+        with span("weaviate_connect"):
+            client = weaviate.connect_to_weaviate_cloud( # Updated method name
+                cluster_url=settings.WEAVIATE_URL,
+                auth_credentials=AuthApiKey(settings.WEAVIATE_API_KEY),
+                # grpc_port=50051 if settings.WEAVIATE_GRPC_ENABLED else None, # Enable gRPC if configured
+                # skip_init_checks=False # Set to True if you want to skip startup checks
+            )
+        logger.info(f"Successfully connected to Weaviate at {settings.WEAVIATE_URL}")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to connect to Weaviate: {e}")
+        raise
+
+async def get_async_weaviate_client() -> weaviate.WeaviateAsyncClient:
+    """Initializes, connects and returns an async Weaviate client."""
+    try:
+        client = weaviate.use_async_with_weaviate_cloud(
             cluster_url=settings.WEAVIATE_URL,
             auth_credentials=AuthApiKey(settings.WEAVIATE_API_KEY),
-            # grpc_port=50051 if settings.WEAVIATE_GRPC_ENABLED else None, # Enable gRPC if configured
-            # skip_init_checks=False # Set to True if you want to skip startup checks
         )
-        logger.info(f"Successfully connected to Weaviate at {settings.WEAVIATE_URL}")
+        with span("weaviate_connect", client="async"):
+            await client.connect()
+        logger.info(f"Successfully connected async client to Weaviate at {settings.WEAVIATE_URL}")
         return client
     except Exception as e:
-        logger.error(f"Failed to connect to Weaviate: {e}")
+        logger.error(f"Failed to connect async client to Weaviate: {e}")
         raise
 
+# --- Client pooling --- #
+# Connecting to Weaviate Cloud costs an HTTP + gRPC handshake plus init checks, so clients
+# are created once per process and reused across requests instead of per call.
+
+class _PooledClient:
+    """A pooled client together with its bookkeeping timestamps."""
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+
+
+class WeaviateClientPool:
+    """
+    Process-wide pool of synchronous Weaviate clients.
+    Checkout never blocks: when every pooled client is in use a new one is connected,
+    and clients beyond `size` are closed on checkin instead of being kept idle.
+    """
+    def __init__(self, size: int, idle_timeout: float, health_check_interval: float):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._idle: List[_PooledClient] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _is_healthy(self, entry: _PooledClient) -> bool:
+        try:
+            return entry.client.is_ready()
+        except Exception as e:
+            logger.warning(f"Weaviate health check failed: {e}")
+            return False
+
+    def _discard(self, entry: _PooledClient):
+        try:
+            entry.client.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled Weaviate client: {e}")
+
+    def _checkout(self) -> _PooledClient:
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise ConnectionError("Weaviate client pool is closed.")
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return _PooledClient(get_weaviate_client())
+            now = time.monotonic()
+            if now - entry.last_used > self.idle_timeout:
+                logger.info("Closing Weaviate client that exceeded the pool idle timeout.")
+                self._discard(entry)
+                continue
+            if now - entry.last_checked > self.health_check_interval:
+                if not self._is_healthy(entry):
+                    logger.warning("Pooled Weaviate client is unhealthy. Reconnecting.")
+                    self._discard(entry)
+                    continue
+                entry.last_checked = now
+            return entry
+
+    def _checkin(self, entry: _PooledClient, healthy: bool = True):
+        entry.last_used = time.monotonic()
+        with self._lock:
+            if healthy and not self._closed and len(self._idle) < self.size:
+                self._idle.append(entry)
+                return
+        self._discard(entry)
+
+    @contextmanager
+    def client(self):
+        """Yields a connected client and returns it to the pool afterwards."""
+        with span("weaviate_checkout"): # Near zero unless a client has to be (re)connected
+            entry = self._checkout()
+        healthy = True
+        try:
+            yield entry.client
+        except (WeaviateConnectionError, ConnectionError):
+            healthy = False # Reconnect on next checkout instead of reusing a broken connection
+            raise
+        finally:
+            self._checkin(entry, healthy=healthy)
+
+    def warm_up(self):
+        """Opens one client up front so the first request does not pay the handshake."""
+        with self.client():
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "closed": self._closed}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._discard(entry)
+
+
+class AsyncWeaviateClientPool:
+    """
+    Process-wide pool of `WeaviateAsyncClient` instances shared by concurrent requests.
+    An async client multiplexes requests over its connections, so callers share the
+    least busy client; another one is connected (up to `size`) only while every client
+    has requests in flight. At most `size * requests_per_client` callers hold a client at once.
+    """
+    def __init__(self, size: int, idle_timeout: float, health_check_interval: float, requests_per_client: int = 1):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.requests_per_client = requests_per_client
+        self._clients: List[_PooledClient] = []
+        self._in_flight: Dict[int, int] = {} # id(entry) -> requests using it
+        self._semaphore = asyncio.Semaphore(size * requests_per_client)
+        self._connect_lock = asyncio.Lock() # One handshake at a time; waiters then reuse its client
+        self._closed = False
+
+    async def _is_healthy(self, entry: _PooledClient) -> bool:
+        try:
+            return await entry.client.is_ready()
+        except Exception as e:
+            logger.warning(f"Async Weaviate health check failed: {e}")
+            return False
+
+    async def _discard(self, entry: _PooledClient):
+        if entry in self._clients:
+            self._clients.remove(entry)
+        self._in_flight.pop(id(entry), None)
+        try:
+            await entry.client.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled async Weaviate client: {e}")
+
+    def _least_busy(self) -> Optional[_PooledClient]:
+        return min(self._clients, key=lambda entry: self._in_flight[id(entry)], default=None)
+
+    async def _checkout(self) -> _PooledClient:
+        while True:
+            if self._closed:
+                raise ConnectionError("Async Weaviate client pool is closed.")
+            now = time.monotonic()
+            for entry in [entry for entry in self._clients if not self._in_flight[id(entry)] and now - entry.last_used > self.idle_timeout]:
+                logger.info("Closing async Weaviate client that exceeded the pool idle timeout.")
+                await self._discard(entry)
+            entry = self._least_busy()
+            if entry is None or (self._in_flight[id(entry)] and len(self._clients) < self.size):
+                async with self._connect_lock:
+                    entry = self._least_busy() # Another caller may have connected one meanwhile
+                    if not self._closed and (entry is None or (self._in_flight[id(entry)] and len(self._clients) < self.size)):
+                        entry = _PooledClient(await get_async_weaviate_client())
+                        self._clients.append(entry)
+                        self._in_flight[id(entry)] = 0
+                continue
+            self._in_flight[id(entry)] += 1
+            if not self._in_flight[id(entry)] - 1 and now - entry.last_checked > self.health_check_interval:
+                entry.last_checked = now
+                if not await self._is_healthy(entry):
+                    logger.warning("Pooled async Weaviate client is unhealthy. Reconnecting.")
+                    self._in_flight[id(entry)] -= 1
+                    if not self._in_flight[id(entry)]:
+                        await self._discard(entry)
+                    elif entry in self._clients:
+                        self._clients.remove(entry) # Closed when its last request returns
+                    continue
+            return entry
+
+    async def _checkin(self, entry: _PooledClient, healthy: bool):
+        entry.last_used = time.monotonic()
+        self._in_flight[id(entry)] -= 1
+        if not healthy or self._closed:
+            if entry in self._clients:
+                self._clients.remove(entry) # No new requests; closed once the current ones return
+        if entry not in self._clients and not self._in_flight[id(entry)]:
+            await self._discard(entry)
+
+    @asynccontextmanager
+    async def client(self):
+        """Yields a connected async client, possibly shared with other concurrent requests."""
+        async with self._semaphore:
+            with span("weaviate_checkout", client="async"):
+                entry = await self._checkout()
+            healthy = True
+            try:
+                yield entry.client
+            except (WeaviateConnectionError, ConnectionError):
+                healthy = False
+                raise
+            finally:
+                await self._checkin(entry, healthy)
+
+    async def warm_up(self):
+        async with self.client():
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "clients": len(self._clients),
+            "in_flight": sum(self._in_flight.values()),
+            "requests_per_client": self.requests_per_client,
+            "closed": self._closed,
+        }
+
+    async def close(self):
+        self._closed = True
+        for entry in [entry for entry in self._clients if not self._in_flight[id(entry)]]:
+            await self._discard(entry)
+        self._clients = [] # Clients still in use are closed when their requests return
+
+
+_client_pool: Optional[WeaviateClientPool] = None
+_async_client_pool: Optional[AsyncWeaviateClientPool] = None
+
+def init_client_pools() -> WeaviateClientPool:
+    """Creates the process-wide client pools. Called from the FastAPI lifespan handler."""
+    global _client_pool, _async_client_pool
+    if _client_pool is None:
+        _client_pool = WeaviateClientPool(
+            size=settings.WEAVIATE_POOL_SIZE,
+            idle_timeout=settings.WEAVIATE_POOL_IDLE_TIMEOUT_SECONDS,
+            health_check_interval=settings.WEAVIATE_HEALTH_CHECK_INTERVAL_SECONDS,
+        )
+    if _async_client_pool is None:
+        _async_client_pool = AsyncWeaviateClientPool(
+            size=settings.WEAVIATE_POOL_SIZE,
+            idle_timeout=settings.WEAVIATE_POOL_IDLE_TIMEOUT_SECONDS,
+            health_check_interval=settings.WEAVIATE_HEALTH_CHECK_INTERVAL_SECONDS,
+            requests_per_client=settings.WEAVIATE_ASYNC_REQUESTS_PER_CLIENT,
+        )
+    return _client_pool
+
+def get_client_pool() -> WeaviateClientPool:
+    """Returns the process-wide sync client pool, creating it lazily outside the app lifespan (scripts)."""
+    if _client_pool is None:
+        init_client_pools()
+    return _client_pool
+
+def get_async_client_pool() -> AsyncWeaviateClientPool:
+    """Returns the process-wide async client pool."""
+    if _async_client_pool is None:
+        init_client_pools()
+    return _async_client_pool
+
+async def close_client_pools():
+    global _client_pool, _async_client_pool
+    if _client_pool is not None:
+        _client_pool.close()
+        _client_pool = None
+    if _async_client_pool is not None:
+        await _async_client_pool.close()
+        _async_client_pool = None
+
+def insert_objects(pool: WeaviateClientPool, objects: List[Dict[str, Any]], collection_name: Optional[str] = None) -> Dict[str, str]:
+    """
+    Inserts objects ({"properties", "vector", "id", optional "tenant"}) with one dynamic batch per tenant.
+    Blocking; returns {object uuid: error message} for objects Weaviate rejected.
+    """
+    by_tenant: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for obj in objects:
+        by_tenant.setdefault(obj.get("tenant"), []).append(obj)
+    failures: Dict[str, str] = {}
+    with pool.client() as client:
+        target = vector_target(client, collection_name)
+        for tenant, tenant_objects in by_tenant.items():
+            if collection_name is None:
+                collection = tenant_manager.collection(client, tenant)
+            else:
+                collection = client.collections.get(collection_name)
+                collection = collection.with_tenant(tenant) if tenant else collection
+            with collection.batch.dynamic() as batch: # Using dynamic batching
+                for obj in tenant_objects:
+                    batch.add_object(
+                        properties=obj["properties"],
+                        vector={target: obj["vector"]} if target else obj["vector"],
+                        uuid=obj["id"]
+                    )
+            failures.update({str(failed.object_.uuid): failed.message for failed in collection.batch.failed_objects})
+    return failures
+
+async def ainsert_objects(pool: AsyncWeaviateClientPool, objects: List[Dict[str, Any]], collection_name: Optional[str] = None) -> Dict[str, str]:
+    """
+    Async counterpart of insert_objects: objects are sent as insert_many requests of
+    WEAVIATE_INSERT_BATCH_OBJECTS, all in flight at once over one shared async client.
+    Returns {object uuid: error message} for objects Weaviate rejected.
+    """
+    by_tenant: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for obj in objects:
+        by_tenant.setdefault(obj.get("tenant"), []).append(obj)
+    size = max(1, settings.WEAVIATE_INSERT_BATCH_OBJECTS)
+    async with pool.client() as client:
+        target = await avector_target(client, collection_name)
+        requests = []
+        for tenant, tenant_objects in by_tenant.items():
+            if collection_name is None:
+                collection = await tenant_manager.acollection(client, tenant)
+            else:
+                collection = client.collections.get(collection_name)
+                collection = collection.with_tenant(tenant) if tenant else collection
+            for start in range(0, len(tenant_objects), size):
+                chunk = tenant_objects[start:start + size]
+                data = [
+                    wvc.data.DataObject(
+                        properties=obj["properties"],
+                        vector={target: obj["vector"]} if target else obj["vector"],
+                        uuid=obj["id"],
+                    )
+                    for obj in chunk
+                ]
+                requests.append((chunk, collection.data.insert_many(data)))
+        results = await asyncio.gather(*(request for _, request in requests))
+    failures: Dict[str, str] = {}
+    for (chunk, _), result in zip(requests, results):
+        failures.update({str(chunk[index]["id"]): error.message for index, error in result.errors.items()})
+    return failures
+
+
+_verified_collections: Set[str] = set() # Collections already checked in this process
+
+# --- Embedding space --- #
+# Vectors are stored as a named vector called after the model and dimensions that produced
+# them, so each collection records its embedding space and two models can coexist while
+# re-embedding. Collections created before named vectors have a single unnamed vector.
+
+class EmbeddingMismatchError(RuntimeError):
+    """The configured embedding model or dimensions do not match the vectors stored in a collection."""
+
+def embedding_vector_name(model: Optional[str] = None, dimensions: Optional[int] = None) -> str:
+    """Named-vector name for an embedding space, e.g. "text_embedding_3_small_512"."""
+    model = model or settings.EMBEDDING_MODEL
+    dimensions = embedding_dimensions(model, dimensions)
+    name = re.sub(r"[^0-9A-Za-z_]", "_", model)
+    if settings.EMBEDDING_PROVIDER != "openai":
+        name = f"{settings.EMBEDDING_PROVIDER}_{name}" # Stand-in vectors get their own space
+    return f"{name}_{dimensions}" if dimensions else name
+
+_vector_targets: Dict[str, Optional[str]] = {} # Collection -> named vector used for the configured model
+
+def collection_vector_names(client: weaviate.WeaviateClient, collection_name: str) -> List[str]:
+    """Named vectors of a collection; empty for a collection with a single unnamed vector."""
+    return list(client.collections.get(collection_name).config.get().vector_config or {})
+
+def _resolve_vector_target(collection_name: str, names: List[str]) -> Optional[str]:
+    target = embedding_vector_name()
+    if names and target not in names:
+        raise EmbeddingMismatchError(
+            f"Collection '{collection_name}' has vectors {names}, but EMBEDDING_MODEL/EMBEDDING_DIM need '{target}'. "
+            f"Add and backfill it with: python -m backend.core.migrations embeddings"
+        )
+    _vector_targets[collection_name] = target if names else None
+    return _vector_targets[collection_name]
+
+def vector_target(client: weaviate.WeaviateClient, collection_name: Optional[str] = None) -> Optional[str]:
+    """
+    The named vector that inserts and queries use for the configured embedding model,
+    or None for a collection with a single unnamed vector.
+    Raises EmbeddingMismatchError when the collection has no vector for the configured model.
+    """
+    collection_name = collection_name or settings.WEAVIATE_INDEX_NAME
+    if collection_name not in _vector_targets:
+        return _resolve_vector_target(collection_name, collection_vector_names(client, collection_name))
+    return _vector_targets[collection_name]
+
+async def avector_target(client: weaviate.WeaviateAsyncClient, collection_name: Optional[str] = None) -> Optional[str]:
+    """vector_target for an async client; the collection config is only fetched once per process."""
+    collection_name = collection_name or settings.WEAVIATE_INDEX_NAME
+    if collection_name not in _vector_targets:
+        config = await client.collections.get(collection_name).config.get()
+        return _resolve_vector_target(collection_name, list(config.vector_config or {}))
+    return _vector_targets[collection_name]
+
+def validate_embedding_space(client: weaviate.WeaviateClient, collection_name: str):
+    """Checks that a stored vector has the length the configured model produces for queries."""
+    target = vector_target(client, collection_name)
+    expected = embedding_dimensions()
+    if expected is None:
+        logger.warning(f"Unknown output size for {settings.EMBEDDING_MODEL}; set EMBEDDING_DIM to validate stored vectors.")
+        return
+    collection = client.collections.get(collection_name)
+    if tenant_manager.is_multi_tenant(client):
+        tenant = collection.tenants.get_by_name(tenant_manager.default_tenant)
+        if tenant is None or tenant.activity_status != wvc.tenants.TenantActivityStatus.ACTIVE:
+            return # Nothing to sample without reactivating a tenant
+        collection = collection.with_tenant(tenant.name)
+    sample = collection.query.fetch_objects(limit=1, include_vector=[target] if target else True).objects
+    if not sample:
+        return
+    vector = sample[0].vector.get(target or "default") if isinstance(sample[0].vector, dict) else sample[0].vector
+    if vector and len(vector) != expected:
+        raise EmbeddingMismatchError(
+            f"Vectors stored in '{collection_name}' have {len(vector)} dimensions, but {settings.EMBEDDING_MODEL} "
+            f"is configured to produce {expected}; queries would not match them."
+        )
+
+def quantizer_config(update: bool = False):
+    """Quantizer for VECTOR_QUANTIZATION, or None. `update` builds the Reconfigure variant for existing collections."""
+    quantizer = wvc.config.Reconfigure.VectorIndex.Quantizer if update else wvc.config.Configure.VectorIndex.Quantizer
+    mode = settings.VECTOR_QUANTIZATION
+    if mode == "pq":
+        return quantizer.pq(segments=settings.PQ_SEGMENTS, training_limit=settings.PQ_TRAINING_LIMIT)
+    if mode == "bq":
+        return quantizer.bq(rescore_limit=settings.QUANTIZATION_RESCORE_LIMIT)
+    if mode == "sq":
+        return quantizer.sq(rescore_limit=settings.QUANTIZATION_RESCORE_LIMIT, training_limit=settings.PQ_TRAINING_LIMIT)
+    if mode != "none":
+        raise ValueError(f"Unknown VECTOR_QUANTIZATION: {mode}")
+    return None
+
+def vector_index_config():
+    """HNSW index configuration from Settings."""
+    return wvc.config.Configure.VectorIndex.hnsw(
+        distance_metric=wvc.config.VectorDistances.COSINE, # Or DOT, EUCLIDEAN as per your embedding model's best practice
+        ef=settings.HNSW_EF,
+        dynamic_ef_min=settings.HNSW_DYNAMIC_EF_MIN,
+        dynamic_ef_max=settings.HNSW_DYNAMIC_EF_MAX,
+        dynamic_ef_factor=settings.HNSW_DYNAMIC_EF_FACTOR,
+        ef_construction=settings.HNSW_EF_CONSTRUCTION,
+        max_connections=settings.HNSW_MAX_CONNECTIONS,
+        quantizer=quantizer_config(),
+    )
+
+def update_vector_index(client: weaviate.WeaviateClient, collection_name: str):
+    """
+    Applies the mutable HNSW settings (ef, dynamic ef) and the quantizer to an existing collection.
+    ef_construction and max_connections only apply to new collections.
+    """
+    hnsw = wvc.config.Reconfigure.VectorIndex.hnsw(
+        ef=settings.HNSW_EF,
+        dynamic_ef_min=settings.HNSW_DYNAMIC_EF_MIN,
+        dynamic_ef_max=settings.HNSW_DYNAMIC_EF_MAX,
+        dynamic_ef_factor=settings.HNSW_DYNAMIC_EF_FACTOR,
+        quantizer=quantizer_config(update=True),
+    )
+    collection = client.collections.get(collection_name)
+    target = vector_target(client, collection_name)
+    if target:
+        collection.config.update(vector_config=wvc.config.Reconfigure.Vectors.update(name=target, vector_index_config=hnsw))
+    else:
+        collection.config.update(vector_index_config=hnsw)
+
+def create_collection(client: weaviate.WeaviateClient, collection_name: str):
+    """Creates a document-chunk collection with the current schema."""
+    _vector_targets.pop(collection_name, None)
+    client.collections.create(
+        name=collection_name,
+        description="Stores document chunks and their embeddings for semantic search.",
+        vector_config=wvc.config.Configure.Vectors.self_provided( # Using pre-computed vectors
+            name=embedding_vector_name(), # Records the embedding model and dimensions
+            vector_index_config=vector_index_config()
+        ),
+        multi_tenancy_config=wvc.config.Configure.multi_tenancy(
+            enabled=True,
+            auto_tenant_creation=True, # Batch inserts create missing tenants
+            auto_tenant_activation=True # Touching a deactivated tenant reactivates it
+        ) if settings.WEAVIATE_MULTI_TENANCY else None,
+        properties=[
+            wvc.config.Property(
+                name="content",
+                data_type=wvc.config.DataType.TEXT,
+                description="Text content of the document chunk",
+                tokenization=wvc.config.Tokenization(settings.WEAVIATE_CONTENT_TOKENIZATION), # Keyword (BM25) side of hybrid search
+                index_searchable=True
+            ),
+            wvc.config.Property(
+                name="source_filename",
+                data_type=wvc.config.DataType.TEXT,
+                description="Original filename of the document source",
+                tokenization=wvc.config.Tokenization.FIELD, # Use enum member
+                index_filterable=True # Filename filters (exact and wildcard)
+            ),
+            wvc.config.Property(
+                name="chunk_index",
+                data_type=wvc.config.DataType.INT,
+                description="Index of the chunk within the original document"
+            ),
+            wvc.config.Property(
+                name="doc_id",
+                data_type=wvc.config.DataType.TEXT,
+                description="Unique identifier for the original document",
+                tokenization=wvc.config.Tokenization.FIELD, # Use enum member
+                index_filterable=True # doc_id filters
+            ),
+            wvc.config.Property(
+                name="author",
+                data_type=wvc.config.DataType.TEXT,
+                description="Author of the document (optional)",
+                skip_indexing=True # If not directly searching/filtering on it often
+            ),
+            wvc.config.Property(
+                name="creation_date",
+                data_type=wvc.config.DataType.DATE,
+                description="Creation date of the document (optional)"
+            ),
+            wvc.config.Property(
+                name="modification_date",
+                data_type=wvc.config.DataType.DATE,
+                description="When the chunk was ingested",
+                index_filterable=True,
+                index_range_filters=True # Date-range filters
+            ),
+        ]
+    )
+
+def collection_supports_hybrid(client: weaviate.WeaviateClient, collection_name: str) -> bool:
+    """True when the collection's `content` property has a searchable (BM25) index with the configured tokenization."""
+    config = client.collections.get(collection_name).config.get()
+    content = next((prop for prop in config.properties if prop.name == "content"), None)
+    return (
+        content is not None
+        and bool(content.index_searchable)
+        and content.tokenization == wvc.config.Tokenization(settings.WEAVIATE_CONTENT_TOKENIZATION)
+    )
+
 def ensure_schema_exists(client: weaviate.WeaviateClient):
     """Ensures the 'DocumentChunk' schema (collection) exists in Weaviate."""
     collection_name = settings.WEAVIATE_INDEX_NAME
+    if collection_name in _verified_collections:
+        return
     try:
         if not client.collections.exists(collection_name):
             logger.info(f"Collection '{collection_name}' does not exist. Creating it...")
-            client.collections.create(
-                name=collection_name,
-                description="Stores document chunks and their embeddings for semantic search.",
-                vectorizer_config=wvc.config.Configure.Vectorizer.none(), # Using pre-computed vectors
-                vector_index_config=wvc.config.Configure.VectorIndex.hnsw(
-                    distance_metric=wvc.config.VectorDistances.COSINE # Or DOT, EUCLIDEAN as per your embedding model's best practice
-                ),
-                properties=[
-                    wvc.config.Property(
-                        name="content",
-                        data_type=wvc.config.DataType.TEXT,
-                        description="Text content of the document chunk"
-                        # tokenization removed, typically not needed for primary vector search field
-                        # If specific keyword search on content is needed, consider "word" or "whitespace"
-                    ),
-                    wvc.config.Property(
-                        name="source_filename",
-                        data_type=wvc.config.DataType.TEXT,
-                        description="Original filename of the document source",
-                        tokenization=wvc.config.Tokenization.FIELD # Use enum member
-                    ),
-                    wvc.config.Property(
-                        name="chunk_index",
-                        data_type=wvc.config.DataType.INT,
-                        description="Index of the chunk within the original document"
-                    ),
-                    wvc.config.Property(
-                        name="doc_id",
-                        data_type=wvc.config.DataType.TEXT,
-                        description="Unique identifier for the original document",
-                        tokenization=wvc.config.Tokenization.FIELD # Use enum member
-                    ),
-                    wvc.config.Property(
-                        name="author",
-                        data_type=wvc.config.DataType.TEXT,
-                        description="Author of the document (optional)",
-                        skip_indexing=True # If not directly searching/filtering on it often
-                    ),
-                    wvc.config.Property(
-                        name="creation_date",
-                        data_type=wvc.config.DataType.DATE,
-                        description="Creation date of the document (optional)",
-                        skip_indexing=True
-                    ),
-                    wvc.config.Property(
-                        name="modification_date",
-                        data_type=wvc.config.DataType.DATE,
-                        description="Last modification date of the document (optional)",
-                        skip_indexing=True
-                    ),
-                ]
-            )
+            create_collection(client, collection_name)
             logger.info(f"Collection '{collection_name}' created successfully.")
         else:
             logger.info(f"Collection '{collection_name}' already exists.")
-            # Optionally, you could add logic here to verify/update existing schema if needed.
+            if settings.WEAVIATE_MULTI_TENANCY and not tenant_manager.is_multi_tenant(client):
+                logger.warning(
+                    f"Collection '{collection_name}' was created without multi-tenancy; requests naming a tenant are rejected. "
+                    f"Migrate it with: python -m backend.core.migrations multi-tenancy --in-place"
+                )
+            if settings.SEARCH_MODE == "hybrid" and not collection_supports_hybrid(client, collection_name):
+                # Tokenization cannot be changed in place; the collection has to be rebuilt
+                logger.warning(
+                    f"Collection '{collection_name}' has no '{settings.WEAVIATE_CONTENT_TOKENIZATION}' keyword index on 'content'; "
+                    f"hybrid search will fall back to vector search. Migrate it with: python -m backend.core.migrations hybrid --in-place"
+                )
+            validate_embedding_space(client, collection_name) # Query vectors must live in the same space as stored ones
+        _verified_collections.add(collection_name)
     except UnexpectedStatusCodeException as e:
         logger.error(f"Error creating or checking collection '{collection_name}': {e.message} (Status code: {e.status_code})")
         raise
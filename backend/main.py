@@ -1,13 +1,89 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import uvicorn
 
-from backend.api.routers import ingest, query
+from backend.api.routers import ingest, query, metrics
 # from backend.core.database import init_db # Removed
 from backend.core.config import settings # Import settings to ensure env vars are loaded
-from backend.core.weaviate_manager import get_weaviate_client, ensure_schema_exists # Added for startup schema check
+from backend.core.telemetry import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, configure_logging, configure_tracing, render_metrics, shutdown_tracing
+from backend.core.weaviate_manager import init_client_pools, get_async_client_pool, close_client_pools
+from backend.core.vector_store import BatchWriter, close_vector_store, get_vector_store
+from backend.core.executors import shutdown_process_pool
+from backend.core.loop_monitor import EventLoopMonitor
+from backend.core.tenants import tenant_manager
+from backend.services.ingestion_jobs import IngestionJobQueue
+from backend.services import agent_service, rerank_service
 
-app = FastAPI(title="JARVIS Demo API")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Application startup...")
+    configure_tracing()
+    logger.info(f"Using OpenAI API Key: {'********' + settings.OPENAI_API_KEY[-4:] if settings.OPENAI_API_KEY else 'Not Set'}")
+    logger.info(f"Vector store: {settings.VECTOR_STORE}")
+    if settings.VECTOR_STORE == "weaviate":
+        logger.info(f"Weaviate URL: {settings.WEAVIATE_URL}")
+        logger.info(f"Weaviate Index Name: {settings.WEAVIATE_INDEX_NAME}")
+    else:
+        logger.info(f"Local store path: {settings.LOCAL_STORE_PATH}")
+
+    app.state.loop_monitor = EventLoopMonitor(
+        interval=settings.EVENT_LOOP_MONITOR_INTERVAL_SECONDS,
+        warning_threshold=settings.EVENT_LOOP_LAG_WARNING_SECONDS,
+    )
+    if settings.EVENT_LOOP_MONITOR_INTERVAL_SECONDS > 0:
+        app.state.loop_monitor.start()
+
+    if settings.VECTOR_STORE == "weaviate":
+        # Clients are pooled for the lifetime of the process so requests skip the connection handshake
+        app.state.weaviate_pool = init_client_pools()
+        app.state.weaviate_async_pool = get_async_client_pool()
+    app.state.vector_store = get_vector_store()
+    try:
+        logger.info("Ensuring vector store schema exists...")
+        app.state.vector_store.ensure_schema()
+        logger.info("Vector store schema check complete.")
+    except Exception as e:
+        logger.error(f"Error during vector store schema initialization: {e}")
+        # Depending on severity, you might want to raise an error or prevent app startup
+
+    if settings.VECTOR_STORE == "weaviate" and settings.WEAVIATE_MULTI_TENANCY and settings.TENANT_IDLE_SECONDS is not None:
+        tenant_manager.start(app.state.weaviate_pool, interval=settings.TENANT_SWEEP_INTERVAL_SECONDS) # Deactivates idle tenants
+
+    app.state.batch_writer = BatchWriter(app.state.vector_store, max_batch_objects=settings.INGEST_WRITER_BATCH_OBJECTS)
+    app.state.batch_writer.start()
+    app.state.ingestion_jobs = IngestionJobQueue(
+        store=app.state.vector_store,
+        workers=settings.INGEST_WORKERS,
+        history_size=settings.INGEST_JOB_HISTORY,
+        writer=app.state.batch_writer,
+    )
+    app.state.ingestion_jobs.start()
+    agent_service.get_agent_executor() # Build the agent once here rather than on the first question
+    await asyncio.to_thread(rerank_service.get_reranker) # Loads the cross-encoder, if any, off the loop
+
+    yield
+
+    logger.info("Application shutdown: stopping ingestion workers...")
+    await app.state.ingestion_jobs.stop()
+    await app.state.batch_writer.stop()
+    await rerank_service.close_reranker()
+    await tenant_manager.stop()
+    shutdown_process_pool()
+    logger.info("Closing the vector store and Weaviate client pools...")
+    close_vector_store()
+    await close_client_pools()
+    await app.state.loop_monitor.stop()
+    shutdown_tracing()
+
+configure_logging()
+
+app = FastAPI(title="JARVIS Demo API", lifespan=lifespan)
 
 # CORS Middleware (adjust origins as needed for your frontend)
 app.add_middleware(
@@ -17,35 +93,33 @@ app.add_middleware(
     allow_methods=["*"], # Allows all methods
     allow_headers=["*"], # Allows all headers
 )
-
-@app.on_event("startup")
-async def on_startup():
-    print("Application startup...")
-    print(f"Using OpenAI API Key: {'********' + settings.OPENAI_API_KEY[-4:] if settings.OPENAI_API_KEY else 'Not Set'}")
-    print(f"Weaviate URL: {settings.WEAVIATE_URL}")
-    print(f"Weaviate Index Name: {settings.WEAVIATE_INDEX_NAME}")
-    
-    try:
-        client = None # Initialize client to None
-        print("Ensuring Weaviate schema exists...")
-        client = get_weaviate_client()
-        ensure_schema_exists(client)
-        print("Weaviate schema check complete.")
-    except Exception as e:
-        print(f"Error during Weaviate schema initialization: {e}")
-        # Depending on severity, you might want to raise an error or prevent app startup
-    finally:
-        if client:
-            client.close() # Close client if it was opened
+app.add_middleware(MetricsMiddleware) # Added last, so it wraps CORS and times the whole request
 
 # Include routers
 app.include_router(ingest.router, prefix="/api/ingest", tags=["Ingestion"])
 app.include_router(query.router, prefix="/api/query", tags=["Query"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the JARVIS Demo API"}
 
+@app.get("/health", tags=["Root"])
+async def health():
+    """Reports vector store readiness and state (Weaviate connectivity and client pool, or the local store's size)."""
+    store = app.state.vector_store
+    try:
+        ready = await store.ais_ready()
+    except Exception as e:
+        logger.warning(f"Health check failed to reach the {store.name} store: {e}")
+        ready = False
+    return {"status": "ok" if ready else "degraded", "vector_store": store.name, "ready": ready, **store.stats()}
+
+@app.get("/metrics", tags=["Root"])
+async def prometheus_metrics():
+    """Stage latency histograms, HTTP request latency and token counters in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # Optional: Add entry point for running with uvicorn directly
 # if __name__ == "__main__":
 #     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from datetime import datetime
 import uuid
 
+from backend.core.tenants import TENANT_NAME_PATTERN
+
 class DocumentBase(BaseModel):
     content: str
     doc_metadata: Optional[Dict[str, Any]] = None
@@ -15,10 +18,23 @@ class DocumentResponse(DocumentBase):
     class Config:
         from_attributes = True # Replaces orm_mode = True in Pydantic v2
 
+class RetrievalFilters(BaseModel):
+    """Restricts knowledge-base searches. Conditions are combined with AND; list entries with OR."""
+    doc_ids: Optional[List[str]] = None
+    filename_patterns: Optional[List[str]] = None # Wildcards: * any characters, ? one character
+    modified_after: Optional[datetime] = None # Range on modification_date, the time a chunk was ingested
+    modified_before: Optional[datetime] = None
+
 class QueryRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None # Continues a conversation; omit to start a new one
+    filters: Optional[RetrievalFilters] = None # Scopes every knowledge-base search of this question
+    tenant: Optional[str] = Field(None, pattern=TENANT_NAME_PATTERN) # Whose documents to search; default DEFAULT_TENANT
+    alpha: Optional[float] = Field(None, ge=0.0, le=1.0) # Hybrid search weighting for this question (1 = pure vector, 0 = pure BM25)
 
 class QueryResponse(BaseModel):
     answer: str
     sources: Optional[list[DocumentResponse]] = None
     thought_process: Optional[str] = None # Added field
+    session_id: Optional[str] = None # Send back with the next question to keep the conversation
+    route: Optional[str] = None # How the answer was produced: direct, cache, retrieval or agent
@@ -1,28 +1,36 @@
-from typing import List, Tuple
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import time
 import uuid
 
-from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools.retriever import create_retriever_tool
 from langchain_core.prompts import PromptTemplate, MessagesPlaceholder
-from langchain_openai import OpenAIEmbeddings
 # from core.database import WeaviateDBService # Removed
-from backend.services import retrieval_service # Added for direct use
-from langchain.memory import ConversationBufferWindowMemory
+from backend.services import rerank_service, retrieval_service # Added for direct use
+from backend.services.answer_cache import CachedAnswer, answer_cache
+from backend.services.query_router import ROUTE_AGENT, ROUTE_CACHE, ROUTE_DIRECT, ROUTE_RETRIEVAL, RouteDecision, route_question
 from langchain_community.tools.tavily_search import TavilySearchResults
 # from langchain_core.runnables import RunnablePassthrough # Not directly used in this refactor
 
 from backend.core.config import settings # Ensure backend. prefix
+from backend.core.providers import build_chat_model, build_embeddings
+from backend.core.telemetry import span, telemetry_callbacks
 # from models.document import Document as ModelDocument # Removed, using dicts
-from backend.schemas.document import DocumentResponse # Ensure backend. prefix
+from backend.schemas.document import DocumentResponse, RetrievalFilters # Ensure backend. prefix
 
 from langchain_core.documents import Document as LangchainDocument
+from langchain_core.messages import BaseMessage, get_buffer_string
+
+logger = logging.getLogger(__name__)
 
 # Initialize embeddings model (ensure consistency)
-embeddings_model = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY, model=settings.EMBEDDING_MODEL) # Renamed for clarity
+embeddings_model = build_embeddings() # Renamed for clarity
 
 # --- LLM and Agent Setup --- #
-llm = ChatOpenAI(model_name=settings.LLM_MODEL, temperature=0, api_key=settings.OPENAI_API_KEY)
+llm = build_chat_model(settings.LLM_MODEL, temperature=0)
 
 # Define the ReAct prompt template with memory placeholder
 # This is a simplified version that strictly follows the ReAct format
@@ -53,189 +61,548 @@ New question: {input}
 {agent_scratchpad}
 """
 
-# Prompt template will be fully defined inside answer_question to correctly capture tools
-# --- Service Function --- #
+# Documents retrieved while answering the current request; set per request by answer_question
+_retrieved_documents: ContextVar[Optional[List[LangchainDocument]]] = ContextVar("retrieved_documents", default=None)
 
-async def answer_question(question: str) -> Tuple[str, List[DocumentResponse], str]: # Removed db argument
-    """
-    Uses a LangChain ReAct agent with a retrieval tool to answer a question
-    based on the documents stored in Weaviate.
-    """
+RETRIEVER_TOOL_NAME = "search_knowledge_base"
+HYDE_TAG = "hyde"
+
+# How fused (RETRIEVAL_MODE="fusion") retrievals ended
+retrieval_stats = {"fused": 0, "hyde_over_budget": 0, "hyde_failed": 0}
 
-    # --- Create Retriever Tool Dynamically --- #
-    class AsyncRetrieverWrapper:
-        def __init__(self):
-            # self.db = db_service # Removed
-            self.embeddings = embeddings_model # Use the globally initialized one
-            self.hyde_prompt = PromptTemplate.from_template("Generate a short, hypothetical answer to the question: {question}")
-            self.hyde_chain = self.hyde_prompt | llm
-
-        async def get_relevant_documents(self, query: str, top_k: int = 3) -> List[LangchainDocument]:
-            # Directly call the updated retrieval_service function
-            retrieved_chunks = await retrieval_service.find_relevant_chunks(query=query, top_k=top_k)
-            
-            langchain_documents = []
-            for chunk_dict in retrieved_chunks:
-                # chunk_dict now contains 'id', 'content', 'source_filename', 'chunk_index', 'doc_id', 'distance'
-                metadata = {
-                    "id": chunk_dict.get("id"), # This is the chunk's own UUID from Weaviate
-                    "source_filename": chunk_dict.get("source_filename"),
-                    "chunk_index": chunk_dict.get("chunk_index"),
-                    "doc_id": chunk_dict.get("doc_id"), # Original document ID
-                    "distance": chunk_dict.get("distance")
-                }
-                # Filter out None values from metadata if necessary
-                metadata = {k: v for k, v in metadata.items() if v is not None}
-                
-                doc = LangchainDocument(
-                    page_content=chunk_dict.get('content', ''),
-                    metadata=metadata
-                )
-                langchain_documents.append(doc)
-            return langchain_documents
-            
-        async def get_relevant_documents_with_hyde(self, query: str, top_k: int = 3) -> List[LangchainDocument]:
+def _chunks_to_documents(retrieved_chunks: List[dict]) -> List[LangchainDocument]:
+    langchain_documents = []
+    for chunk_dict in retrieved_chunks:
+        # chunk_dict contains 'id', 'content', 'source_filename', 'chunk_index', 'doc_id', 'distance', 'score'
+        metadata = {
+            "id": chunk_dict.get("id"), # This is the chunk's own UUID from Weaviate
+            "source_filename": chunk_dict.get("source_filename"),
+            "chunk_index": chunk_dict.get("chunk_index"),
+            "doc_id": chunk_dict.get("doc_id"), # Original document ID
+            "distance": chunk_dict.get("distance"),
+            "score": chunk_dict.get("score"), # Hybrid (BM25 + vector) score
+            "rerank_score": chunk_dict.get("rerank_score")
+        }
+        # Filter out None values from metadata if necessary
+        metadata = {k: v for k, v in metadata.items() if v is not None}
+        langchain_documents.append(LangchainDocument(page_content=chunk_dict.get('content', ''), metadata=metadata))
+    return langchain_documents
+
+class AsyncRetrieverWrapper:
+    """Duck-typed retriever for `create_retriever_tool`. RETRIEVAL_MODE selects raw-query search, HyDE, or both fused."""
+    def __init__(self):
+        # self.db = db_service # Removed
+        self.embeddings = embeddings_model # Use the globally initialized one
+        self.hyde_prompt = PromptTemplate.from_template("Generate a short, hypothetical answer to the question: {question}")
+        self.hyde_chain = (self.hyde_prompt | llm).with_config(tags=[HYDE_TAG]) # Tagged so its tokens are not streamed as the answer
+
+    async def get_relevant_documents(self, query: str, top_k: int = 3) -> List[LangchainDocument]:
+        # Directly call the updated retrieval_service function
+        retrieved_chunks = await retrieval_service.find_relevant_chunks(query=query, top_k=rerank_service.candidate_count(top_k))
+        return _chunks_to_documents(await rerank_service.rerank(query, retrieved_chunks, top_k))
+
+    async def _hyde_chunks(self, query: str, top_k: int) -> List[dict]:
+        with span("hyde_generation"):
             hypothetical_answer_result = await self.hyde_chain.ainvoke({"question": query})
-            hypothetical_answer = hypothetical_answer_result.content if hasattr(hypothetical_answer_result, 'content') else str(hypothetical_answer_result)
-            
-            # Using the hypothetical answer to retrieve documents
-            # This part assumes find_relevant_chunks can be called with the hypothetical answer string
-            retrieved_chunks = await retrieval_service.find_relevant_chunks(query=hypothetical_answer, top_k=top_k)
-            
-            langchain_documents = []
-            for chunk_dict in retrieved_chunks:
-                metadata = {
-                    "id": chunk_dict.get("id"),
-                    "source_filename": chunk_dict.get("source_filename"),
-                    "chunk_index": chunk_dict.get("chunk_index"),
-                    "doc_id": chunk_dict.get("doc_id"),
-                    "distance": chunk_dict.get("distance")
-                }
-                metadata = {k: v for k, v in metadata.items() if v is not None}
-                doc = LangchainDocument(
-                    page_content=chunk_dict.get('content', ''),
-                    metadata=metadata
-                )
-                langchain_documents.append(doc)
-            return langchain_documents
-
-        async def ainvoke(self, input_str: str, **kwargs) -> List[LangchainDocument]: # Renamed input to input_str
-            # Decide whether to use HyDE or direct retrieval, or make it configurable
-            # For now, let's stick to HyDE as it was in the original code
-            return await self.get_relevant_documents_with_hyde(input_str, top_k=kwargs.get('top_k', 3))
-
-    retriever_instance = AsyncRetrieverWrapper() # Removed db_session argument
+        hypothetical_answer = hypothetical_answer_result.content if hasattr(hypothetical_answer_result, 'content') else str(hypothetical_answer_result)
+
+        # Using the hypothetical answer to retrieve documents
+        return await retrieval_service.find_relevant_chunks(query=hypothetical_answer, top_k=top_k)
+
+    async def get_relevant_documents_with_hyde(self, query: str, top_k: int = 3) -> List[LangchainDocument]:
+        hyde_chunks = await self._hyde_chunks(query, rerank_service.candidate_count(top_k))
+        return _chunks_to_documents(await rerank_service.rerank(query, hyde_chunks, top_k)) # Scored against the real question
 
+    async def get_relevant_documents_fused(self, query: str, top_k: int = 3) -> List[LangchainDocument]:
+        """
+        Runs the raw-query search and the HyDE search concurrently and merges them with
+        reciprocal rank fusion. If HyDE has not finished within HYDE_LATENCY_BUDGET_SECONDS
+        (counted from the start), the raw-query results are returned on their own.
+        """
+        started = time.perf_counter()
+        candidates = rerank_service.candidate_count(top_k)
+        hyde_task = asyncio.create_task(self._hyde_chunks(query, candidates))
+        try:
+            direct_chunks = await retrieval_service.find_relevant_chunks(query=query, top_k=candidates)
+            budget = settings.HYDE_LATENCY_BUDGET_SECONDS
+            timeout = None if budget is None else max(0.0, budget - (time.perf_counter() - started))
+            done, _ = await asyncio.wait({hyde_task}, timeout=timeout)
+        finally:
+            if not hyde_task.done():
+                hyde_task.cancel() # Over budget (or this request was cancelled); stops the LLM call
+        if not done:
+            retrieval_stats["hyde_over_budget"] += 1
+            logger.warning(f"HyDE exceeded its {budget}s latency budget; using raw-query results.")
+            return _chunks_to_documents(await rerank_service.rerank(query, direct_chunks, top_k))
+        if hyde_task.exception() is not None:
+            retrieval_stats["hyde_failed"] += 1
+            logger.warning(f"HyDE retrieval failed: {hyde_task.exception()}. Using raw-query results.")
+            return _chunks_to_documents(await rerank_service.rerank(query, direct_chunks, top_k))
+        hyde_chunks = hyde_task.result()
+        retrieval_stats["fused"] += 1
+        fused = retrieval_service.reciprocal_rank_fusion([direct_chunks, hyde_chunks], top_k=candidates, k=settings.RRF_K)
+        return _chunks_to_documents(await rerank_service.rerank(query, fused, top_k))
+
+    async def ainvoke(self, input_str: str, **kwargs) -> List[LangchainDocument]: # Renamed input to input_str
+        top_k = kwargs.get('top_k', 3)
+        # Searches use the request's filters unless the caller passes its own RetrievalFilters
+        filters_token = retrieval_service.search_filters.set(kwargs["filters"]) if "filters" in kwargs else None
+        try:
+            if settings.RETRIEVAL_MODE == "hyde":
+                documents = await self.get_relevant_documents_with_hyde(input_str, top_k=top_k)
+            elif settings.RETRIEVAL_MODE == "direct":
+                documents = await self.get_relevant_documents(input_str, top_k=top_k)
+            else: # "fusion"
+                documents = await self.get_relevant_documents_fused(input_str, top_k=top_k)
+        finally:
+            if filters_token is not None:
+                retrieval_service.search_filters.reset(filters_token)
+        collected = _retrieved_documents.get()
+        if collected is not None: # The tool only hands the agent formatted text, so keep the documents for sources
+            collected.extend(documents)
+        return documents
+
+def build_agent_executor() -> AgentExecutor:
+    """
+    Builds the tools, ReAct prompt, agent and executor. The executor holds no per-request
+    state (chat history is passed in with each input), so one instance serves every request.
+    """
     retriever_tool = create_retriever_tool(
-        retriever_instance, # type: ignore # Langchain might expect a BaseRetriever, this wrapper is a workaround
-        "search_knowledge_base",
+        AsyncRetrieverWrapper(), # type: ignore # Langchain might expect a BaseRetriever, this wrapper is a workaround
+        RETRIEVER_TOOL_NAME,
         "Searches and returns relevant document chunks from the knowledge base based on the query. Use this first to find answers in the internal knowledge base."
     )
-    
+
     # Ensure Tavily API key is present before creating the tool
     tools_list = [retriever_tool]
     if settings.TAVILY_API_KEY:
         tavily_tool = TavilySearchResults(tavily_api_key=settings.TAVILY_API_KEY, max_results=3)
         tools_list.append(tavily_tool)
     else:
-        print("TAVILY_API_KEY not found. Tavily search tool will not be available.")
+        logger.warning("TAVILY_API_KEY not found. Tavily search tool will not be available.")
+    for tool in tools_list:
+        tool.callbacks = [telemetry_callbacks] # Times each call as "tool:<name>"
 
-    # Update prompt partials to use the dynamic tools_list
-    current_tools = tools_list
-    
-    # Define the prompt within the function scope to correctly capture current_tools
+    # Tool descriptions are rendered into the prompt once instead of on every call
     agent_prompt = PromptTemplate.from_template(react_prompt_template).partial(
-        tools=lambda: "\n".join([f"{tool.name}: {tool.description}" for tool in current_tools]),
-        tool_names=lambda: ", ".join([tool.name for tool in current_tools]),
+        tools="\n".join([f"{tool.name}: {tool.description}" for tool in tools_list]),
+        tool_names=", ".join([tool.name for tool in tools_list]),
     )
 
-    memory = ConversationBufferWindowMemory(
-        k=3,
-        memory_key="chat_history",
-        input_key="input",
-        output_key="output",
-        return_messages=True
-    )
-
-    agent = create_react_agent(llm, current_tools, agent_prompt) # Use current_tools and agent_prompt
+    agent = create_react_agent(llm, tools_list, agent_prompt)
 
-    agent_executor = AgentExecutor(
+    return AgentExecutor(
         agent=agent,
-        tools=current_tools, # Use current_tools
-        memory=memory,
-        verbose=True,
+        tools=tools_list,
+        verbose=settings.AGENT_VERBOSE,
         handle_parsing_errors=True,
         max_iterations=10,
-        return_intermediate_steps=True
+        return_intermediate_steps=True,
+        callbacks=[telemetry_callbacks], # Times each ReAct iteration
     )
 
+# Output AgentExecutor returns when it hits max_iterations (default early_stopping_method="force")
+AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+def _cacheable(result: Dict[str, Any], search_failures: List[str]) -> bool:
+    """
+    Whether an agent run produced a real Final Answer worth replaying to similar questions:
+    not a failed run, not one the executor stopped early, and not one written after a
+    knowledge-base search failed (the retriever tool reports those as "no results").
+    """
+    return (
+        "output" in result
+        and not result.get("failed")
+        and result["output"] != AGENT_STOPPED_OUTPUT
+        and not search_failures
+    )
+
+_agent_executor: Optional[AgentExecutor] = None
+
+def get_agent_executor() -> AgentExecutor:
+    """Returns the shared agent executor, building it on first use (normally at app startup)."""
+    global _agent_executor
+    if _agent_executor is None:
+        started = time.perf_counter()
+        _agent_executor = build_agent_executor()
+        logger.info(f"Agent executor built in {(time.perf_counter() - started) * 1000:.1f} ms.")
+    return _agent_executor
+
+# Questions answered directly, without running the agent
+SIMPLE_GREETINGS = frozenset(["hello", "hi", "hey", "test", "hello there", "hi there", "hey there", "greetings", "howdy"])
+META_DATABASE_QUERIES = frozenset([
+    "what is in your database",
+    "what's in your database",
+    "what do you have in your database",
+    "what information do you have",
+    "what do you know",
+    "what is in your knowledge base",
+    "what's in your knowledge base",
+    "what is in our knowledgebase",
+    "what is in your knowledgebase",
+    "what's in your knowledgebase"
+])
+
+def _direct_answer(question: str) -> Optional[Tuple[str, List[DocumentResponse], str]]:
+    """Canned replies for greetings and questions about the knowledge base itself; None otherwise."""
+    question_lower_stripped = question.lower().strip()
+    if question_lower_stripped in SIMPLE_GREETINGS or len(question_lower_stripped) < 3:
+        return f"Hello! I'm JARVIS, your AI assistant. How can I help you today?", [], "Direct response: simple query."
+
+    if question_lower_stripped in META_DATABASE_QUERIES:
+        meta_answer = (
+            "My knowledge base contains information from the documents you've uploaded. "
+            "This can include text files, PDFs, JSON files, and other supported formats. "
+            "I can search this information to answer your questions. "
+            "Do you have a specific topic you'd like to ask about from your documents?"
+        )
+        return meta_answer, [], "Direct response: meta-query about database content."
+    return None
+
+def _format_thought_process(intermediate_steps) -> str:
+    thought_process = ""
+    for step in intermediate_steps:
+        action, observation = step
+        thought_process += f"Thought: {action.log}\n"
+        thought_process += f"Action: {action.tool}\n"
+        thought_process += f"Action Input: {action.tool_input}\n"
+        observation_str = str(observation)
+        if len(observation_str) > 500:
+            thought_process += f"Observation: {observation_str[:500]}...\n"
+        else:
+            thought_process += f"Observation: {observation_str}\n"
+        thought_process += "\n"
+    return thought_process
+
+def _source_responses(documents: List[LangchainDocument]) -> List[DocumentResponse]:
+    """Converts retrieved documents to API sources, dropping duplicate content."""
+    unique_sources = []
+    seen_content = set()
+    for doc in documents:
+        if doc.page_content in seen_content:
+            continue
+        seen_content.add(doc.page_content)
+        unique_sources.append(DocumentResponse(
+            # 'id' in metadata is the chunk's Weaviate UUID
+            id=uuid.UUID(doc.metadata.get('id')) if doc.metadata.get('id') and isinstance(doc.metadata.get('id'), str) else uuid.uuid4(),
+            content=doc.page_content,
+            doc_metadata=doc.metadata or {} # metadata is already a dict
+        ))
+    return unique_sources
+
+async def _lookup_cached_answer(question: str, chat_history: Optional[Sequence[BaseMessage]]) -> Tuple[Optional[CachedAnswer], Optional[List[float]], int]:
+    """
+    Returns (cached answer or None, question embedding, cache generation). Follow-up
+    questions depend on the conversation, and filtered questions on their scope, so only
+    unfiltered questions without history use the cache.
+    """
+    if answer_cache is None or chat_history or retrieval_service.search_filters.get() is not None:
+        return None, None, 0
+    generation = answer_cache.generation # Read before answering; see SemanticAnswerCache.store
     try:
-        question_lower_stripped = question.lower().strip()
-        simple_greetings = ["hello", "hi", "hey", "test", "hello there", "hi there", "hey there", "greetings", "howdy"]
-        meta_database_queries = [
-            "what is in your database", 
-            "what's in your database", 
-            "what do you have in your database",
-            "what information do you have",
-            "what do you know",
-            "what is in your knowledge base",
-            "what's in your knowledge base",
-            "what is in our knowledgebase", 
-            "what is in your knowledgebase", 
-            "what's in your knowledgebase"   
-        ]
-
-        if question_lower_stripped in simple_greetings or len(question_lower_stripped) < 3:
-            return f"Hello! I'm JARVIS, your AI assistant. How can I help you today?", [], "Direct response: simple query."
-        
-        if question_lower_stripped in meta_database_queries:
-            meta_answer = (
-                "My knowledge base contains information from the documents you've uploaded. "
-                "This can include text files, PDFs, JSON files, and other supported formats. "
-                "I can search this information to answer your questions. "
-                "Do you have a specific topic you'd like to ask about from your documents?"
-            )
-            return meta_answer, [], "Direct response: meta-query about database content."
-        
-        result = await agent_executor.ainvoke({"input": question})
-        final_answer = result.get("output", "Sorry, I could not find an answer.")
-
-        thought_process = ""
-        intermediate_steps = result.get("intermediate_steps", [])
-        for step in intermediate_steps:
-            action, observation = step
-            thought_process += f"Thought: {action.log}\n"
-            thought_process += f"Action: {action.tool}\n"
-            thought_process += f"Action Input: {action.tool_input}\n"
-            observation_str = str(observation)
-            if len(observation_str) > 500:
-                thought_process += f"Observation: {observation_str[:500]}...\n"
-            else:
-                thought_process += f"Observation: {observation_str}\n"
-            thought_process += "\n"
-
-        sources = []
-        for step in intermediate_steps:
-            action, observation = step
-            if action.tool == retriever_tool.name and isinstance(observation, list) and all(isinstance(doc, LangchainDocument) for doc in observation):
-                sources.extend([
-                    DocumentResponse(
-                        # 'id' in metadata is the chunk's Weaviate UUID
-                        id=uuid.UUID(doc.metadata.get('id')) if doc.metadata.get('id') and isinstance(doc.metadata.get('id'), str) else uuid.uuid4(),
-                        content=doc.page_content,
-                        doc_metadata=doc.metadata or {} # metadata is already a dict
-                    ) for doc in observation
-                ])
-
-        unique_sources = []
-        seen_content = set()
-        for src in sources:
-            if src.content not in seen_content:
-                unique_sources.append(src)
-                seen_content.add(src.content)
-
-        return final_answer, unique_sources, thought_process
+        vector = await retrieval_service.embed_query(question)
+    except Exception as e:
+        logger.warning(f"Could not embed question for the answer cache: {e}")
+        return None, None, generation
+    return answer_cache.lookup(vector, _cache_tenant()), vector, generation
+
+def _cache_tenant() -> str:
+    return retrieval_service.search_tenant.get() or settings.DEFAULT_TENANT
+
+# --- Retrieve-then-answer fast path --- #
+
+INSUFFICIENT_CONTEXT = "INSUFFICIENT_CONTEXT"
+
+retrieval_answer_template = """
+You are JARVIS, an intelligent assistant. Answer the question using only the context
+from the user's knowledge base below. Be concise and mention the source file when helpful.
+If the context does not contain the answer, reply with exactly {insufficient} and nothing else.
+
+Previous conversation history:
+{chat_history}
+
+Context:
+{context}
+
+Question: {question}
+Answer:"""
+
+_retrieval_chain = None
+
+def get_retrieval_chain():
+    """Returns the shared retrieve-then-answer prompt | llm chain, building it on first use."""
+    global _retrieval_chain
+    if _retrieval_chain is None:
+        prompt = PromptTemplate.from_template(retrieval_answer_template).partial(insufficient=INSUFFICIENT_CONTEXT)
+        _retrieval_chain = prompt | llm
+    return _retrieval_chain
+
+async def _retrieve_for_fast_path(question: str, chat_history: Optional[Sequence[BaseMessage]]) -> Tuple[List[LangchainDocument], Dict[str, str]]:
+    top_k = settings.QUERY_FAST_PATH_TOP_K
+    chunks = await retrieval_service.find_relevant_chunks(query=question, top_k=rerank_service.candidate_count(top_k))
+    documents = _chunks_to_documents(await rerank_service.rerank(question, chunks, top_k))
+    context = "\n\n".join(
+        f"[{index + 1}] ({doc.metadata.get('source_filename', 'unknown source')}) {doc.page_content}"
+        for index, doc in enumerate(documents)
+    )
+    return documents, {"question": question, "context": context, "chat_history": get_buffer_string(chat_history or [])}
+
+def _fast_path_thought_process(decision: RouteDecision, documents: List[LangchainDocument]) -> str:
+    return f"Route: retrieval ({decision.reason}).\nAnswered from {len(documents)} retrieved chunks in a single generation, without the agent.\n"
+
+async def _answer_with_retrieval(
+    question: str, chat_history: Optional[Sequence[BaseMessage]], decision: RouteDecision
+) -> Optional[Tuple[str, List[DocumentResponse], str]]:
+    """One retrieval and one generation. Returns None when the context cannot answer the question."""
+    documents, inputs = await _retrieve_for_fast_path(question, chat_history)
+    if not documents:
+        return None
+    result = await get_retrieval_chain().ainvoke(inputs)
+    answer = (result.content if hasattr(result, "content") else str(result)).strip()
+    if answer.startswith(INSUFFICIENT_CONTEXT):
+        return None
+    return answer, _source_responses(documents), _fast_path_thought_process(decision, documents)
+
+# --- Service Function --- #
+
+async def answer_question(
+    question: str,
+    chat_history: Optional[Sequence[BaseMessage]] = None,
+    alpha: Optional[float] = None,
+    filters: Optional[RetrievalFilters] = None,
+    tenant: Optional[str] = None,
+) -> Tuple[str, List[DocumentResponse], str, str]: # Removed db argument
+    """
+    Answers a question from the documents stored in Weaviate. Simple lookups take a single
+    retrieve-then-answer chain; multi-hop or web questions (and lookups the retrieved context
+    cannot answer) go to the LangChain ReAct agent. `chat_history` holds earlier turns of the
+    conversation, if any. `alpha` (hybrid weighting), `filters` and `tenant` apply to every
+    knowledge-base search of this question. Returns (answer, sources, thought_process, route).
+    """
+    alpha_token = retrieval_service.search_alpha.set(alpha)
+    filters_token = retrieval_service.search_filters.set(filters)
+    tenant_token = retrieval_service.search_tenant.set(tenant)
+    try:
+        return await _answer_question(question, chat_history)
+    finally:
+        retrieval_service.search_tenant.reset(tenant_token)
+        retrieval_service.search_filters.reset(filters_token)
+        retrieval_service.search_alpha.reset(alpha_token)
+
+async def _answer_question(question: str, chat_history: Optional[Sequence[BaseMessage]]) -> Tuple[str, List[DocumentResponse], str, str]:
+    route = ROUTE_AGENT
+    try:
+        direct = _direct_answer(question)
+        if direct is not None:
+            return (*direct, ROUTE_DIRECT)
+
+        cached, question_vector, cache_generation = await _lookup_cached_answer(question, chat_history)
+        if cached is not None:
+            return cached.answer, cached.sources, cached.thought_process, ROUTE_CACHE
+
+        decision = await route_question(question, chat_history)
+        route = decision.route
+        fast_answer = None
+        if route == ROUTE_RETRIEVAL:
+            fast_answer = await _answer_with_retrieval(question, chat_history, decision)
+            if fast_answer is None:
+                route = ROUTE_AGENT # The knowledge base alone could not answer; let the agent search further
+
+        if fast_answer is not None:
+            final_answer, sources, thought_process = fast_answer
+            answered = True
+        else:
+            retrieved_documents: List[LangchainDocument] = []
+            _retrieved_documents.set(retrieved_documents)
+            search_failures: List[str] = []
+            retrieval_service.search_failures.set(search_failures)
+            result = await get_agent_executor().ainvoke({"input": question, "chat_history": get_buffer_string(chat_history or [])})
+            final_answer = result.get("output", "Sorry, I could not find an answer.")
+            sources = _source_responses(retrieved_documents)
+            thought_process = _format_thought_process(result.get("intermediate_steps", []))
+            answered = _cacheable(result, search_failures)
+
+        if question_vector is not None and answered:
+            answer_cache.store(question_vector, question, final_answer, sources, thought_process, cache_generation, _cache_tenant())
+        return final_answer, sources, thought_process, route
 
     except Exception as e:
-        print(f"Error running agent: {e}")
-        return f"An error occurred: {e}", [], f"Error occurred during execution: {e}"
+        logger.error(f"Error running agent: {e}")
+        return f"An error occurred: {e}", [], f"Error occurred during execution: {e}", route
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+class _ReActTokenSplitter:
+    """
+    Splits the streamed text of one ReAct LLM call into reasoning and final-answer deltas.
+    Text that could be the start of the "Final Answer:" marker is held back until it is decided.
+    """
+    def __init__(self):
+        self.text = ""
+        self.thought_sent = 0
+        self.answer_sent = 0
+
+    def feed(self, token: str) -> Tuple[str, str]:
+        self.text += token
+        marker_at = self.text.find(FINAL_ANSWER_MARKER)
+        if marker_at < 0:
+            thought_end = max(self.thought_sent, len(self.text) - len(FINAL_ANSWER_MARKER) + 1)
+            thought, self.thought_sent = self.text[self.thought_sent:thought_end], thought_end
+            return thought, ""
+        thought, self.thought_sent = self.text[self.thought_sent:marker_at], max(self.thought_sent, marker_at)
+        answer = self.text[marker_at + len(FINAL_ANSWER_MARKER):].lstrip()
+        delta, self.answer_sent = answer[self.answer_sent:], len(answer)
+        return thought, delta
+
+    def flush(self) -> str:
+        """Returns held-back reasoning text once the call ends without a final answer."""
+        if FINAL_ANSWER_MARKER in self.text:
+            return ""
+        thought, self.thought_sent = self.text[self.thought_sent:], len(self.text)
+        return thought
+
+async def _stream_retrieval(
+    question: str, chat_history: Optional[Sequence[BaseMessage]], decision: RouteDecision
+) -> AsyncIterator[Dict[str, Any]]:
+    """Streams the fast path. Ends without a `final` event when the context cannot answer the question."""
+    documents, inputs = await _retrieve_for_fast_path(question, chat_history)
+    if not documents:
+        return
+    sources = _source_responses(documents)
+    yield {"event": "sources", "data": {"sources": sources}}
+    answer = ""
+    sent = 0
+    async for chunk in get_retrieval_chain().astream(inputs):
+        answer += chunk.content if isinstance(chunk.content, str) else ""
+        stripped = answer.lstrip()
+        if len(stripped) < len(INSUFFICIENT_CONTEXT) and INSUFFICIENT_CONTEXT.startswith(stripped):
+            continue # Could still be the sentinel; hold it back
+        if stripped.startswith(INSUFFICIENT_CONTEXT):
+            return
+        yield {"event": "token", "data": {"text": stripped[sent:]}}
+        sent = len(stripped)
+    answer = answer.strip()
+    if not answer or answer.startswith(INSUFFICIENT_CONTEXT):
+        return
+    if len(answer) > sent: # Held-back text of a very short answer
+        yield {"event": "token", "data": {"text": answer[sent:]}}
+    yield {"event": "final", "data": {
+        "answer": answer, "sources": sources, "thought_process": _fast_path_thought_process(decision, documents), "cacheable": True,
+    }}
+
+async def _stream_agent(question: str, chat_history: Optional[Sequence[BaseMessage]]) -> AsyncIterator[Dict[str, Any]]:
+    retrieved_documents: List[LangchainDocument] = []
+    _retrieved_documents.set(retrieved_documents)
+    search_failures: List[str] = []
+    retrieval_service.search_failures.set(search_failures)
+    splitters: Dict[str, _ReActTokenSplitter] = {} # One per LLM call of the ReAct loop
+    sources_sent = 0
+    result: Dict[str, Any] = {}
+    try:
+        async for event in get_agent_executor().astream_events(
+            {"input": question, "chat_history": get_buffer_string(chat_history or [])}, version="v2"
+        ):
+            kind = event["event"]
+            if HYDE_TAG in event.get("tags", []):
+                continue
+            if kind == "on_chat_model_stream":
+                chunk = event["data"]["chunk"]
+                splitter = splitters.setdefault(event["run_id"], _ReActTokenSplitter())
+                thought, answer = splitter.feed(chunk.content if isinstance(chunk.content, str) else "")
+                if thought:
+                    yield {"event": "thought", "data": {"text": thought}}
+                if answer:
+                    yield {"event": "token", "data": {"text": answer}}
+            elif kind == "on_chat_model_end":
+                splitter = splitters.pop(event["run_id"], None)
+                thought = splitter.flush() if splitter else ""
+                if thought:
+                    yield {"event": "thought", "data": {"text": thought}}
+            elif kind == "on_chain_stream" and not event.get("parent_ids"): # Planned actions, before the tools run
+                for action in event["data"]["chunk"].get("actions", []):
+                    yield {"event": "tool_start", "data": {"tool": action.tool, "input": action.tool_input}}
+            elif kind == "on_tool_end":
+                output = str(event["data"].get("output", ""))
+                yield {"event": "tool_end", "data": {"tool": event["name"], "output": output[:500]}}
+                if event["name"] == RETRIEVER_TOOL_NAME and len(retrieved_documents) > sources_sent:
+                    yield {"event": "sources", "data": {"sources": _source_responses(retrieved_documents[sources_sent:])}}
+                    sources_sent = len(retrieved_documents)
+            elif kind == "on_chain_end" and not event.get("parent_ids"): # The AgentExecutor run itself
+                result = event["data"].get("output") or {}
+    except Exception as e:
+        logger.error(f"Error streaming agent: {e}")
+        yield {"event": "error", "data": {"detail": str(e)}}
+        result = {"output": f"An error occurred: {e}", "failed": True}
+
+    yield {"event": "final", "data": {
+        "answer": result.get("output", "Sorry, I could not find an answer."),
+        "sources": _source_responses(retrieved_documents),
+        "thought_process": _format_thought_process(result.get("intermediate_steps", [])),
+        "cacheable": _cacheable(result, search_failures),
+    }}
+
+async def stream_answer(
+    question: str,
+    chat_history: Optional[Sequence[BaseMessage]] = None,
+    alpha: Optional[float] = None,
+    filters: Optional[RetrievalFilters] = None,
+    tenant: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answers like `answer_question` but yields events as they happen: `route`, `thought`
+    (agent reasoning tokens), `tool_start`, `tool_end`, `sources` (retrieved documents),
+    `token` (final-answer tokens) and finally `final`, whose data matches the fields
+    returned by `answer_question`. If the retrieval fast path fails after streaming some
+    `sources` or `token` events, a `reset` event tells the client to discard them before
+    the agent's events (and a second `route`) follow.
+    """
+    # Not reset: a generator may be finalized in another context, and each streamed response runs in its own task
+    retrieval_service.search_alpha.set(alpha)
+    retrieval_service.search_filters.set(filters)
+    retrieval_service.search_tenant.set(tenant)
+    direct = _direct_answer(question)
+    if direct is not None:
+        answer, sources, thought_process = direct
+        yield {"event": "route", "data": {"route": ROUTE_DIRECT, "reason": "canned reply"}}
+        yield {"event": "token", "data": {"text": answer}}
+        yield {"event": "final", "data": {"answer": answer, "sources": sources, "thought_process": thought_process, "route": ROUTE_DIRECT}}
+        return
+
+    cached, question_vector, cache_generation = await _lookup_cached_answer(question, chat_history)
+    if cached is not None:
+        yield {"event": "route", "data": {"route": ROUTE_CACHE, "reason": "similar question answered before"}}
+        if cached.sources:
+            yield {"event": "sources", "data": {"sources": cached.sources}}
+        yield {"event": "token", "data": {"text": cached.answer}}
+        yield {"event": "final", "data": {"answer": cached.answer, "sources": cached.sources, "thought_process": cached.thought_process, "route": ROUTE_CACHE}}
+        return
+
+    decision = await route_question(question, chat_history)
+    yield {"event": "route", "data": decision._asdict()}
+    final: Optional[Dict[str, Any]] = None
+    if decision.route == ROUTE_RETRIEVAL:
+        streamed = False # Whether the client already holds fast-path sources or tokens
+        try:
+            async for event in _stream_retrieval(question, chat_history, decision):
+                if event["event"] == "final":
+                    final = event["data"]
+                else:
+                    streamed = True
+                    yield event
+        except Exception as e:
+            logger.error(f"Error on the retrieval fast path: {e}")
+        if final is None:
+            decision = RouteDecision(ROUTE_AGENT, "retrieved context could not answer the question")
+            if streamed:
+                yield {"event": "reset", "data": {"reason": "retrieval fast path abandoned"}}
+            yield {"event": "route", "data": decision._asdict()}
+    if final is None:
+        async for event in _stream_agent(question, chat_history):
+            if event["event"] == "final":
+                final = event["data"]
+            else:
+                yield event
+
+    if final.pop("cacheable") and question_vector is not None:
+        answer_cache.store(question_vector, question, final["answer"], final["sources"], final["thought_process"], cache_generation, _cache_tenant())
+    yield {"event": "final", "data": {**final, "route": decision.route}}
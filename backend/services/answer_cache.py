@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np # Installed with langchain-community
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class CachedAnswer:
+    def __init__(self, key: int, question: str, answer: str, sources: List[Any], thought_process: str, source_files: Set[str], created_at: float, tenant: str = ""):
+        self.key = key
+        self.tenant = tenant # Answers are only served to the tenant whose documents produced them
+        self.question = question
+        self.answer = answer
+        self.sources = sources
+        self.thought_process = thought_process
+        # Files the answer cited. doc_id changes with every edit of a file, so answers are invalidated
+        # by filename: ingesting any version of a cited file into the tenant drops the answer
+        self.source_files = source_files
+        self.created_at = created_at
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by question embedding. A lookup returns the most similar cached
+    question's answer when the cosine similarity reaches `similarity_threshold`.
+    Vectors are kept normalized in one matrix so a lookup is a single matrix-vector product.
+    Entries are evicted LRU beyond `max_entries`, expire after `ttl_seconds`, and are
+    invalidated when ingestion stores new chunks of a file (by tenant and filename) they cite.
+    """
+    def __init__(self, max_entries: int, similarity_threshold: float, ttl_seconds: Optional[float]):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.generation = 0 # Bumped on every invalidation so answers computed meanwhile are not stored
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._by_source: Dict[Tuple[str, str], Set[int]] = {} # (tenant, source filename) -> entry keys
+        self._uncited: Set[int] = set() # Answers without knowledge-base sources
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[int] = [] # Entry key of each matrix row
+        self._row_tenants = np.empty(0, dtype=object) # Tenant of each matrix row
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm else None
+
+    def lookup(self, vector: List[float], tenant: str = "") -> Optional[CachedAnswer]:
+        query = self._normalize(vector)
+        with self._lock:
+            if query is None or self._vectors is None or not self._keys:
+                self.misses += 1
+                return None
+            similarities = self._vectors @ query
+            similarities[self._row_tenants != tenant] = -np.inf
+            row = int(np.argmax(similarities))
+            entry = self._entries[self._keys[row]]
+            if similarities[row] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            if self.ttl_seconds and entry.created_at + self.ttl_seconds < time.time():
+                self._remove(entry.key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry.key)
+            self.hits += 1
+            return entry
+
+    def store(self, vector: List[float], question: str, answer: str, sources: List[Any], thought_process: str, generation: int, tenant: str = ""):
+        """Caches an answer unless the cache was invalidated since `generation` was read."""
+        normalized = self._normalize(vector)
+        if normalized is None:
+            return
+        source_files = {
+            str(source.doc_metadata["source_filename"]) for source in sources if (source.doc_metadata or {}).get("source_filename")
+        }
+        with self._lock:
+            if generation != self.generation: # Documents changed while this answer was being produced
+                return
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = CachedAnswer(key, question, answer, sources, thought_process, source_files, time.time(), tenant)
+            for filename in source_files:
+                self._by_source.setdefault((tenant, filename), set()).add(key)
+            if not source_files:
+                self._uncited.add(key)
+            self._keys.append(key)
+            self._row_tenants = np.append(self._row_tenants, np.array([tenant], dtype=object))
+            row = normalized[np.newaxis, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key)
+        for filename in entry.source_files:
+            keys = self._by_source.get((entry.tenant, filename))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_source[(entry.tenant, filename)]
+        self._uncited.discard(key)
+        row = self._keys.index(key)
+        del self._keys[row]
+        self._row_tenants = np.delete(self._row_tenants, row)
+        self._vectors = np.delete(self._vectors, row, axis=0) if self._keys else None
+
+    def invalidate_sources(self, filenames: Iterable[str], tenant: str = "") -> int:
+        """
+        Drops the tenant's answers citing any of `filenames`, plus its answers that cited nothing
+        (new documents may now answer them). Returns the number of entries removed.
+        """
+        with self._lock:
+            self.generation += 1
+            keys = {key for key in self._uncited if self._entries[key].tenant == tenant}
+            for filename in filenames:
+                keys |= self._by_source.get((tenant, filename), set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached answers after ingestion.")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_source.clear()
+            self._uncited.clear()
+            self._keys = []
+            self._row_tenants = np.empty(0, dtype=object)
+            self._vectors = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+def build_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Builds the answer cache configured in Settings, or None when it is disabled."""
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache(
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    )
+
+answer_cache: Optional[SemanticAnswerCache] = build_answer_cache()
@@ -0,0 +1,45 @@
+# CPU-bound extraction helpers executed in the ingestion process pool.
+# Kept free of app imports (settings, Weaviate) so worker processes start quickly;
+# the LangChain splitter is only imported by workers that split text.
+import json
+from typing import Any, Dict, List, Tuple
+
+from pypdf import PdfReader
+
+def count_pdf_pages(path: str) -> int:
+    with open(path, "rb") as stream:
+        return len(PdfReader(stream).pages)
+
+def extract_pdf_page_range(path: str, start: int, end: int) -> List[str]:
+    """Returns the text of pages [start, end) of the PDF at `path`, one string per page with text."""
+    texts = []
+    with open(path, "rb") as stream:
+        reader = PdfReader(stream)
+        for page_number in range(start, min(end, len(reader.pages))):
+            page_text = reader.pages[page_number].extract_text()
+            if page_text:
+                texts.append(page_text + "\n")
+    return texts
+
+def json_document_text(raw: bytes) -> Tuple[str, str]:
+    """Parses a whole JSON document and returns (source_type, text) for it as a single text unit."""
+    json_data = json.loads(raw.decode("utf-8"))
+    if isinstance(json_data, dict):
+        return "json_dict", json.dumps(json_data, indent=2, ensure_ascii=False)
+    return "json_scalar", str(json_data)
+
+def load_json_document_text(path: str) -> Tuple[str, str]:
+    with open(path, "rb") as stream:
+        return json_document_text(stream.read())
+
+_text_splitters: Dict[Tuple[int, int], Any] = {}
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Splits `text` exactly like the in-process RecursiveCharacterTextSplitter does."""
+    splitter = _text_splitters.get((chunk_size, chunk_overlap))
+    if splitter is None:
+        # Imported on first use so workers that only parse PDFs never load it
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+        _text_splitters[(chunk_size, chunk_overlap)] = splitter
+    return splitter.split_text(text)
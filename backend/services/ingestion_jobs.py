@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import UploadFile
+
+from backend.core.config import settings
+from backend.core.vector_store import BatchWriter, VectorStore
+from backend.services import ingestion_service
+
+logger = logging.getLogger(__name__)
+
+class IngestionJob:
+    """One uploaded file waiting for, or going through, the ingestion pipeline."""
+    def __init__(self, filename: str, content_type: str, path: str, tenant: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.batch: Optional["IngestionBatch"] = None
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path # Spooled copy of the upload; removed once the job finishes
+        self.tenant = tenant
+        self.status = "queued" # queued -> running -> completed | failed
+        self.progress = ingestion_service.IngestionProgress()
+        self.chunk_count = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        started_at = self.progress.started_at
+        elapsed = ((self.finished_at or time.time()) - started_at) if started_at else 0.0
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "tenant": self.tenant,
+            "status": self.status,
+            "chunks": self.chunk_count,
+            **self.progress.to_dict(),
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(self.progress.chunks_total / elapsed, 2) if elapsed else 0.0,
+            "embedded_per_second": round(self.progress.chunks_embedded / elapsed, 2) if elapsed else 0.0,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionBatch:
+    """
+    Files uploaded together. At most `parallelism` of them are queued at a time; the
+    next file is queued as soon as one finishes, so a large batch cannot monopolise
+    the worker pool.
+    """
+    def __init__(self, jobs: List[IngestionJob], parallelism: int):
+        self.id = str(uuid.uuid4())
+        self.jobs = jobs
+        self.parallelism = parallelism
+        self.pending: Deque[IngestionJob] = deque(jobs)
+        self.created_at = time.time()
+        for job in jobs:
+            job.batch = self
+
+    def to_dict(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs:
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        finished_at = max((job.finished_at or 0.0) for job in self.jobs) if self.jobs else None
+        done = all(job.status in ("completed", "failed") for job in self.jobs)
+        return {
+            "batch_id": self.id,
+            "parallelism": self.parallelism,
+            "files": len(self.jobs),
+            "jobs": statuses,
+            "chunks_total": sum(job.progress.chunks_total for job in self.jobs),
+            "chunks_inserted": sum(job.progress.chunks_inserted for job in self.jobs),
+            "elapsed_seconds": round(((finished_at if done else time.time()) - self.created_at), 3),
+            "files_detail": [job.to_dict() for job in self.jobs],
+        }
+
+
+class IngestionJobQueue:
+    """
+    In-process job queue for ingestion. Uploads are spooled to disk and queued, and
+    `workers` asyncio tasks run them through `ingestion_service.process_stream`.
+    Finished jobs are kept (up to `history_size`) so their status stays queryable.
+    """
+    def __init__(self, store: VectorStore, workers: int, history_size: int, writer: Optional[BatchWriter] = None):
+        self.store = store
+        self.writer = writer # Shared by every job so concurrent files feed one store batch
+        self.worker_count = workers
+        self.history_size = history_size
+        self._queue: "asyncio.Queue[IngestionJob]" = asyncio.Queue()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._batches: "OrderedDict[str, IngestionBatch]" = OrderedDict()
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        for index in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index), name=f"ingestion-worker-{index}"))
+        logger.info(f"Started {self.worker_count} ingestion workers.")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Drop spooled files of jobs that never ran
+        while not self._queue.empty():
+            self._remove_spool(self._queue.get_nowait())
+        for batch in self._batches.values():
+            while batch.pending:
+                self._remove_spool(batch.pending.popleft())
+
+    async def _spool(self, file: UploadFile, tenant: Optional[str] = None) -> IngestionJob:
+        """Copies the upload to a temporary file that outlives the request."""
+        filename = file.filename or "unknown_file"
+        suffix = os.path.splitext(filename)[1]
+        fd, path = tempfile.mkstemp(prefix="ingest-", suffix=suffix, dir=settings.INGEST_SPOOL_DIR)
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                while block := await file.read(settings.INGEST_READ_BLOCK_BYTES):
+                    await asyncio.to_thread(spool.write, block)
+        except BaseException: # Including cancellation, so a half-written spool never lingers
+            os.remove(path)
+            raise
+        job = IngestionJob(filename, file.content_type or "application/octet-stream", path, tenant)
+        self._remember(job)
+        return job
+
+    async def submit(self, file: UploadFile, tenant: Optional[str] = None) -> IngestionJob:
+        """Spools the upload to a temporary file and queues it. Returns immediately after the copy."""
+        await self.store.acheck_tenant(tenant) # Before spooling, so a rejected tenant costs no copy
+        job = await self._spool(file, tenant)
+        await self._queue.put(job)
+        logger.info(f"Queued ingestion job {job.id} for {job.filename}.")
+        return job
+
+    async def submit_batch(self, files: List[UploadFile], parallelism: int, tenant: Optional[str] = None) -> IngestionBatch:
+        """
+        Spools every file and queues up to `parallelism` of them; the rest follow as earlier ones finish.
+        If any file cannot be spooled, the files spooled so far are removed and no job of the batch is kept.
+        """
+        await self.store.acheck_tenant(tenant)
+        jobs: List[IngestionJob] = []
+        try:
+            for file in files:
+                jobs.append(await self._spool(file, tenant))
+        except BaseException: # Also when the request is cancelled mid-upload
+            for job in jobs:
+                self._remove_spool(job)
+                self._jobs.pop(job.id, None)
+            raise
+        batch = IngestionBatch(jobs, max(1, parallelism))
+        self._batches[batch.id] = batch
+        while len(self._batches) > self.history_size:
+            self._batches.popitem(last=False)
+        for _ in range(min(batch.parallelism, len(batch.pending))):
+            await self._queue.put(batch.pending.popleft())
+        logger.info(f"Queued ingestion batch {batch.id} with {len(jobs)} files (parallelism {batch.parallelism}).")
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[IngestionBatch]:
+        return self._batches.get(batch_id)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def recent(self) -> List[IngestionJob]:
+        return list(reversed(self._jobs.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {"workers": len(self._workers), "queued": self._queue.qsize(), "jobs": statuses}
+
+    def _remember(self, job: IngestionJob):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history_size:
+            oldest_id = next(iter(self._jobs))
+            if self._jobs[oldest_id].status in ("queued", "running"):
+                break # Never forget unfinished jobs
+            del self._jobs[oldest_id]
+
+    @staticmethod
+    def _remove_spool(job: IngestionJob):
+        try:
+            os.remove(job.path)
+        except OSError as e:
+            logger.warning(f"Could not remove spooled upload {job.path}: {e}")
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+                if job.batch is not None and job.batch.pending:
+                    self._queue.put_nowait(job.batch.pending.popleft())
+
+    async def _run(self, job: IngestionJob):
+        job.status = "running"
+        logger.info(f"Running ingestion job {job.id} for {job.filename}.")
+        try:
+            with open(job.path, "rb") as stream:
+                chunk_count = await ingestion_service.process_stream(
+                    stream, job.filename, job.content_type,
+                    store=self.store, progress=job.progress, path=job.path, writer=self.writer, tenant=job.tenant
+                )
+            job.chunk_count = chunk_count
+            if chunk_count:
+                job.status = "completed"
+            else:
+                # This could happen if the file was empty or text extraction failed
+                job.status = "failed"
+                job.error = "Could not extract text or process file"
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} for {job.filename} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            job.progress.errors.append(str(e))
+        finally:
+            job.finished_at = time.time()
+            self._remove_spool(job)
@@ -1,225 +1,565 @@
 import logging
-import io
+import os
+import shutil
+import tempfile
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set, Iterator, AsyncIterator, BinaryIO, Deque, Tuple
+import asyncio
+import codecs
+import hashlib
+import itertools
 import json # Added for JSON processing
-import weaviate # Added for Weaviate client type hint
 
-# Setup basic logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 from fastapi import UploadFile
 # from core.database import WeaviateDBService # Removed
-from backend.core.weaviate_manager import get_weaviate_client, ensure_schema_exists # Added
+from backend.core.vector_store import BatchWriter, VectorStore, get_vector_store
+from backend.core.executors import get_process_pool, process_pool_size
+from backend.services import extraction
+from backend.core.embedding_scheduler import embedding_scheduler
+from backend.core.telemetry import observe, span
+from backend.services.answer_cache import answer_cache
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from pypdf import PdfReader
 
 # from models.document import Document # Removed
 from backend.core.config import settings # Ensure backend. is used for consistency
 
-# Initialize embeddings model
-# Ensure OPENAI_API_KEY is set in the environment or .env file
-embeddings = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY, model=settings.EMBEDDING_MODEL)
-
-async def _generate_embeddings(texts: List[str], batch_size: int = 100) -> List[List[float]]:
-    """Generates embeddings for a list of texts in batches."""
-    all_embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        logger.info(f"Generating embeddings for batch {i // batch_size + 1}...")
-        batch_embeddings = await embeddings.aembed_documents(batch)
-        all_embeddings.extend(batch_embeddings)
-        logger.info(f"Batch {i // batch_size + 1} embeddings generated.")
-    return all_embeddings
-
-def _extract_text_from_pdf(file_content: bytes) -> str:
-    """Extracts text from a PDF file."""
+# Fixed namespaces for deterministic (UUIDv5) IDs. Changing them orphans every stored chunk.
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2d8e-4b3a-5c9e-8d7f-2a1b0c9e8f7d")
+DOCUMENT_ID_NAMESPACE = uuid.UUID("0b7e5f3a-9c2d-5e1f-a4b6-8c7d6e5f4a3b")
+
+def chunk_uuid(chunk_text: str) -> uuid.UUID:
+    """
+    Content-addressed chunk ID: identical text embedded by the same provider and model at the
+    same EMBEDDING_DIM always gets the same UUID. A chunk whose text is already stored (from any
+    file) is not stored again, so it keeps the doc_id and source_filename of the first document.
+    """
+    model = settings.EMBEDDING_MODEL
+    if settings.EMBEDDING_DIM:
+        model = f"{model}@{settings.EMBEDDING_DIM}" # Shortened vectors live in their own named vector
+    if settings.EMBEDDING_PROVIDER != "openai":
+        model = f"{settings.EMBEDDING_PROVIDER}:{model}" # Stand-in vectors never share ids with real ones
+    return uuid.uuid5(CHUNK_ID_NAMESPACE, f"{model}\0{chunk_text}")
+
+def document_uuid(content_digest: str) -> uuid.UUID:
+    """Document ID derived from the file's bytes: the same file always gets the same ID, an edited one a new ID."""
+    return uuid.uuid5(DOCUMENT_ID_NAMESPACE, content_digest)
+
+def _hash_stream(stream: BinaryIO) -> str:
+    """SHA-256 hex digest of the whole stream, read block by block. Leaves the stream at the start."""
+    digest = hashlib.sha256()
+    stream.seek(0)
     try:
-        reader = PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n" 
-        return text
-    except Exception as e:
-        logger.error(f"Error extracting text from PDF: {e}")
-        return ""
+        while True:
+            block = stream.read(settings.INGEST_READ_BLOCK_BYTES)
+            if not block:
+                return digest.hexdigest()
+            digest.update(block)
+    finally:
+        stream.seek(0)
+
+async def _generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Generates embeddings for a list of texts in concurrent, rate-limited batches."""
+    return await embedding_scheduler.embed_documents(texts)
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
 
-def _extract_text_from_txt(file_content: bytes) -> str:
-    """Extracts text from a TXT file."""
+def _detect_text_encoding(stream: BinaryIO) -> str:
+    """Validates the stream as UTF-8 block by block, falling back to latin-1 like the old whole-file decode."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    stream.seek(0)
     try:
-        return file_content.decode("utf-8")
+        while True:
+            block = stream.read(settings.INGEST_READ_BLOCK_BYTES)
+            decoder.decode(block, final=not block)
+            if not block:
+                return "utf-8"
     except UnicodeDecodeError:
-        try:
-            return file_content.decode("latin-1") # Common fallback encoding
-        except Exception as e:
-            logger.error(f"Error decoding text file with fallback: {e}")
-            return ""
+        return "latin-1" # Common fallback encoding
+    finally:
+        stream.seek(0)
+
+async def _aiter_text_blocks(stream: BinaryIO) -> AsyncIterator[str]:
+    """Yields decoded text from a TXT/MD file in blocks of INGEST_READ_BLOCK_BYTES, reading off the event loop."""
+    try:
+        decoder = codecs.getincrementaldecoder(await asyncio.to_thread(_detect_text_encoding, stream))()
+        while True:
+            block = await asyncio.to_thread(stream.read, settings.INGEST_READ_BLOCK_BYTES)
+            text = decoder.decode(block, final=not block)
+            if text:
+                yield text
+            if not block:
+                return
     except Exception as e:
         logger.error(f"Error reading text file: {e}")
-        return ""
 
-async def process_file(file: UploadFile) -> List[uuid.UUID]:
+def _iter_json_array_items(stream: BinaryIO) -> Iterator[Any]:
     """
-    Processes an uploaded file, extracts text units based on content type,
-    chunks them, generates embeddings, and stores them in Weaviate.
-    Returns a list of UUIDs for the stored document chunks.
+    Yields the items of a top-level JSON array without loading the whole document.
+    Items are decoded with `JSONDecoder.raw_decode` from a rolling text buffer that is
+    refilled (with a growing read size for very large items) until an item is complete.
     """
-    content_bytes = await file.read()
-    filename = file.filename or "unknown_file"
-    content_type = file.content_type or "application/octet-stream" # Default if not provided
-    logger.info(f"Processing file: {filename}, type: {content_type}")
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+    read_size = settings.INGEST_READ_BLOCK_BYTES
+
+    def fill():
+        nonlocal buffer, pos, eof
+        block = stream.read(read_size)
+        eof = not block
+        buffer = buffer[pos:] + text_decoder.decode(block, final=eof)
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    stream.seek(0)
+    skip_whitespace()
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("JSON document is not an array.")
+    pos += 1
+    expect_item = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array.")
+        if buffer[pos] == "]":
+            return
+        if not expect_item:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' between JSON array items, found {buffer[pos]!r}.")
+            pos += 1
+            expect_item = True
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof # A number at the buffer edge may continue in the next block
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            fill()
+            read_size *= 2 # Large items would otherwise be re-parsed once per block
+            continue
+        read_size = settings.INGEST_READ_BLOCK_BYTES
+        pos = end
+        expect_item = False
+        if pos > read_size: # Drop consumed text so the buffer stays around one block
+            buffer = buffer[pos:]
+            pos = 0
+        yield item
 
-    client: Optional[weaviate.WeaviateClient] = None
+def _json_item_text(item: Any) -> str:
+    # Attempt to find a 'text' or 'content' field, or stringify the whole item
+    if isinstance(item, dict):
+        return item.get("text", item.get("content", item.get("message", json.dumps(item, ensure_ascii=False))))
+    if isinstance(item, str):
+        return item
+    return json.dumps(item, ensure_ascii=False)
+
+async def _aiter_pdf_pages(path: str) -> AsyncIterator[str]:
+    """
+    Yields PDF page texts parsed in the process pool. Pages are fanned out in tasks of
+    INGEST_PDF_PAGES_PER_TASK with up to one task per pool worker in flight, and yielded in order.
+    """
+    loop = asyncio.get_running_loop()
+    process_pool = get_process_pool()
+    inflight: Deque[asyncio.Future] = deque()
     try:
-        client = get_weaviate_client()
-        ensure_schema_exists(client)
+        page_count = await loop.run_in_executor(process_pool, extraction.count_pdf_pages, path)
+        task_starts = iter(range(0, page_count, settings.INGEST_PDF_PAGES_PER_TASK))
+
+        def submit_next():
+            start = next(task_starts, None)
+            if start is not None:
+                submitted = time.perf_counter()
+                future = loop.run_in_executor(
+                    process_pool, extraction.extract_pdf_page_range, path, start, start + settings.INGEST_PDF_PAGES_PER_TASK
+                )
+                # Timed at completion: tasks finishing out of order would otherwise include time spent waiting to be read
+                future.add_done_callback(lambda done: observe(
+                    "pdf_extraction", time.perf_counter() - submitted,
+                    "cancelled" if done.cancelled() else "error" if done.exception() else "ok",
+                ))
+                inflight.append(future)
+
+        for _ in range(process_pool_size()):
+            submit_next()
+        while inflight:
+            page_texts = await inflight.popleft()
+            submit_next()
+            for page_text in page_texts:
+                yield page_text
     except Exception as e:
-        logger.error(f"Failed to initialize Weaviate client or ensure schema for {filename}: {e}")
-        # Depending on desired behavior, you might re-raise or return empty list
-        raise ConnectionError(f"Could not connect to Weaviate or ensure schema: {e}") from e
+        logger.error(f"Error extracting text from PDF: {e}")
+    finally:
+        for future in inflight: # Generator closed early or failed
+            future.cancel()
+
+def _spool_to_temp_file(stream: BinaryIO, suffix: str) -> str:
+    """Copies `stream` to a temporary file so process-pool workers can open it by path."""
+    fd, path = tempfile.mkstemp(prefix="ingest-", suffix=suffix, dir=settings.INGEST_SPOOL_DIR)
+    with os.fdopen(fd, "wb") as spool:
+        stream.seek(0)
+        shutil.copyfileobj(stream, spool, settings.INGEST_READ_BLOCK_BYTES)
+    return path
 
+def _take(iterator: Iterator[Any], count: int) -> List[Any]:
+    return list(itertools.islice(iterator, count))
 
-    original_document_id = uuid.uuid4() # UUID for the entire source document/file
-    extracted_text_units: List[Dict[str, Any]] = []
+def _load_json_unit(stream: BinaryIO) -> Tuple[str, str]:
+    stream.seek(0)
+    return extraction.json_document_text(stream.read())
 
+async def _aiter_text_units(stream: BinaryIO, filename: str, content_type: str, path: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields the text units of a file based on content type. Each unit carries an
+    iterator of text segments (e.g. PDF pages or text blocks) rather than the full text.
+    Parsing runs in the process pool (PDFs, whole JSON documents) or a worker thread
+    (streamed JSON arrays, file reads) so it never stalls the event loop.
+    """
+    loop = asyncio.get_running_loop()
     if content_type == "application/json" or filename.endswith(".json"):
+        await asyncio.to_thread(stream.seek, 0)
+        first_char = (await asyncio.to_thread(stream.read, 64)).lstrip()[:1]
+        items_yielded = 0
         try:
-            json_data = json.loads(content_bytes.decode("utf-8"))
-            # More robust JSON handling (e.g. ChatGPT exports might be a list of conversations)
-            if isinstance(json_data, list): # Common for chat exports
+            if first_char == b"[": # Common for chat exports; streamed item by item
                 logger.info(f"JSON file {filename} contains a list. Processing each item as a text unit.")
-                for idx, item in enumerate(json_data):
-                    # Attempt to find a 'text' or 'content' field, or stringify the whole item
-                    item_text_content = ""
-                    if isinstance(item, dict):
-                        item_text_content = item.get("text", item.get("content", item.get("message", json.dumps(item, ensure_ascii=False))))
-                    elif isinstance(item, str):
-                        item_text_content = item
-                    else:
-                        item_text_content = json.dumps(item, ensure_ascii=False)
-                    extracted_text_units.append({"text": item_text_content, "source_type": "json_list_item", "original_index": idx})
-                if not extracted_text_units:
+                items = _iter_json_array_items(stream)
+                while item_batch := await asyncio.to_thread(_take, items, settings.INGEST_JSON_ITEMS_PER_STEP):
+                    for item in item_batch:
+                        yield {"segments": [_json_item_text(item)], "source_type": "json_list_item", "original_index": items_yielded}
+                        items_yielded += 1
+                if not items_yielded:
                     logger.warning(f"JSON file {filename} was an empty list or items had no processable text. No text units extracted.")
-            elif isinstance(json_data, dict): # A single JSON object
-                logger.info(f"JSON file {filename} is a dictionary. Processing as a single text unit.")
-                extracted_text_units.append({"text": json.dumps(json_data, indent=2, ensure_ascii=False), "source_type": "json_dict", "original_index": 0})
-            else: # Scalar value
-                logger.info(f"JSON file {filename} contains a scalar value. Processing as a single text unit.")
-                extracted_text_units.append({"text": str(json_data), "source_type": "json_scalar", "original_index": 0})
+                return
+            # Objects and scalars become a single unit anyway, so they are parsed whole
+            if path:
+                source_type, unit_text = await loop.run_in_executor(get_process_pool(), extraction.load_json_document_text, path)
+            else:
+                source_type, unit_text = await asyncio.to_thread(_load_json_unit, stream)
         except Exception as e:
+            if items_yielded:
+                logger.error(f"Error parsing JSON in {filename} after {items_yielded} items: {e}. Remaining content skipped.")
+                return
             logger.warning(f"Error parsing or processing JSON in {filename}: {e}. Falling back to plain text extraction.")
-            extracted_text_units.append({"text": _extract_text_from_txt(content_bytes), "source_type": "text_fallback_json_error", "original_index": 0})
+            yield {"segments": _aiter_text_blocks(stream), "source_type": "text_fallback_json_error", "original_index": 0}
+            return
+        logger.info(f"JSON file {filename} is a {'dictionary' if source_type == 'json_dict' else 'scalar value'}. Processing as a single text unit.")
+        yield {"segments": [unit_text], "source_type": source_type, "original_index": 0}
     elif content_type == "application/pdf":
-        extracted_text_units.append({"text": _extract_text_from_pdf(content_bytes), "source_type": "pdf", "original_index": 0})
+        yield {"segments": _aiter_pdf_pages(path), "source_type": "pdf", "original_index": 0}
     elif content_type == "text/plain" or content_type == "text/markdown" or filename.endswith(".md") or filename.endswith(".txt"):
-        extracted_text_units.append({"text": _extract_text_from_txt(content_bytes), "source_type": "text_or_markdown", "original_index": 0})
+        yield {"segments": _aiter_text_blocks(stream), "source_type": "text_or_markdown", "original_index": 0}
     else:
         logger.warning(f"Unsupported file type: {content_type} for {filename}. Attempting plain text extraction as fallback.")
-        txt_fallback = _extract_text_from_txt(content_bytes)
-        if not txt_fallback or txt_fallback.isspace():
-             logger.error(f"Fallback text extraction failed for unsupported file type: {content_type} on {filename}")
-             if client: client.close() # Ensure client is closed
-             raise ValueError(f"Unsupported file type: {content_type} which could not be processed as text either.")
-        extracted_text_units.append({"text": txt_fallback, "source_type": "text_fallback_unsupported", "original_index": 0})
-
-    weaviate_objects_to_insert = [] # Store dicts for Weaviate
-    all_processed_chunk_ids = [] # Store UUIDs of successfully processed chunks
-    
-    global_chunk_index_counter = 0 # Counter for chunk_index across the entire file
+        yield {"segments": _aiter_text_blocks(stream), "source_type": "text_fallback_unsupported", "original_index": 0}
+
+async def _aiter_segments(segments) -> AsyncIterator[str]:
+    """Iterates text segments whether they come from a list or an async iterator."""
+    if hasattr(segments, "__aiter__"):
+        async for segment in segments:
+            yield segment
+    else:
+        for segment in segments:
+            yield segment
+
+
+class _StreamingSplitter:
+    """
+    Splits text that arrives in segments. Only chunks followed by more text are
+    emitted; the last chunk stays buffered so it can grow or overlap with the next segment.
+    Buffers of INGEST_OFFLOAD_SPLIT_MIN_CHARS or more are split in the process pool.
+    """
+    def __init__(self, text_splitter: RecursiveCharacterTextSplitter, flush_threshold: int):
+        self.text_splitter = text_splitter
+        self.flush_threshold = flush_threshold
+        self.buffer = ""
+
+    async def _split(self, text: str) -> List[str]:
+        if len(text) <= CHUNK_SIZE: # Fits one chunk; the splitter would only strip it
+            stripped = text.strip()
+            return [stripped] if stripped else []
+        with span("chunking", chars=len(text)):
+            if len(text) >= settings.INGEST_OFFLOAD_SPLIT_MIN_CHARS:
+                return await asyncio.get_running_loop().run_in_executor(
+                    get_process_pool(), extraction.split_text, text, CHUNK_SIZE, CHUNK_OVERLAP
+                )
+            return self.text_splitter.split_text(text)
+
+    async def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        if len(self.buffer) < self.flush_threshold:
+            return []
+        chunks = await self._split(self.buffer)
+        if len(chunks) <= 1:
+            return []
+        tail_start = self.buffer.rfind(chunks[-1])
+        self.buffer = self.buffer[tail_start:] if tail_start >= 0 else chunks[-1]
+        return chunks[:-1]
+
+    async def flush(self) -> List[str]:
+        text, self.buffer = self.buffer, ""
+        if not text or text.isspace():
+            return []
+        return await self._split(text)
+
+
+class IngestionProgress:
+    """
+    Live progress of one file through the pipeline: the current stage, chunk counters,
+    accumulated seconds per stage and non-fatal errors. Read by the ingestion job API.
+    """
+    def __init__(self):
+        self.stage = "queued"
+        self.chunks_total = 0 # Chunks produced by the splitter
+        self.chunks_skipped = 0 # Already stored (content-addressed dedup)
+        self.chunks_embedded = 0
+        self.chunks_inserted = 0
+        self.chunks_failed = 0 # Chunks of failed windows, repeats included; the job result counts the same way
+        self.errors: List[str] = []
+        self.stage_seconds: Dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self._stage_started = time.monotonic()
+
+    def set_stage(self, stage: str):
+        now = time.monotonic()
+        if self.started_at is None and stage != "queued":
+            self.started_at = time.time()
+        self.stage_seconds[self.stage] = self.stage_seconds.get(self.stage, 0.0) + now - self._stage_started
+        self.stage = stage
+        self._stage_started = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "chunks_total": self.chunks_total,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_inserted": self.chunks_inserted,
+            "chunks_failed": self.chunks_failed,
+            "stage_seconds": {stage: round(seconds, 4) for stage, seconds in self.stage_seconds.items() if stage != "queued"},
+            "errors": self.errors,
+        }
+
+async def _flush_window(
+    window: List[Dict[str, Any]],
+    filename: str,
+    document_id: uuid.UUID,
+    store: VectorStore,
+    progress: IngestionProgress,
+    writer: Optional[BatchWriter] = None,
+    tenant: Optional[str] = None,
+) -> int:
+    """Embeds the chunks of one window that are not stored yet and inserts them. Returns the number inserted."""
+    progress.set_stage("deduplicating")
+    try:
+        with span("dedup_lookup", store=store.name, chunks=len(window)):
+            existing_chunk_ids = await store.aexisting_ids([chunk["id"] for chunk in window], tenant)
+    except Exception as e:
+        logger.warning(f"Could not look up existing chunks for {filename}: {e}. Embedding all chunks in this window.")
+        existing_chunk_ids = set()
+
+    new_chunks = [chunk for chunk in window if chunk["id"] not in existing_chunk_ids]
+    progress.chunks_skipped += len(window) - len(new_chunks)
+    logger.info(f"{len(existing_chunk_ids)} of {len(window)} chunks in window from {filename} are already stored. Embedding {len(new_chunks)} new chunks.")
+    if not new_chunks:
+        return 0
+
+    progress.set_stage("embedding")
+    new_chunk_embeddings = await _generate_embeddings([chunk["text"] for chunk in new_chunks])
+    progress.chunks_embedded += len(new_chunk_embeddings)
+
+    progress.set_stage("inserting")
+    ingested_at = datetime.now(timezone.utc)
+    objects = [
+        {
+            # Ensure these properties match the schema in weaviate_manager.py and vector_store.py
+            "properties": {
+                "content": chunk["text"],
+                "source_filename": filename,
+                "chunk_index": chunk["chunk_index"],
+                "doc_id": str(document_id), # Store the original document's ID
+                "modification_date": ingested_at, # When this content was stored; filterable by date range
+            },
+            "vector": embedding,
+            "id": str(chunk["id"]), # Provide our own UUID
+            "tenant": tenant
+        }
+        for chunk, embedding in zip(new_chunks, new_chunk_embeddings)
+    ]
+    if writer is not None:
+        await writer.write(objects) # Shared across concurrently ingested files
+    else:
+        with span("vector_insert", store=store.name, objects=len(objects)):
+            failures = await store.ainsert(objects)
+        if failures:
+            raise RuntimeError(f"{len(failures)} of {len(objects)} objects failed to insert: {next(iter(failures.values()))}")
+    progress.chunks_inserted += len(new_chunks)
+    logger.info(f"Added {len(new_chunks)} document chunks from {filename} to the {store.name} store.")
+    return len(new_chunks)
+
+async def process_file(
+    file: UploadFile,
+    store: Optional[VectorStore] = None,
+    tenant: Optional[str] = None,
+    progress: Optional[IngestionProgress] = None,
+) -> int:
+    """
+    Processes an uploaded file, extracts text units based on content type,
+    chunks them, generates embeddings, and stores them in the vector store.
+    Returns the number of the file's chunks that are stored (newly or already).
+    Chunks go to `store` (the process-wide VECTOR_STORE by default); pass `progress` to observe the stages.
+    """
+    await file.seek(0)
+    # UploadFile is spooled to disk past a size threshold, so read from its file object instead of `await file.read()`
+    return await process_stream(
+        file.file,
+        filename=file.filename or "unknown_file",
+        content_type=file.content_type or "application/octet-stream", # Default if not provided
+        store=store,
+        progress=progress,
+        tenant=tenant,
+    )
+
+async def process_stream(
+    stream: BinaryIO,
+    filename: str,
+    content_type: str,
+    store: Optional[VectorStore] = None,
+    progress: Optional[IngestionProgress] = None,
+    path: Optional[str] = None,
+    writer: Optional[BatchWriter] = None,
+    tenant: Optional[str] = None,
+) -> int:
+    """
+    Streams a file through extraction, splitting, embedding and insertion.
+    Chunks are flushed to the vector store in windows of INGEST_WINDOW_CHUNKS, so memory use is
+    bounded by the window size rather than the file size. Pass `progress` to observe it.
+    Returns the number of the file's chunks that are stored (newly or already).
+    PDF parsing runs in the process pool from `path` (a PDF stream without one is spooled to disk first).
+    Inserts go through `writer` when given, so concurrent files share one batch writer.
+    Chunks are stored under `tenant` (DEFAULT_TENANT when None) in a multi-tenant collection.
+    """
+    logger.info(f"Processing file: {filename}, type: {content_type}")
+
+    store = store or get_vector_store()
+    progress = progress or IngestionProgress()
+    progress.set_stage("connecting")
+    try:
+        store.ensure_schema() # Fail fast before spending on embeddings
+    except Exception as e:
+        logger.error(f"Failed to reach the {store.name} store or ensure schema for {filename}: {e}")
+        # Depending on desired behavior, you might re-raise or return empty list
+        raise ConnectionError(f"Could not connect to the {store.name} store or ensure schema: {e}") from e
+
+    original_document_id = document_uuid(await asyncio.to_thread(_hash_stream, stream)) # Same bytes, same document
 
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         length_function=len,
         # add_start_index=True, # Weaviate doesn't need this directly, we manage chunk_index
     )
 
-    for unit_index, unit_data in enumerate(extracted_text_units):
-        unit_text = unit_data["text"]
-        unit_source_type = unit_data["source_type"] # e.g. "pdf", "json_list_item"
-        # unit_original_index = unit_data["original_index"] # Index within the original file if it was a list
+    processed_count = 0 # Chunks of the file, whether newly stored or already present
+    failed_count = 0
+    window: List[Dict[str, Any]] = [] # Chunks awaiting embedding and insertion
+    window_chunk_ids: Set[uuid.UUID] = set() # Repeats within the window; earlier windows are deduped by the store lookup
+    window_chunk_count = 0 # Chunks produced since the last flush, repeats included
+    global_chunk_index_counter = 0 # Counter for chunk_index across the entire file
+    inserted_count = 0
+    unsupported_fallback = False
 
-        if not unit_text or unit_text.isspace():
-            logger.warning(f"Text unit {unit_index} from {filename} (type: {unit_source_type}) is empty or whitespace. Skipping.")
-            continue
+    async def flush():
+        nonlocal window, window_chunk_count, inserted_count, failed_count
+        if not window:
+            return
+        try:
+            window_inserted = await _flush_window(window, filename, original_document_id, store, progress, writer, tenant)
+            inserted_count += window_inserted
+            if window_inserted and answer_cache is not None: # Answers citing any version of this file may now be stale
+                answer_cache.invalidate_sources([filename], tenant or settings.DEFAULT_TENANT)
+        except Exception as e:
+            logger.error(f"Error embedding or storing a window of {len(window)} chunks from {filename}: {e}. Skipping these chunks.")
+            failed_count += window_chunk_count # Repeats included, like chunks_total and the returned count
+            progress.chunks_failed += window_chunk_count
+            progress.errors.append(f"Window of {window_chunk_count} chunks failed: {e}")
+        window = []
+        window_chunk_ids.clear()
+        window_chunk_count = 0
+        progress.set_stage("extracting")
 
-        current_unit_chunk_texts = text_splitter.split_text(unit_text)
+    progress.set_stage("extracting")
+    spooled_pdf_path = None
+    if content_type == "application/pdf" and not path: # PDFs are parsed in the process pool, which needs a file path
+        spooled_pdf_path = await asyncio.to_thread(_spool_to_temp_file, stream, ".pdf")
+        path = spooled_pdf_path
 
-        if not current_unit_chunk_texts:
-            logger.warning(f"Text unit {unit_index} from {filename} (type: {unit_source_type}) extracted but no chunks created. Skipping.")
-            continue
-        
-        logger.info(f"Created {len(current_unit_chunk_texts)} chunks for text unit {unit_index} from {filename} (type: {unit_source_type}).")
-        
-        try:
-            current_unit_chunk_embeddings = await _generate_embeddings(current_unit_chunk_texts)
-            logger.info(f"Generated {len(current_unit_chunk_embeddings)} embeddings for text unit {unit_index}.")
-
-            for i, chunk_text in enumerate(current_unit_chunk_texts):
-                chunk_id = uuid.uuid4() # Generate UUID for this chunk
-                
-                # Prepare properties for Weaviate object
-                # Ensure these match the schema in weaviate_manager.py
-                properties = {
-                    "content": chunk_text,
-                    "source_filename": filename,
-                    "chunk_index": global_chunk_index_counter,
-                    "doc_id": str(original_document_id), # Store the original document's ID
-                    # Optional fields, can be None if not available
-                    # "author": None, 
-                    # "creation_date": None,
-                    # "modification_date": None,
-                    # Additional metadata we might want to store, ensure schema supports them or add later
-                    # "text_unit_source_type": unit_source_type,
-                    # "file_content_type": content_type
-                }
-                
-                weaviate_object = {
-                    "properties": properties,
-                    "vector": current_unit_chunk_embeddings[i],
-                    "id": str(chunk_id) # Provide our own UUID
-                }
-                weaviate_objects_to_insert.append(weaviate_object)
-                all_processed_chunk_ids.append(chunk_id)
-                global_chunk_index_counter += 1
+    try:
+        unit_index = -1
+        async for unit_data in _aiter_text_units(stream, filename, content_type, path):
+            unit_index += 1
+            unit_source_type = unit_data["source_type"] # e.g. "pdf", "json_list_item"
+            unsupported_fallback = unsupported_fallback or unit_source_type == "text_fallback_unsupported"
+            splitter = _StreamingSplitter(text_splitter, flush_threshold=CHUNK_SIZE * 8)
+            unit_chunk_count = 0
 
-        except Exception as e:
-            logger.error(f"Error generating embeddings or creating Weaviate objects for text unit {unit_index} from {filename}: {e}. Skipping this unit's chunks.")
-            continue
+            def add_chunks(chunk_texts: List[str]):
+                nonlocal global_chunk_index_counter, unit_chunk_count, processed_count, window_chunk_count
+                for chunk_text in chunk_texts:
+                    chunk_id = chunk_uuid(chunk_text) # Content-addressed, so re-ingested chunks map to the same object
+                    processed_count += 1
+                    window_chunk_count += 1
+                    if chunk_id in window_chunk_ids:
+                        progress.chunks_skipped += 1
+                    else:
+                        window_chunk_ids.add(chunk_id)
+                        window.append({"id": chunk_id, "text": chunk_text, "chunk_index": global_chunk_index_counter})
+                    global_chunk_index_counter += 1
+                    unit_chunk_count += 1
+                progress.chunks_total += len(chunk_texts)
 
-    if weaviate_objects_to_insert:
-        try:
-            collection = client.collections.get(settings.WEAVIATE_INDEX_NAME)
-            with collection.batch.dynamic() as batch: # Using dynamic batching
-                for obj in weaviate_objects_to_insert:
-                    batch.add_object(
-                        properties=obj["properties"],
-                        vector=obj["vector"],
-                        uuid=obj["id"]
-                    )
-            
-            # Check for batch errors if the client version supports detailed results
-            # For now, we assume success if no exception is raised by the context manager
-            # or if batch.add_object doesn't raise immediately.
-            # More robust error handling can be added based on Weaviate client's batch reporting.
-            logger.info(f"Successfully added {len(weaviate_objects_to_insert)} document chunks from {filename} to Weaviate.")
+            async for segment in _aiter_segments(unit_data["segments"]):
+                add_chunks(await splitter.feed(segment))
+                if len(window) >= settings.INGEST_WINDOW_CHUNKS:
+                    await flush()
+            add_chunks(await splitter.flush())
+            if len(window) >= settings.INGEST_WINDOW_CHUNKS:
+                await flush()
 
-        except Exception as e:
-            logger.error(f"Error adding document chunks from {filename} to Weaviate: {e}")
-            # If batch insertion fails, we might have partial success.
-            # For now, returning all IDs that were prepared.
-            # Robust error handling would involve checking Weaviate's batch error reports.
-            if client: client.close()
-            return all_processed_chunk_ids # Or an empty list if total failure
-    else:
+            if not unit_chunk_count:
+                logger.warning(f"Text unit {unit_index} from {filename} (type: {unit_source_type}) is empty or whitespace. Skipping.")
+    finally:
+        if spooled_pdf_path:
+            os.remove(spooled_pdf_path)
+
+    await flush()
+    progress.set_stage("done")
+
+    if not processed_count:
+        if unsupported_fallback:
+            logger.error(f"Fallback text extraction failed for unsupported file type: {content_type} on {filename}")
+            raise ValueError(f"Unsupported file type: {content_type} which could not be processed as text either.")
         logger.warning(f"No document chunks were prepared for insertion from file: {filename}")
-        if client: client.close()
-        return []
+        return 0
 
-    logger.info(f"Total {len(all_processed_chunk_ids)} chunks successfully processed and stored from file: {filename}")
-    if client: client.close()
-    return all_processed_chunk_ids
+    stored_count = processed_count - failed_count
+    logger.info(f"Total {stored_count} chunks processed from file: {filename} ({inserted_count} newly stored, {failed_count} failed)")
+    return stored_count
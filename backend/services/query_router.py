@@ -0,0 +1,85 @@
+import logging
+import re
+from typing import NamedTuple, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import PromptTemplate
+
+from backend.core.config import settings
+from backend.core.providers import build_chat_model
+
+logger = logging.getLogger(__name__)
+
+# Routes reported in QueryResponse.route
+ROUTE_DIRECT = "direct" # Canned reply, no LLM call
+ROUTE_CACHE = "cache" # Served from the semantic answer cache
+ROUTE_RETRIEVAL = "retrieval" # One retrieval, one generation
+ROUTE_AGENT = "agent" # ReAct agent with knowledge-base and web search tools
+
+class RouteDecision(NamedTuple):
+    route: str
+    reason: str
+
+# Questions that need fresh information from the web
+_WEB_PATTERN = re.compile(
+    r"\b(latest|today|tonight|yesterday|tomorrow|this (week|month|year)|current(ly)?|news|weather|stock|price of|"
+    r"search (the )?(web|internet|online)|google|look up online|20[2-9]\d)\b",
+    re.IGNORECASE,
+)
+# Questions that usually take several lookups or reasoning steps
+_MULTI_HOP_PATTERN = re.compile(
+    r"\b(compare|comparison|difference between|differences|versus|vs\.?|both|each of|step[- ]by[- ]step|"
+    r"and then|after that|relationship between|pros and cons|trade-?offs?)\b",
+    re.IGNORECASE,
+)
+# Follow-ups that only make sense with the conversation; a plain retrieval would search for the pronoun
+_FOLLOW_UP_PATTERN = re.compile(r"\b(it|its|that|this|those|these|they|them|he|she|his|her|the same|above|previous)\b", re.IGNORECASE)
+
+_MAX_FAST_PATH_WORDS = 40
+
+ROUTER_PROMPT = PromptTemplate.from_template(
+    "Classify the question. Answer \"retrieval\" if it can be answered by looking up one topic "
+    "in the user's documents, or \"agent\" if it needs several lookups, reasoning across sources, "
+    "or information from the web. Reply with one word.\n\nQuestion: {question}\nRoute:"
+)
+
+_router_chain = None
+
+def _get_router_chain():
+    global _router_chain
+    if _router_chain is None:
+        _router_chain = ROUTER_PROMPT | build_chat_model(settings.QUERY_ROUTER_MODEL, temperature=0, max_tokens=3)
+    return _router_chain
+
+def classify_heuristically(question: str, chat_history: Optional[Sequence[BaseMessage]] = None) -> Optional[RouteDecision]:
+    """Returns a decision when a heuristic is conclusive, or None when the question looks like a simple lookup."""
+    if _WEB_PATTERN.search(question):
+        return RouteDecision(ROUTE_AGENT, "needs current information from the web")
+    if _MULTI_HOP_PATTERN.search(question) or question.count("?") > 1:
+        return RouteDecision(ROUTE_AGENT, "multi-part question")
+    if len(question.split()) > _MAX_FAST_PATH_WORDS:
+        return RouteDecision(ROUTE_AGENT, "long question")
+    if chat_history and _FOLLOW_UP_PATTERN.search(question):
+        return RouteDecision(ROUTE_AGENT, "follow-up that depends on the conversation")
+    return None
+
+async def route_question(question: str, chat_history: Optional[Sequence[BaseMessage]] = None) -> RouteDecision:
+    """
+    Chooses between the single retrieve-then-answer chain and the ReAct agent. Heuristics
+    decide clear cases; the rest go to QUERY_ROUTER_MODEL when configured, else to retrieval.
+    """
+    if not settings.QUERY_ROUTER_ENABLED:
+        return RouteDecision(ROUTE_AGENT, "router disabled")
+    decision = classify_heuristically(question, chat_history)
+    if decision is not None:
+        return decision
+    if settings.QUERY_ROUTER_MODEL:
+        try:
+            result = await _get_router_chain().ainvoke({"question": question})
+            label = (result.content if hasattr(result, "content") else str(result)).strip().lower()
+            if label.startswith(ROUTE_AGENT):
+                return RouteDecision(ROUTE_AGENT, f"classified by {settings.QUERY_ROUTER_MODEL}")
+            return RouteDecision(ROUTE_RETRIEVAL, f"classified by {settings.QUERY_ROUTER_MODEL}")
+        except Exception as e:
+            logger.warning(f"Query router model call failed: {e}. Falling back to heuristics.")
+    return RouteDecision(ROUTE_RETRIEVAL, "single knowledge-base lookup")
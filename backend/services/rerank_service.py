@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from backend.core.config import settings
+from backend.core.telemetry import observe
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+
+class LexicalScorer:
+    """
+    BM25 over the candidate set, blended with the first-stage rank. Cheap enough to run
+    inline; it mainly lifts candidates that contain the query's exact terms (identifiers,
+    error codes, names) above ones that are only semantically close.
+    """
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, rank_weight: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.rank_weight = rank_weight # Share of the score kept from the first-stage order
+
+    def _score_group(self, query: str, passages: Sequence[str]) -> List[float]:
+        documents = [_tokenize(passage) for passage in passages]
+        if not documents:
+            return []
+        average_length = sum(len(tokens) for tokens in documents) / len(documents) or 1.0
+        document_frequency = Counter(term for tokens in documents for term in set(tokens))
+        query_terms = set(_tokenize(query))
+        bm25 = []
+        for tokens in documents:
+            frequencies = Counter(tokens)
+            length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / average_length)
+            score = 0.0
+            for term in query_terms:
+                frequency = frequencies.get(term)
+                if frequency:
+                    idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                    score += idf * frequency * (self.k1 + 1) / (frequency + length_norm)
+            bm25.append(score)
+        top = max(bm25) or 1.0
+        count = len(bm25)
+        return [
+            (1 - self.rank_weight) * score / top + self.rank_weight * (1 - rank / count)
+            for rank, score in enumerate(bm25)
+        ]
+
+    def score(self, groups: Sequence[Tuple[str, Sequence[str]]]) -> List[List[float]]:
+        return [self._score_group(query, passages) for query, passages in groups]
+
+
+class CrossEncoderScorer:
+    """
+    Local cross-encoder (sentence-transformers), e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2".
+    All pairs of a micro-batch go through one `predict` call.
+    """
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str, batch_size: int = 64):
+        from sentence_transformers import CrossEncoder # Optional dependency
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    def score(self, groups: Sequence[Tuple[str, Sequence[str]]]) -> List[List[float]]:
+        pairs = [(query, passage) for query, passages in groups for passage in passages]
+        if not pairs:
+            return [[] for _ in groups]
+        flat = [float(score) for score in self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)]
+        scores, offset = [], 0
+        for _, passages in groups:
+            scores.append(flat[offset:offset + len(passages)])
+            offset += len(passages)
+        return scores
+
+
+class Reranker:
+    """
+    Reorders over-fetched retrieval candidates and keeps the best `top_k`. Requests that
+    arrive within `max_wait_seconds` of each other are scored together (up to
+    `max_batch_pairs` query/passage pairs) in one worker-thread call, so a cross-encoder
+    runs one forward pass per micro-batch instead of one per request.
+    """
+    def __init__(self, scorer, max_batch_pairs: int, max_wait_seconds: float, window: int = 1000):
+        self.scorer = scorer
+        self.max_batch_pairs = max_batch_pairs
+        self.max_wait_seconds = max_wait_seconds
+        self.requests = 0
+        self.batches = 0
+        self.pairs = 0
+        self.failures = 0
+        self._latencies: Deque[float] = deque(maxlen=window) # Per request, queueing included
+        self._batch_seconds = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run(), name="reranker")
+
+    async def rerank(self, query: str, chunks: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """Returns the `top_k` best chunks, each with a `rerank_score`. Falls back to the input order on error."""
+        if len(chunks) <= 1:
+            return chunks[:top_k]
+        started = time.perf_counter()
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, chunks, future))
+        outcome = "ok"
+        try:
+            scores = await future
+        except Exception as e:
+            outcome = "error"
+            self.failures += 1
+            logger.warning(f"Reranking failed: {e}. Keeping the retrieval order.")
+            return chunks[:top_k]
+        finally:
+            self.requests += 1
+            self._latencies.append(time.perf_counter() - started)
+            observe("rerank", self._latencies[-1], outcome)
+        order = sorted(range(len(chunks)), key=lambda index: scores[index], reverse=True)[:top_k]
+        return [{**chunks[index], "rerank_score": scores[index]} for index in order]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            pair_count = len(batch[0][1])
+            deadline = loop.time() + self.max_wait_seconds
+            while pair_count < self.max_batch_pairs:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                pair_count += len(request[1])
+            groups = [(query, [chunk.get("content") or "" for chunk in chunks]) for query, chunks, _ in batch]
+            started = time.perf_counter()
+            try:
+                scores = await asyncio.to_thread(self.scorer.score, groups)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self._batch_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.pairs += pair_count
+            for (_, _, future), group_scores in zip(batch, scores):
+                if not future.done(): # Caller went away
+                    future.set_result(group_scores)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "enabled": True,
+            "scorer": self.scorer.name,
+            "candidates": settings.RERANK_CANDIDATES,
+            "requests": self.requests,
+            "failures": self.failures,
+            "batches": self.batches,
+            "pairs": self.pairs,
+            "mean_batch_pairs": self.pairs / self.batches if self.batches else 0.0,
+            "mean_batch_seconds": self._batch_seconds / self.batches if self.batches else 0.0,
+            "recent_p50_seconds": latencies[len(latencies) // 2] if latencies else 0.0,
+            "recent_p95_seconds": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+        }
+
+def build_reranker() -> Optional[Reranker]:
+    """Builds the reranker configured in Settings, or None when reranking is disabled."""
+    if not settings.RERANK_ENABLED:
+        return None
+    scorer = LexicalScorer()
+    if settings.RERANK_MODEL:
+        try:
+            scorer = CrossEncoderScorer(settings.RERANK_MODEL)
+        except Exception as e: # ImportError without sentence-transformers, or a model that cannot be loaded
+            logger.error(f"Could not load rerank model {settings.RERANK_MODEL}: {e}. Using the lexical scorer.")
+    return Reranker(
+        scorer,
+        max_batch_pairs=settings.RERANK_BATCH_MAX_PAIRS,
+        max_wait_seconds=settings.RERANK_BATCH_WAIT_MS / 1000,
+    )
+
+_reranker: Optional[Reranker] = None
+
+def get_reranker() -> Optional[Reranker]:
+    """
+    The process-wide reranker, built on first use so importing this module never loads a
+    cross-encoder. The app builds it at startup (in a worker thread) so no request pays for that.
+    """
+    global _reranker
+    if _reranker is None and settings.RERANK_ENABLED:
+        _reranker = build_reranker()
+    return _reranker
+
+async def close_reranker():
+    global _reranker
+    if _reranker is not None:
+        await _reranker.close()
+        _reranker = None
+
+def candidate_count(top_k: int) -> int:
+    """How many chunks to fetch from Weaviate for a final `top_k`: over-fetched when reranking is on."""
+    return max(top_k, settings.RERANK_CANDIDATES) if settings.RERANK_ENABLED else top_k
+
+async def rerank(query: str, chunks: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """Reranks candidates with the configured reranker, or just truncates them when reranking is off."""
+    reranker = get_reranker()
+    if reranker is None:
+        return chunks[:top_k]
+    return await reranker.rerank(query, chunks, top_k)
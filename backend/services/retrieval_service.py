@@ -1,71 +1,98 @@
+from contextvars import ContextVar
 from typing import List, Dict, Any, Optional
 import logging
-import weaviate # Added
 import uuid # Added for type hinting
 
 # from sqlalchemy.ext.asyncio import AsyncSession # Removed
-from langchain_openai import OpenAIEmbeddings
 # from langchain_community.vectorstores import FAISS # Removed
 
 # from models.document import Document # Removed
 from backend.core.config import settings # Ensure backend. prefix
-from backend.core.weaviate_manager import get_weaviate_client # Added
+from backend.core.vector_store import VectorStore, get_vector_store
+from backend.core.embedding_cache import query_embedding_cache
+from backend.core.embedding_scheduler import embedding_scheduler # Same model (and rate limits) as ingestion
+from backend.core.telemetry import span
+from backend.schemas.document import RetrievalFilters
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Initialize embeddings model (ensure consistency with ingestion)
-embeddings_model = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY, model=settings.EMBEDDING_MODEL)
+async def embed_query(query: str) -> List[float]:
+    """Embeds a query through the shared embedding scheduler, serving repeated (normalized) queries from the embedding cache."""
+    with span("query_embedding"):
+        if query_embedding_cache is None:
+            return await embedding_scheduler.embed_query(query)
+        return await query_embedding_cache.get_or_embed(query, embedding_scheduler.embed_query)
 
-async def find_relevant_chunks(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+# Per-request hybrid alpha (QueryRequest.alpha); None uses settings.HYBRID_ALPHA
+search_alpha: ContextVar[Optional[float]] = ContextVar("search_alpha", default=None)
+
+# Per-request metadata filters (QueryRequest.filters)
+search_filters: ContextVar[Optional[RetrievalFilters]] = ContextVar("search_filters", default=None)
+# Per-request tenant (QueryRequest.tenant); None uses settings.DEFAULT_TENANT
+search_tenant: ContextVar[Optional[str]] = ContextVar("search_tenant", default=None)
+# Set to a list by callers that need to know whether a search failed (searches return [] on error)
+search_failures: ContextVar[Optional[List[str]]] = ContextVar("search_failures", default=None)
+
+def _record_failure(error: Exception):
+    failures = search_failures.get()
+    if failures is not None:
+        failures.append(str(error))
+
+async def find_relevant_chunks(
+    query: str,
+    top_k: int = 5,
+    store: Optional[VectorStore] = None,
+    alpha: Optional[float] = None,
+    filters: Optional[RetrievalFilters] = None,
+    tenant: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     """
-    Finds the most relevant document chunks for a given query using Weaviate vector similarity search.
-    Returns a list of dictionaries, each containing chunk content and metadata.
+    Finds the most relevant document chunks for a given query. With SEARCH_MODE="hybrid",
+    the vector store fuses BM25 keyword scores on `content` with vector similarity; `alpha` weights
+    the two (1 = pure vector, 0 = pure keyword) and defaults to the request's `search_alpha`,
+    then settings.HYBRID_ALPHA. `filters` (default: the request's `search_filters`) restricts
+    the search to matching chunks, and `tenant` (default: the request's `search_tenant`) to one
+    tenant's index. Returns a list of dictionaries with chunk content and metadata.
+    Searches `store` (the process-wide VECTOR_STORE by default) through its `asearch`: on the
+    event loop with Weaviate's async client, in a worker thread for stores without one (local).
     """
-    client: Optional[weaviate.WeaviateClient] = None
+    store = store or get_vector_store()
+    if alpha is None:
+        alpha = search_alpha.get()
+    if alpha is None:
+        alpha = settings.HYBRID_ALPHA
+    if filters is None:
+        filters = search_filters.get()
     try:
-        client = get_weaviate_client()
-        # Schema check is typically done at startup or by ingestion, not usually per query.
-        # If client.is_connected() or similar check is available, it might be good.
-        # For now, assume client is connected if get_weaviate_client() doesn't raise.
-
-        query_embedding = await embeddings_model.aembed_query(query)
+        query_embedding = await embed_query(query)
         logger.info(f"Generated query embedding (dim: {len(query_embedding)}) for query: '{query[:50]}...'")
 
-        collection = client.collections.get(settings.WEAVIATE_INDEX_NAME)
-        
-        response = collection.query.near_vector(
-            near_vector=query_embedding,
-            limit=top_k,
-            return_metadata=weaviate.classes.query.MetadataQuery(distance=True), # Include distance
-            return_properties=["content", "source_filename", "chunk_index", "doc_id"] # Specify properties to return
-        )
-
-        relevant_chunks = []
-        if response.objects:
-            for obj in response.objects:
-                chunk_data = {
-                    "id": str(obj.uuid), # The UUID of the Weaviate object (chunk)
-                    "content": obj.properties.get("content"),
-                    "source_filename": obj.properties.get("source_filename"),
-                    "chunk_index": obj.properties.get("chunk_index"),
-                    "doc_id": obj.properties.get("doc_id"), # Original document ID
-                    "distance": obj.metadata.distance if obj.metadata else None,
-                    # Add other metadata from obj.properties as needed
-                }
-                relevant_chunks.append(chunk_data)
-        
-        logger.info(f"Retrieved {len(relevant_chunks)} relevant chunks from Weaviate for query: '{query[:50]}...'")
+        with span("vector_search", store=store.name, top_k=top_k):
+            relevant_chunks = await store.asearch(query, query_embedding, top_k, alpha, filters, tenant or search_tenant.get())
+        logger.info(f"Retrieved {len(relevant_chunks)} relevant chunks from the {store.name} store for query: '{query[:50]}...'")
         return relevant_chunks
 
     except ConnectionError as ce:
-        logger.error(f"Connection error during Weaviate retrieval: {ce}")
+        logger.error(f"Connection error during {store.name} retrieval: {ce}")
+        _record_failure(ce)
         return []
     except Exception as e:
-        logger.error(f"Error during Weaviate retrieval: {e}")
+        logger.error(f"Error during {store.name} retrieval: {e}")
+        _record_failure(e)
         return [] # Return empty list on error
-    finally:
-        if client:
-            client.close()
-            logger.info("Weaviate client connection closed after retrieval.")
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merges ranked chunk lists with reciprocal rank fusion: each chunk scores
+    sum(1 / (k + rank)) over the lists it appears in. Chunks are matched by `id`;
+    the returned dicts carry the fused score as `rrf_score`.
+    """
+    scores: Dict[str, float] = {}
+    chunks: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            chunk_id = chunk["id"]
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(chunk_id, chunk)
+    fused_ids = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [{**chunks[chunk_id], "rrf_score": scores[chunk_id]} for chunk_id in fused_ids]
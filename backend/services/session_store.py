@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import PromptTemplate
+
+from backend.core.config import settings
+from backend.core.embedding_scheduler import embedding_scheduler
+from backend.core.providers import build_chat_model
+
+logger = logging.getLogger(__name__)
+
+Turn = Tuple[str, str] # (question, answer)
+SessionKey = Tuple[str, str] # (tenant, session_id)
+
+class ConversationSession:
+    """Conversation state for one session: a running summary plus the most recent turns verbatim."""
+    def __init__(
+        self,
+        session_id: str,
+        tenant: str,
+        summary: str = "",
+        turns: Optional[List[Turn]] = None,
+        updated_at: Optional[float] = None,
+    ):
+        self.session_id = session_id
+        self.tenant = tenant # Sessions are only found again by the tenant that started them
+        self.summary = summary
+        self.turns: List[Turn] = turns or []
+        self.updated_at = updated_at or time.time()
+
+    def messages(self) -> List[BaseMessage]:
+        """The history as chat messages, ready for the agent prompt."""
+        history: List[BaseMessage] = []
+        if self.summary:
+            history.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        for question, answer in self.turns:
+            history.append(HumanMessage(content=question))
+            history.append(AIMessage(content=answer))
+        return history
+
+    @property
+    def key(self) -> SessionKey:
+        return (self.tenant, self.session_id)
+
+    def token_count(self) -> int:
+        return embedding_scheduler.count_tokens(self.summary) + sum(
+            embedding_scheduler.count_tokens(question) + embedding_scheduler.count_tokens(answer)
+            for question, answer in self.turns
+        )
+
+
+class SQLiteSessionBackend:
+    """
+    Persists sessions to SQLite so conversations survive restarts and LRU eviction.
+    The `a`-prefixed methods run on one dedicated thread, so the event loop never waits on
+    SQLite and writes land in the order they were issued.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_sessions (tenant TEXT NOT NULL, session_id TEXT NOT NULL, summary TEXT NOT NULL, "
+            "turns TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (tenant, session_id))"
+        )
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'").fetchone():
+            # Sessions stored before they were scoped by tenant belong to the default tenant
+            self._conn.execute(
+                "INSERT OR IGNORE INTO conversation_sessions SELECT ?, session_id, summary, turns, updated_at FROM sessions",
+                (settings.DEFAULT_TENANT,),
+            )
+            self._conn.execute("DROP TABLE sessions")
+        self._conn.commit()
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def load(self, key: SessionKey) -> Optional[ConversationSession]:
+        tenant, session_id = key
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, turns, updated_at FROM conversation_sessions WHERE tenant = ? AND session_id = ?", (tenant, session_id)
+            ).fetchone()
+        if row is None:
+            return None
+        summary, turns, updated_at = row
+        return ConversationSession(session_id, tenant, summary, [tuple(turn) for turn in json.loads(turns)], updated_at)
+
+    def save(self, row: Tuple[str, str, str, str, float]):
+        """Writes a (tenant, session_id, summary, turns JSON, updated_at) row."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversation_sessions (tenant, session_id, summary, turns, updated_at) VALUES (?, ?, ?, ?, ?)", row
+            )
+            self._conn.commit()
+
+    def delete(self, key: SessionKey):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversation_sessions WHERE tenant = ? AND session_id = ?", key)
+            self._conn.commit()
+
+    def delete_expired(self, older_than: float) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM conversation_sessions WHERE updated_at < ?", (older_than,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    async def aload(self, key: SessionKey) -> Optional[ConversationSession]:
+        return await self._run(self.load, key)
+
+    async def asave(self, session: ConversationSession):
+        # Snapshot on the loop; the thread only sees this copy
+        row = (session.tenant, session.session_id, session.summary, json.dumps(session.turns), session.updated_at)
+        await self._run(self.save, row)
+
+    async def adelete(self, key: SessionKey):
+        await self._run(self.delete, key)
+
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    "Progressively summarize the conversation below, adding onto the previous summary. "
+    "Keep names, facts and open questions; be concise.\n\n"
+    "Previous summary:\n{summary}\n\nNew lines of conversation:\n{lines}\n\nNew summary:"
+)
+
+class SessionStore:
+    """
+    Session-scoped conversation memory. Sessions are keyed by (tenant, session_id), so a
+    session ID is only valid for the tenant that started it. They live in an in-process LRU
+    capped at `max_sessions` (optionally backed by SQLite). Each session is kept under
+    `token_budget` tokens: once it grows past it, the oldest turns beyond
+    `recent_turns` are folded into a running summary by `summarize`.
+    """
+    def __init__(
+        self,
+        max_sessions: int,
+        token_budget: int,
+        recent_turns: int,
+        ttl_seconds: Optional[float],
+        summarize: Callable[[str, List[Turn]], Awaitable[str]],
+        backend: Optional[SQLiteSessionBackend] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.ttl_seconds = ttl_seconds
+        self.summarize = summarize
+        self.backend = backend
+        self.summaries = 0
+        self._sessions: "OrderedDict[SessionKey, ConversationSession]" = OrderedDict()
+        self._locks: Dict[SessionKey, asyncio.Lock] = {}
+        self._compactions: Set[asyncio.Task] = set()
+
+    def _expired(self, session: ConversationSession) -> bool:
+        return bool(self.ttl_seconds) and session.updated_at + self.ttl_seconds < time.time()
+
+    def _remember(self, session: ConversationSession):
+        self._sessions[session.key] = session
+        self._sessions.move_to_end(session.key)
+        while len(self._sessions) > self.max_sessions:
+            evicted_key, _ = self._sessions.popitem(last=False)
+            self._locks.pop(evicted_key, None)
+
+    async def get(self, session_id: Optional[str], tenant: Optional[str] = None) -> ConversationSession:
+        """Returns the tenant's session, creating a new one (with a fresh ID when `session_id` is None)."""
+        key = (tenant or settings.DEFAULT_TENANT, session_id or str(uuid.uuid4()))
+        session = self._sessions.get(key)
+        if session is None and self.backend is not None:
+            try:
+                session = await self.backend.aload(key)
+            except Exception as e:
+                logger.warning(f"Could not load session {key[1]}: {e}")
+            if key in self._sessions: # Created by a concurrent request while loading
+                session = self._sessions[key]
+        if session is None or self._expired(session):
+            session = ConversationSession(key[1], key[0])
+        self._remember(session)
+        return session
+
+    async def _persist(self, session: ConversationSession):
+        if self.backend is not None:
+            try:
+                await self.backend.asave(session)
+            except Exception as e:
+                logger.warning(f"Could not persist session {session.session_id}: {e}")
+
+    async def append_turn(self, session_id: str, question: str, answer: str, tenant: Optional[str] = None):
+        """Records a turn. Summarization, when needed, runs in the background off the response path."""
+        session = await self.get(session_id, tenant)
+        session.turns.append((question, answer))
+        session.updated_at = time.time()
+        await self._persist(session)
+        if len(session.turns) > self.recent_turns and session.token_count() > self.token_budget:
+            task = asyncio.create_task(self.compact(session_id, session.tenant))
+            self._compactions.add(task)
+            task.add_done_callback(self._compactions.discard)
+
+    async def compact(self, session_id: str, tenant: Optional[str] = None):
+        """Folds the oldest turns into the summary until the session fits its token budget."""
+        key = (tenant or settings.DEFAULT_TENANT, session_id)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock: # One summarization per session at a time
+            session = await self.get(session_id, tenant)
+            split = len(session.turns) - self.recent_turns
+            if split <= 0 or session.token_count() <= self.token_budget:
+                return
+            older = session.turns[:split]
+            try:
+                summary = await self.summarize(session.summary, older)
+                self.summaries += 1
+            except Exception as e:
+                logger.warning(f"Summarizing session {session_id} failed: {e}. Dropping {len(older)} old turns instead.")
+                summary = session.summary
+            session.summary = summary
+            del session.turns[:split] # Turns added while summarizing stay after the ones folded in
+            await self._persist(session)
+
+    async def delete(self, session_id: str, tenant: Optional[str] = None):
+        key = (tenant or settings.DEFAULT_TENANT, session_id)
+        self._sessions.pop(key, None)
+        self._locks.pop(key, None)
+        if self.backend is not None:
+            await self.backend.adelete(key)
+
+    def stats(self) -> Dict[str, object]:
+        tokens = [session.token_count() for session in self._sessions.values()]
+        return {
+            "sessions_in_memory": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "token_budget": self.token_budget,
+            "max_session_tokens": max(tokens, default=0),
+            "summaries": self.summaries,
+            "persistent": self.backend is not None,
+        }
+
+def make_summarizer(model: BaseChatModel) -> Callable[[str, List[Turn]], Awaitable[str]]:
+    """Summarizer making one `model` call that folds the turns into the running summary."""
+    async def summarize_turns(summary: str, turns: List[Turn]) -> str:
+        lines = "\n".join(f"Human: {question}\nAI: {answer}" for question, answer in turns)
+        result = await (SUMMARY_PROMPT | model).ainvoke({"summary": summary or "(none)", "lines": lines})
+        return (result.content if hasattr(result, "content") else str(result)).strip()
+    return summarize_turns
+
+def build_session_store(model: Optional[BaseChatModel] = None) -> SessionStore:
+    """Builds the session store configured in Settings, summarizing with `model` (default: LLM_MODEL)."""
+    backend = None
+    if settings.SESSION_STORE_PATH:
+        try:
+            backend = SQLiteSessionBackend(settings.SESSION_STORE_PATH)
+            if settings.SESSION_TTL_SECONDS:
+                backend.delete_expired(time.time() - settings.SESSION_TTL_SECONDS)
+        except Exception as e:
+            logger.error(f"Could not open session store at {settings.SESSION_STORE_PATH}: {e}. Sessions are kept in memory only.")
+    return SessionStore(
+        max_sessions=settings.SESSION_MAX_SESSIONS,
+        token_budget=settings.SESSION_HISTORY_TOKEN_BUDGET,
+        recent_turns=settings.SESSION_RECENT_TURNS,
+        ttl_seconds=settings.SESSION_TTL_SECONDS,
+        summarize=make_summarizer(model or build_chat_model(settings.LLM_MODEL, temperature=0)),
+        backend=backend,
+    )
+
+session_store = build_session_store()
@@ -0,0 +1,40 @@
+import asyncio
+import io
+import os
+
+# Deterministic local stand-ins, so ingestion needs neither OpenAI nor Weaviate
+os.environ.setdefault("EMBEDDING_PROVIDER", "hash")
+os.environ.setdefault("LLM_PROVIDER", "scripted")
+os.environ.setdefault("VECTOR_STORE", "local")
+
+from backend.core.config import settings
+from backend.core.providers import build_embeddings
+from backend.core.vector_store import LocalVectorStore
+from backend.schemas.document import DocumentResponse
+from backend.services import ingestion_service
+from backend.services.answer_cache import SemanticAnswerCache
+
+
+def _ingest(store: LocalVectorStore, text: str) -> int:
+    return asyncio.run(ingestion_service.process_stream(io.BytesIO(text.encode("utf-8")), "handbook.txt", "text/plain", store=store))
+
+
+def test_ingesting_an_edited_file_drops_answers_citing_the_old_version(tmp_path, monkeypatch):
+    cache = SemanticAnswerCache(max_entries=10, similarity_threshold=0.9, ttl_seconds=None)
+    monkeypatch.setattr(ingestion_service, "answer_cache", cache)
+    store = LocalVectorStore(str(tmp_path / "store"))
+    tenant = settings.DEFAULT_TENANT
+
+    assert _ingest(store, "Support hours are 9 to 5 on weekdays.")
+    question_vector = [1.0, 0.0, 0.0]
+    hits = store.search("support hours", build_embeddings().embed_query("support hours"), top_k=1, alpha=0.5)
+    assert hits and hits[0]["source_filename"] == "handbook.txt"
+    sources = [DocumentResponse(id=hits[0]["id"], content=hits[0]["content"], doc_metadata=hits[0])]
+    cache.store(question_vector, "When is support open?", "9 to 5 on weekdays.", sources, "", cache.generation, tenant)
+    assert cache.lookup(question_vector, tenant) is not None
+
+    assert _ingest(store, "Support hours are 8 to 8, every day of the week.")
+
+    assert cache.lookup(question_vector, tenant) is None
+    assert cache.invalidations == 1
+    store.close()
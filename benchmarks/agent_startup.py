@@ -0,0 +1,73 @@
+"""
+Agent construction benchmark: startup cost and per-request overhead.
+
+Compares building the ReAct agent executor on every request (the old behaviour) with
+reusing the one built at startup. The LLM is replaced by a canned fake, so the numbers
+are pure in-process overhead; no OpenAI or Weaviate calls are made.
+
+Run from the repository root:
+    python -m benchmarks.agent_startup --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark") # Clients are constructed but never called
+os.environ.setdefault("DATABASE_URL", "unused")
+
+def _summary(label: str, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(0.95 * len(samples_ms)))]
+    print(f"{label:<38} mean {statistics.mean(samples_ms):8.3f} ms   p50 {statistics.median(samples_ms):8.3f} ms   p95 {p95:8.3f} ms")
+
+async def _run(requests: int):
+    started = time.perf_counter()
+    from backend.services import agent_service
+    print(f"{'import agent_service':<38} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    from langchain_core.language_models import FakeListLLM
+    # A direct final answer keeps the agent to one LLM step and no tool calls
+    agent_service.llm = FakeListLLM(responses=["Thought: I now have enough information to answer the question\nFinal Answer: 42"])
+
+    def build():
+        executor = agent_service.build_agent_executor()
+        executor.verbose = False
+        return executor
+
+    build() # Warm up imports and pydantic model creation
+    build_ms = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        build()
+        build_ms.append((time.perf_counter() - started) * 1000)
+    _summary("build executor", build_ms)
+
+    inputs = {"input": "What is the answer?", "chat_history": ""}
+    per_request_ms = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await build().ainvoke(inputs)
+        per_request_ms.append((time.perf_counter() - started) * 1000)
+    _summary("request, executor built per request", per_request_ms)
+
+    shared = build()
+    shared_ms = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await shared.ainvoke(inputs)
+        shared_ms.append((time.perf_counter() - started) * 1000)
+    _summary("request, shared executor", shared_ms)
+
+    saved = statistics.mean(per_request_ms) - statistics.mean(shared_ms)
+    print(f"Saved per request: {saved:.3f} ms ({saved / statistics.mean(per_request_ms):.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Iterations per measurement")
+    args = parser.parse_args()
+    asyncio.run(_run(args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Synthetic corpora for the end-to-end benchmark: TXT documents, PDFs and JSON chat exports.
+
+Every file is generated from a seed, so the same arguments give byte-identical files. The
+text is filler prose with planted facts ("The coolant pump CP-0412 at the Kestrel site runs
+at 913 rpm."); the questions asked in the query scenarios are built from the same facts, so
+retrieval has something to find. Different seeds give different chunks, which matters because
+chunks are content-addressed and re-ingesting identical text is skipped as a duplicate.
+"""
+import json
+import random
+from typing import List, NamedTuple, Tuple
+
+FORMATS = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "json": "application/json",
+}
+
+_WORDS = (
+    "system operator maintenance schedule pressure valve inspection report quarterly output sensor "
+    "calibration network latency storage throughput incident review procedure safety threshold alarm "
+    "shift handover vendor contract budget forecast capacity migration backup restore policy audit "
+    "the a of to and in for with on by from after before during under across between within"
+).split()
+_COMPONENTS = ["coolant pump", "turbine", "compressor", "transformer", "control valve", "heat exchanger", "generator", "conveyor"]
+_SITES = ["Kestrel", "Harrier", "Osprey", "Merlin", "Falcon", "Peregrine", "Buzzard", "Kite"]
+_ATTRIBUTES = [("runs at", "rpm"), ("is rated for", "kilowatts"), ("was last serviced", "days ago"), ("operates below", "degrees Celsius")]
+_QUESTIONS = {
+    "runs at": "What speed does the {subject} run at?",
+    "is rated for": "What power is the {subject} rated for?",
+    "was last serviced": "When was the {subject} last serviced?",
+    "operates below": "Below which temperature does the {subject} operate?",
+}
+
+class Fact(NamedTuple):
+    component: str
+    tag: str
+    site: str
+    attribute: str
+    value: int
+    unit: str
+
+    @property
+    def subject(self) -> str:
+        return f"{self.component} {self.tag} at the {self.site} site"
+
+    def sentence(self) -> str:
+        return f"The {self.subject} {self.attribute} {self.value} {self.unit}."
+
+    def question(self) -> str:
+        return _QUESTIONS[self.attribute].format(subject=self.subject)
+
+class SyntheticFile(NamedTuple):
+    filename: str
+    content_type: str
+    data: bytes
+    facts: List[Fact]
+
+def _fact(rng: random.Random) -> Fact:
+    attribute, unit = rng.choice(_ATTRIBUTES)
+    return Fact(rng.choice(_COMPONENTS), f"{rng.choice('ABCDEFGH')}{rng.choice('PTXRV')}-{rng.randrange(10_000):04d}", rng.choice(_SITES), attribute, rng.randrange(10, 5000), unit)
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(8, 24))
+    return " ".join(words).capitalize() + "."
+
+def _paragraphs(rng: random.Random, target_chars: int, facts: List[Fact], fact_every: int = 6) -> List[str]:
+    """Filler paragraphs totalling about `target_chars`, with a planted fact every `fact_every` sentences."""
+    paragraphs, size, sentences = [], 0, 0
+    while size < target_chars:
+        paragraph = []
+        for _ in range(rng.randint(3, 8)):
+            sentences += 1
+            if sentences % fact_every == 0:
+                fact = _fact(rng)
+                facts.append(fact)
+                paragraph.append(fact.sentence())
+            else:
+                paragraph.append(_sentence(rng))
+        text = " ".join(paragraph)
+        paragraphs.append(text)
+        size += len(text) + 2
+    return paragraphs
+
+def make_txt(name: str, size_bytes: int, seed: int) -> SyntheticFile:
+    rng, facts = random.Random(seed), []
+    text = "\n\n".join(_paragraphs(rng, size_bytes, facts))
+    return SyntheticFile(f"{name}.txt", FORMATS["txt"], text.encode("utf-8"), facts)
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def pdf_document(pages: List[List[str]]) -> bytes:
+    """A minimal PDF with one Helvetica text page per list of lines, readable by pypdf."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 790 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream_bytes = stream.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream_bytes), stream_bytes))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def make_pdf(name: str, size_bytes: int, seed: int, lines_per_page: int = 60, line_width: int = 95) -> SyntheticFile:
+    """`size_bytes` is the amount of text; the PDF itself is somewhat larger."""
+    rng, facts = random.Random(seed), []
+    lines = [line for paragraph in _paragraphs(rng, size_bytes, facts) for line in _wrap(paragraph, line_width) + [""]]
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)]
+    return SyntheticFile(f"{name}.pdf", FORMATS["pdf"], pdf_document(pages), facts)
+
+def make_chat_export(name: str, size_bytes: int, seed: int) -> SyntheticFile:
+    """A JSON array of chat messages, the shape the ingestion streams item by item."""
+    rng, facts = random.Random(seed), []
+    messages, size, conversation = [], 0, 0
+    while size < size_bytes:
+        conversation += 1
+        for turn in range(rng.randint(2, 12)):
+            content = " ".join(_paragraphs(rng, rng.randint(80, 900), facts, fact_every=rng.randint(3, 8)))
+            message = {
+                "conversation_id": f"{name}-{conversation}",
+                "role": "user" if turn % 2 == 0 else "assistant",
+                "timestamp": 1_700_000_000 + conversation * 3600 + turn * 30,
+                "content": content,
+            }
+            messages.append(message)
+            size += len(content) + 100
+    return SyntheticFile(f"{name}.json", FORMATS["json"], json.dumps(messages).encode("utf-8"), facts)
+
+_MAKERS = {"txt": make_txt, "pdf": make_pdf, "json": make_chat_export}
+
+def generate(file_format: str, files: int, size_bytes: int, seed: int) -> List[SyntheticFile]:
+    """`files` files of one format, about `size_bytes` of text each."""
+    return [_MAKERS[file_format](f"bench-{seed}-{index:04d}", size_bytes, seed * 100_003 + index) for index in range(files)]
+
+def questions(facts: List[Fact], count: int, seed: int) -> List[Tuple[str, Fact]]:
+    """`count` questions about planted facts (repeating facts if there are fewer), each with the fact it asks about."""
+    if not facts:
+        raise ValueError("The corpus has no planted facts to ask about")
+    rng = random.Random(seed)
+    return [(fact.question(), fact) for fact in (rng.choice(facts) for _ in range(count))]
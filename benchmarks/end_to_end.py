@@ -0,0 +1,465 @@
+"""
+End-to-end benchmark of the ingest and query paths, driven through the ASGI app.
+
+Scenarios (--scenarios):
+    process_file   ingestion_service.process_file on each generated file, --concurrency files at once
+    upload_batch   POST /api/ingest/upload-batch with every file (parallelism = --concurrency),
+                   polling the batch until all files are done
+    retrieval      retrieval_service.find_relevant_chunks, --concurrency queries in flight
+    ask            POST /api/query/ask, --concurrency requests in flight
+
+Ingestion runs once per format (--formats: txt, pdf, json chat exports) and concurrency level
+on freshly generated files of --file-kb each (see benchmarks/corpora.py). Query scenarios ask
+about facts planted in the ingested files; with no ingestion scenario selected, a TXT corpus is
+ingested untimed first. The app's lifespan runs as in production, and requests go through
+httpx's ASGI transport, so routing, validation and serialization are included but sockets are not.
+
+By default the run is offline and repeatable: VECTOR_STORE=local in a temporary directory,
+EMBEDDING_PROVIDER=hash and LLM_PROVIDER=scripted (first-token latency --llm-latency-ms), with
+the answer cache off. --live keeps the configured store and providers instead (this calls
+OpenAI and writes to Weaviate).
+
+Each scenario reports throughput, p50/p95/p99 latency, peak RSS of the process and of its
+process-pool workers, and per-stage timings. The JSON report (--output) records the settings
+and commit it ran with; --baseline compares this run with an earlier report and exits with
+status 1 when throughput or p95 latency regressed by more than --tolerance.
+
+Run from the repository root:
+    python -m benchmarks.end_to_end --output bench.json
+    python -m benchmarks.end_to_end --formats txt json --files 16 --file-kb 1024 --concurrency 1 4 8 --baseline bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from benchmarks import corpora
+
+SCENARIOS = ["process_file", "upload_batch", "retrieval", "ask"]
+
+def _configure_environment(args, store_path: str):
+    """Settings are read at import, so this runs before anything from `backend` is imported."""
+    if not args.live:
+        os.environ.update(
+            VECTOR_STORE="local",
+            LOCAL_STORE_PATH=store_path,
+            EMBEDDING_PROVIDER="hash",
+            LLM_PROVIDER="scripted",
+            FAKE_LLM_LATENCY_MS=str(args.llm_latency_ms),
+            FAKE_EMBEDDING_LATENCY_MS=str(args.embedding_latency_ms),
+        )
+    if not args.answer_cache:
+        os.environ["ANSWER_CACHE_ENABLED"] = "false" # Measure the pipeline, not cache hits on repeated facts
+    os.environ.setdefault("EVENT_LOOP_MONITOR_INTERVAL_SECONDS", "0")
+
+
+class PeakRss:
+    """
+    Samples the resident set size of this process and of its child processes (the
+    process pool) every `interval` seconds while active. Needs /proc; elsewhere only the
+    process's lifetime peak (getrusage) is available.
+    """
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak_bytes = 0
+        self.peak_children_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self, pid: str) -> int:
+        try:
+            with open(f"/proc/{pid}/statm") as statm:
+                return int(statm.read().split()[1]) * self._page_size
+        except (OSError, IndexError, ValueError): # Child exited between listing and reading
+            return 0
+
+    def _children(self) -> List[str]:
+        pids = []
+        for task in os.listdir("/proc/self/task"):
+            try:
+                with open(f"/proc/self/task/{task}/children") as children:
+                    pids.extend(children.read().split())
+            except OSError:
+                pass
+        return pids
+
+    def sample(self):
+        self.peak_bytes = max(self.peak_bytes, self._rss("self"))
+        self.peak_children_bytes = max(self.peak_children_bytes, sum(self._rss(pid) for pid in self._children()))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        if os.path.exists("/proc/self/statm"):
+            self.sample()
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.sample()
+        else:
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak_bytes = usage if sys.platform == "darwin" else usage * 1024 # Bytes on macOS, KiB on Linux
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"peak_rss_mb": round(self.peak_bytes / 2**20, 1), "peak_children_rss_mb": round(self.peak_children_bytes / 2**20, 1)}
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {}
+    ordered = sorted(samples_ms)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    return {
+        "mean": round(statistics.mean(ordered), 3),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+def _add_stages(total: Dict[str, float], stages: Dict[str, float]):
+    for stage, seconds in stages.items():
+        total[stage] = round(total.get(stage, 0.0) + seconds, 4)
+
+async def run_concurrently(operations: List[Callable[[], Awaitable[Any]]], concurrency: int):
+    """Runs `operations` with `concurrency` in flight. Returns (latencies in ms, results, errors)."""
+    latencies_ms: List[float] = []
+    results: List[Any] = []
+    errors: List[str] = []
+    pending = iter(operations)
+
+    async def worker():
+        for operation in pending: # Shared iterator: each worker takes the next operation
+            started = time.perf_counter()
+            try:
+                results.append(await operation())
+                latencies_ms.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies_ms, results, errors
+
+def _report(scenario: str, file_format: Optional[str], concurrency: int, wall_seconds: float, latencies_ms: List[float], errors: List[str], rss: PeakRss, **extra) -> Dict[str, Any]:
+    return {
+        "scenario": scenario,
+        "format": file_format,
+        "concurrency": concurrency,
+        "operations": len(latencies_ms) + len(errors),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_seconds": round(wall_seconds, 3),
+        "ops_per_second": round(len(latencies_ms) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_ms": latency_summary(latencies_ms),
+        **rss.to_dict(),
+        **extra,
+    }
+
+def _ingest_throughput(files: List[corpora.SyntheticFile], chunks: int, wall_seconds: float) -> Dict[str, Any]:
+    megabytes = sum(len(file.data) for file in files) / 2**20
+    return {
+        "files": len(files),
+        "megabytes": round(megabytes, 3),
+        "chunks": chunks,
+        "mb_per_second": round(megabytes / wall_seconds, 3) if wall_seconds else 0.0,
+        "chunks_per_second": round(chunks / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+async def bench_process_file(files: List[corpora.SyntheticFile], file_format: str, concurrency: int) -> Dict[str, Any]:
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+    from backend.services.ingestion_service import IngestionProgress, process_file
+
+    progresses: List[IngestionProgress] = []
+
+    def operation(file: corpora.SyntheticFile):
+        async def run():
+            progress = IngestionProgress()
+            progresses.append(progress)
+            upload = UploadFile(file=io.BytesIO(file.data), filename=file.filename, headers=Headers({"content-type": file.content_type}))
+            return await process_file(upload, progress=progress)
+        return run
+
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        latencies_ms, _, errors = await run_concurrently([operation(file) for file in files], concurrency)
+        wall_seconds = time.perf_counter() - started
+    stages: Dict[str, float] = {}
+    for progress in progresses:
+        _add_stages(stages, progress.stage_seconds) # Every stage before the final "done"
+    stages.pop("queued", None)
+    chunks = sum(progress.chunks_total for progress in progresses)
+    return _report("process_file", file_format, concurrency, wall_seconds, latencies_ms, errors, rss,
+                   stage_seconds=stages, **_ingest_throughput(files, chunks, wall_seconds))
+
+async def bench_upload_batch(client, files: List[corpora.SyntheticFile], file_format: str, concurrency: int, poll_seconds: float = 0.05) -> Dict[str, Any]:
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/ingest/upload-batch",
+            params={"parallelism": concurrency},
+            files=[("files", (file.filename, file.data, file.content_type)) for file in files],
+        )
+        response.raise_for_status()
+        accepted_ms = (time.perf_counter() - started) * 1000
+        batch_id = response.json()["batch_id"]
+        while True:
+            batch = (await client.get(f"/api/ingest/batches/{batch_id}")).json()
+            if all(job["status"] in ("completed", "failed") for job in batch["files_detail"]):
+                break
+            await asyncio.sleep(poll_seconds)
+        wall_seconds = time.perf_counter() - started
+
+    latencies_ms, errors, stages = [], [], {}
+    for job in batch["files_detail"]:
+        if job["status"] == "failed":
+            errors.append(job["error"] or "failed")
+        else:
+            latencies_ms.append((job["finished_at"] - job["created_at"]) * 1000) # Includes time queued behind other files
+        _add_stages(stages, job["stage_seconds"])
+    return _report("upload_batch", file_format, concurrency, wall_seconds, latencies_ms, errors, rss,
+                   accepted_ms=round(accepted_ms, 3), stage_seconds=stages,
+                   **_ingest_throughput(files, batch["chunks_total"], wall_seconds))
+
+
+class _TimedStore:
+    """Wraps a vector store to time its searches, separating them from query embedding."""
+    def __init__(self, store):
+        self.store = store
+        self.name = store.name
+        self.search_ms: List[float] = []
+
+    async def asearch(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self.store.asearch(*args, **kwargs)
+        finally:
+            self.search_ms.append((time.perf_counter() - started) * 1000)
+
+
+def _clear_query_caches():
+    """Each measured round starts cold, so concurrency levels stay comparable."""
+    from backend.core.embedding_cache import query_embedding_cache
+    from backend.services.answer_cache import answer_cache
+    if query_embedding_cache is not None:
+        query_embedding_cache.clear()
+    if answer_cache is not None:
+        answer_cache.clear()
+
+async def bench_retrieval(questions, concurrency: int, top_k: int) -> Dict[str, Any]:
+    from backend.core.vector_store import get_vector_store
+    from backend.services.retrieval_service import find_relevant_chunks
+
+    store = _TimedStore(get_vector_store())
+
+    def operation(question: str, fact: corpora.Fact):
+        async def run():
+            chunks = await find_relevant_chunks(question, top_k=top_k, store=store)
+            return any(fact.tag in chunk.get("content", "") for chunk in chunks)
+        return run
+
+    _clear_query_caches()
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        latencies_ms, hits, errors = await run_concurrently([operation(question, fact) for question, fact in questions], concurrency)
+        wall_seconds = time.perf_counter() - started
+    search_ms = statistics.mean(store.search_ms) if store.search_ms else 0.0
+    total_ms = statistics.mean(latencies_ms) if latencies_ms else 0.0
+    return _report("retrieval", None, concurrency, wall_seconds, latencies_ms, errors, rss,
+                   top_k=top_k,
+                   fact_hit_rate=round(sum(hits) / len(hits), 4) if hits else 0.0, # Planted fact among the top k
+                   stage_ms={"search": round(search_ms, 3), "embedding_and_overhead": round(total_ms - search_ms, 3)},
+                   search_latency_ms=latency_summary(store.search_ms))
+
+async def bench_ask(client, questions, concurrency: int) -> Dict[str, Any]:
+    routes: Dict[str, int] = {}
+    route_ms: Dict[str, List[float]] = {}
+
+    def operation(question: str):
+        async def run():
+            started = time.perf_counter()
+            response = await client.post("/api/query/ask", json={"question": question})
+            response.raise_for_status()
+            route = response.json().get("route") or "unknown"
+            routes[route] = routes.get(route, 0) + 1
+            route_ms.setdefault(route, []).append((time.perf_counter() - started) * 1000)
+        return run
+
+    _clear_query_caches()
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        latencies_ms, _, errors = await run_concurrently([operation(question) for question, _ in questions], concurrency)
+        wall_seconds = time.perf_counter() - started
+    return _report("ask", None, concurrency, wall_seconds, latencies_ms, errors, rss,
+                   routes=routes, route_latency_ms={route: latency_summary(samples) for route, samples in route_ms.items()})
+
+
+def _environment(args) -> Dict[str, Any]:
+    from backend.core.config import settings
+    from backend.services import ingestion_service
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "arguments": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "settings": {
+            "VECTOR_STORE": settings.VECTOR_STORE,
+            "EMBEDDING_PROVIDER": settings.EMBEDDING_PROVIDER,
+            "LLM_PROVIDER": settings.LLM_PROVIDER,
+            "EMBEDDING_MODEL": settings.EMBEDDING_MODEL,
+            "EMBEDDING_DIM": settings.EMBEDDING_DIM,
+            "SEARCH_MODE": settings.SEARCH_MODE,
+            "CHUNK_SIZE": ingestion_service.CHUNK_SIZE,
+            "CHUNK_OVERLAP": ingestion_service.CHUNK_OVERLAP,
+            "INGEST_WINDOW_CHUNKS": settings.INGEST_WINDOW_CHUNKS,
+            "INGEST_WRITER_BATCH_OBJECTS": settings.INGEST_WRITER_BATCH_OBJECTS,
+            "INGEST_WORKERS": settings.INGEST_WORKERS,
+            "RETRIEVAL_MODE": settings.RETRIEVAL_MODE,
+            "RERANK_ENABLED": settings.RERANK_ENABLED,
+            "QUERY_ROUTER_ENABLED": settings.QUERY_ROUTER_ENABLED,
+        },
+    }
+
+async def _run(args) -> Dict[str, Any]:
+    import httpx
+    from backend.main import app
+
+    results: List[Dict[str, Any]] = []
+    facts: List[corpora.Fact] = []
+    seed = args.seed
+
+    def log(result: Dict[str, Any]):
+        results.append(result)
+        latency = result["latency_ms"]
+        print(f"{result['scenario']:<13}{result['format'] or '-':>6}{result['concurrency']:>6}{result['operations']:>6}"
+              f"{result['ops_per_second']:>10.2f}{latency.get('p50', 0):>10.1f}{latency.get('p95', 0):>10.1f}{latency.get('p99', 0):>10.1f}"
+              f"{result['peak_rss_mb']:>9.0f}{result['errors']:>7}", file=sys.stderr)
+
+    print(f"{'scenario':<13}{'format':>6}{'conc':>6}{'ops':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}{'errors':>7}", file=sys.stderr)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None) as client:
+            ingest_scenarios = [scenario for scenario in ("process_file", "upload_batch") if scenario in args.scenarios]
+            for file_format in args.formats:
+                for concurrency in args.concurrency:
+                    for scenario in ingest_scenarios:
+                        seed += 1 # Fresh content every round, so nothing is skipped as already stored
+                        files = corpora.generate(file_format, args.files, args.file_kb * 1024, seed)
+                        facts.extend(fact for file in files for fact in file.facts)
+                        if scenario == "process_file":
+                            log(await bench_process_file(files, file_format, concurrency))
+                        else:
+                            log(await bench_upload_batch(client, files, file_format, concurrency))
+
+            query_scenarios = [scenario for scenario in ("retrieval", "ask") if scenario in args.scenarios]
+            if query_scenarios and not facts:
+                from backend.services.ingestion_service import process_stream
+                files = corpora.generate("txt", args.files, args.file_kb * 1024, seed + 1)
+                for file in files:
+                    await process_stream(io.BytesIO(file.data), file.filename, file.content_type)
+                facts.extend(fact for file in files for fact in file.facts)
+            for concurrency in args.concurrency:
+                if "retrieval" in query_scenarios:
+                    log(await bench_retrieval(corpora.questions(facts, args.queries, args.seed + concurrency), concurrency, args.top_k))
+                if "ask" in query_scenarios:
+                    log(await bench_ask(client, corpora.questions(facts, args.asks, args.seed + concurrency), concurrency))
+
+    return {"created_at": time.time(), "environment": _environment(args), "results": results}
+
+def _key(result: Dict[str, Any]) -> str:
+    return f"{result['scenario']}/{result['format'] or '-'}/c{result['concurrency']}"
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Prints throughput and p95 changes against `baseline`. Returns how many results regressed beyond `tolerance`."""
+    previous = {_key(result): result for result in baseline.get("results", [])}
+    regressions = 0
+    print(f"\nAgainst baseline {baseline.get('environment', {}).get('commit') or '(unknown commit)'}:", file=sys.stderr)
+    print(f"{'result':<32}{'ops/s':>10}{'change':>9}{'p95 ms':>10}{'change':>9}", file=sys.stderr)
+    for result in report["results"]:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        throughput_change = result["ops_per_second"] / before["ops_per_second"] - 1 if before["ops_per_second"] else 0.0
+        p95, p95_before = result["latency_ms"].get("p95", 0.0), before["latency_ms"].get("p95", 0.0)
+        p95_change = p95 / p95_before - 1 if p95_before else 0.0
+        regressed = throughput_change < -tolerance or p95_change > tolerance
+        regressions += regressed
+        print(f"{_key(result):<32}{result['ops_per_second']:>10.2f}{throughput_change:>+9.1%}{p95:>10.1f}{p95_change:>+9.1%}"
+              f"{'  REGRESSED' if regressed else ''}", file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--formats", nargs="+", default=list(corpora.FORMATS), choices=list(corpora.FORMATS))
+    parser.add_argument("--files", type=int, default=8, help="Files per ingestion round")
+    parser.add_argument("--file-kb", type=int, default=256, help="Text per generated file, in KiB")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Concurrency levels; each scenario runs once per level")
+    parser.add_argument("--queries", type=int, default=200, help="Questions per retrieval round")
+    parser.add_argument("--asks", type=int, default=40, help="Questions per /api/query/ask round")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=100.0, help="Scripted LLM median time to first token")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0, help="Hash embeddings latency per request")
+    parser.add_argument("--answer-cache", action="store_true", help="Leave the semantic answer cache on")
+    parser.add_argument("--live", action="store_true", help="Use the configured vector store and model providers")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative throughput drop or p95 rise counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's own logging and prints")
+    args = parser.parse_args()
+
+    store_path = tempfile.mkdtemp(prefix="benchmark-store-")
+    _configure_environment(args, store_path)
+    try:
+        if args.verbose:
+            report = asyncio.run(_run(args))
+        else:
+            logging.disable(logging.WARNING) # Per-request INFO and expected-failure WARNING logs would dominate the run
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # Routers print every request
+                report = asyncio.run(_run(args))
+    finally:
+        shutil.rmtree(store_path, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
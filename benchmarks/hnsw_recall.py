@@ -0,0 +1,154 @@
+"""
+HNSW and quantization benchmark: recall@k against query latency and vector memory.
+
+Builds one temporary Weaviate collection per configuration from the same corpus, runs a
+held-out query set against each, and compares the results with exact (brute-force) nearest
+neighbours computed in numpy. Needs a Weaviate connection (WEAVIATE_URL / WEAVIATE_API_KEY);
+the temporary collections are deleted afterwards.
+
+The corpus is a sample of the stored chunk vectors (--source) or synthetic clustered
+vectors (--synthetic). Queries are held-out corpus vectors, or questions from a file
+(--queries, one per line) embedded with EMBEDDING_MODEL.
+
+Run from the repository root:
+    python -m benchmarks.hnsw_recall --source Documents --sample 20000 --ef -1 64 256 --quantization none pq bq
+    python -m benchmarks.hnsw_recall --synthetic 50000 --dim 1536 --max-connections 16 32
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+import uuid
+from typing import List, Optional
+
+import numpy as np
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def load_corpus(client, source: str, sample: int) -> np.ndarray:
+    from backend.core.weaviate_manager import vector_target
+    target = vector_target(client, source) or "default"
+    vectors = []
+    for obj in client.collections.get(source).iterator(include_vector=True):
+        vector = obj.vector.get(target) if isinstance(obj.vector, dict) else obj.vector
+        if vector:
+            vectors.append(vector)
+        if len(vectors) >= sample:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+def synthetic_corpus(count: int, dim: int, clusters: int = 64, seed: int = 7) -> np.ndarray:
+    """Gaussian clusters, closer to embedding distributions than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    similarities = _normalize(queries) @ _normalize(corpus).T # Cosine, matching the collection's distance metric
+    top = np.argpartition(-similarities, k, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+def vector_memory_bytes(count: int, dim: int, quantization: str, pq_segments: Optional[int]) -> int:
+    """Approximate in-memory size of the vectors the HNSW search reads (graph links excluded)."""
+    if quantization == "pq":
+        return count * (pq_segments or max(1, dim // 4)) # One byte per segment
+    if quantization == "bq":
+        return count * dim // 8
+    if quantization == "sq":
+        return count * dim
+    return count * dim * 4
+
+def _build(client, name: str, corpus: np.ndarray, ids: List[str]):
+    from backend.core.weaviate_manager import create_collection, vector_target
+    create_collection(client, name)
+    collection = client.collections.get(name)
+    target = vector_target(client, name)
+    started = time.perf_counter()
+    with collection.batch.fixed_size(batch_size=500) as batch:
+        for object_id, vector in zip(ids, corpus):
+            batch.add_object(properties={"content": ""}, vector={target: vector.tolist()}, uuid=object_id)
+    if collection.batch.failed_objects:
+        raise RuntimeError(f"{len(collection.batch.failed_objects)} objects failed to insert into {name}")
+    return collection, target, time.perf_counter() - started
+
+def _measure(collection, target: str, queries: np.ndarray, truth: List[set], ids: List[str], k: int):
+    index_of = {object_id: index for index, object_id in enumerate(ids)}
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        response = collection.query.near_vector(near_vector=query.tolist(), target_vector=target, limit=k, return_properties=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {index_of.get(str(obj.uuid)) for obj in response.objects}
+        recalls.append(len(found & expected) / k)
+    latencies.sort()
+    return statistics.mean(recalls), statistics.median(latencies), latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+def run(args):
+    from backend.core.config import settings
+    from backend.core.weaviate_manager import get_weaviate_client
+
+    client = get_weaviate_client()
+    try:
+        if args.synthetic:
+            corpus = synthetic_corpus(args.synthetic + args.holdout, args.dim)
+        else:
+            corpus = load_corpus(client, args.source, args.sample + (0 if args.queries else args.holdout))
+        if args.queries:
+            from backend.core.embedding_scheduler import embedding_scheduler
+            with open(args.queries, encoding="utf-8") as handle:
+                questions = [line.strip() for line in handle if line.strip()]
+            queries = np.asarray(asyncio.run(embedding_scheduler.embed_documents(questions)), dtype=np.float32)
+        else:
+            rng = np.random.default_rng(11)
+            held_out = rng.choice(len(corpus), size=min(args.holdout, len(corpus) // 10), replace=False)
+            queries = corpus[held_out]
+            corpus = np.delete(corpus, held_out, axis=0)
+        print(f"Corpus: {len(corpus)} vectors of dim {corpus.shape[1]}; {len(queries)} queries; recall@{args.k}")
+        truth = exact_neighbours(corpus, queries, args.k)
+        ids = [str(uuid.uuid4()) for _ in range(len(corpus))]
+
+        settings.WEAVIATE_MULTI_TENANCY = False # Benchmark collections hold a single index
+        print(f"{'quantization':<13}{'maxConn':>8}{'efC':>6}{'ef':>6}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}{'build s':>9}{'vectors MB':>12}")
+        for quantization, max_connections, ef_construction, ef in itertools.product(
+            args.quantization, args.max_connections, args.ef_construction, args.ef
+        ):
+            settings.VECTOR_QUANTIZATION = quantization
+            settings.HNSW_MAX_CONNECTIONS = max_connections
+            settings.HNSW_EF_CONSTRUCTION = ef_construction
+            settings.HNSW_EF = ef
+            settings.PQ_TRAINING_LIMIT = min(settings.PQ_TRAINING_LIMIT, len(corpus))
+            name = f"HnswBenchmark{uuid.uuid4().hex[:8]}"
+            try:
+                collection, target, build_seconds = _build(client, name, corpus, ids)
+                _measure(collection, target, queries[: min(20, len(queries))], truth, ids, args.k) # Warm up
+                recall, p50, p95 = _measure(collection, target, queries, truth, ids, args.k)
+            finally:
+                client.collections.delete(name)
+            memory = vector_memory_bytes(len(corpus), corpus.shape[1], quantization, settings.PQ_SEGMENTS) / 2**20
+            print(f"{quantization:<13}{max_connections:>8}{ef_construction:>6}{ef:>6}{recall:>9.4f}{p50:>9.2f}{p95:>9.2f}{build_seconds:>9.1f}{memory:>12.1f}")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--source", help="Collection whose stored vectors form the corpus")
+    corpus.add_argument("--synthetic", type=int, help="Generate this many synthetic vectors instead")
+    parser.add_argument("--sample", type=int, default=20_000, help="Vectors read from --source")
+    parser.add_argument("--dim", type=int, default=1536, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", help="File of questions (one per line) to embed as the query set")
+    parser.add_argument("--holdout", type=int, default=500, help="Corpus vectors held out as queries when --queries is not given")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="+", default=[-1, 64, 128, 256], help="-1 = dynamic ef")
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[128])
+    parser.add_argument("--max-connections", type=int, nargs="+", default=[32])
+    parser.add_argument("--quantization", nargs="+", default=["none", "pq", "bq", "sq"], choices=["none", "pq", "bq", "sq"])
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -39,10 +39,62 @@ export const uploadFiles = async (files: File[]) => {
   return response.data;
 };
 
+export const getIngestionJob = async (jobId: string) => {
+  const response = await apiClient.get(`/ingest/jobs/${jobId}`);
+  return response.data;
+};
+
+// The backend keeps the conversation history per session; we only hold on to its ID
+let sessionId: string | null = sessionStorage.getItem('jarvisSessionId');
+
 export const askQuestion = async (question: string) => {
-  const response = await apiClient.post('/query/ask', { question });
+  const response = await apiClient.post('/query/ask', { question, session_id: sessionId });
+  if (response.data.session_id) {
+    sessionId = response.data.session_id;
+    sessionStorage.setItem('jarvisSessionId', response.data.session_id);
+  }
   return response.data;
 };
 
+export interface StreamEvent {
+  event: string; // session | route | reset | thought | tool_start | tool_end | sources | token | error | final
+  data: any;
+}
+
+// Streams the answer as Server-Sent Events. axios cannot read a streaming body in the
+// browser, so this uses fetch. Resolves with the data of the closing `final` event.
+export const askQuestionStream = async (question: string, onEvent: (event: StreamEvent) => void) => {
+  const response = await fetch(`${apiClient.defaults.baseURL}/query/ask/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ question, session_id: sessionId }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let finalData: any = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const name = rawEvent.match(/^event: (.*)$/m)?.[1] ?? 'message';
+      const data = JSON.parse(rawEvent.match(/^data: (.*)$/m)?.[1] ?? 'null');
+      if (name === 'session' || name === 'final') {
+        sessionId = data.session_id;
+        sessionStorage.setItem('jarvisSessionId', data.session_id);
+      }
+      if (name === 'final') finalData = data;
+      onEvent({ event: name, data });
+    }
+  }
+  return finalData;
+};
+
 export default apiClient;
 
@@ -1,6 +1,6 @@
 import React, { useState, useCallback, useRef, useEffect } from 'react';
 import { useMutation } from '@tanstack/react-query';
-import { askQuestion } from '../apiClient';
+import { askQuestionStream, StreamEvent } from '../apiClient';
 
 interface Message {
   id: number;
@@ -13,23 +13,35 @@ interface Message {
 function ChatInterface() {
   const [input, setInput] = useState<string>('');
   const [messages, setMessages] = useState<Message[]>([]);
+  const [streamingText, setStreamingText] = useState<string>(''); // Answer tokens received so far
   const messageEndRef = useRef<HTMLDivElement>(null);
 
   const mutation = useMutation({
-    mutationFn: askQuestion,
+    mutationFn: (question: string) => {
+      setStreamingText('');
+      return askQuestionStream(question, (event: StreamEvent) => {
+        if (event.event === 'token') {
+          setStreamingText((prev) => prev + event.data.text);
+        } else if (event.event === 'reset') {
+          setStreamingText(''); // Drop the abandoned fast-path answer; the agent's answer follows
+        }
+      });
+    },
     onSuccess: (data) => {
+      setStreamingText('');
       setMessages((prev) => [
         ...prev,
         {
           id: Date.now(),
-          text: data.answer || 'No answer received.',
+          text: data?.answer || 'No answer received.',
           sender: 'bot',
-          sources: data.sources,
-          thoughtProcess: data.thought_process, // Store thought process
+          sources: data?.sources,
+          thoughtProcess: data?.thought_process, // Store thought process
         },
       ]);
     },
     onError: (error: any) => {
+      setStreamingText('');
       setMessages((prev) => [
         ...prev,
         {
@@ -103,7 +115,7 @@ function ChatInterface() {
         ))}
         {mutation.isPending && (
             <div className="message bot">
-                <p><i>JARVIS is thinking...</i></p>
+                {streamingText ? <p>{streamingText}</p> : <p><i>JARVIS is thinking...</i></p>}
             </div>
         )}
         <div ref={messageEndRef} />
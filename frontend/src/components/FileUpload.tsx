@@ -1,17 +1,40 @@
 import React, { useState, useCallback } from 'react';
 import { useMutation } from '@tanstack/react-query';
-import { uploadFile } from '../apiClient';
+import { uploadFile, getIngestionJob } from '../apiClient';
 
 function FileUpload() {
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [message, setMessage] = useState<string>('');
 
+  // Ingestion runs as a background job; poll it until it finishes
+  const pollJob = useCallback((jobId: string) => {
+    const timer = setInterval(async () => {
+      try {
+        const job = await getIngestionJob(jobId);
+        if (job.status === 'completed') {
+          clearInterval(timer);
+          setMessage(`${job.filename}: ${job.chunks} chunks ingested successfully.`);
+        } else if (job.status === 'failed') {
+          clearInterval(timer);
+          setMessage(`Ingestion failed: ${job.error}`);
+        } else {
+          setMessage(`${job.filename}: ${job.stage} (${job.chunks_inserted}/${job.chunks_total} chunks stored)`);
+        }
+      } catch (error: any) {
+        clearInterval(timer);
+        setMessage(`Could not check ingestion status: ${error.message}`);
+      }
+    }, 1000);
+  }, []);
+
   const mutation = useMutation({
     mutationFn: uploadFile,
     onSuccess: (data) => {
       setMessage(data.message || 'File uploaded successfully!');
       setSelectedFile(null); // Clear selection after successful upload
-      // Optionally: trigger a refetch of documents or update UI elsewhere
+      if (data.job_id) {
+        pollJob(data.job_id);
+      }
     },
     onError: (error: any) => {
       setMessage(`Upload failed: ${error.response?.data?.detail || error.message}`);